@@ -6,6 +6,7 @@ Relay cihazları kontrol eden modül
 
 import logging
 import asyncio
+import functools
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -26,6 +27,20 @@ class RelayCommandResult:
     message: Optional[str] = None
 
 
+def _serialized_per_device(method):
+    """
+    Aynı cihaza gelen komutları sırala
+
+    Farklı cihazların komutları (ör. gather ile) paralel ilerler; aynı cihaz
+    için MQTT gönderimi ve state güncellemesi iç içe geçmez.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, device_id: str, *args, **kwargs):
+        async with self._device_lock(device_id):
+            return await method(self, device_id, *args, **kwargs)
+    return wrapper
+
+
 class RelayController:
     """Relay kontrolcü"""
 
@@ -46,6 +61,9 @@ class RelayController:
         # Scheduled off tasks: device_id -> asyncio.Task
         self._scheduled_off_tasks: Dict[str, asyncio.Task] = {}
 
+        # Cihaz başına komut lock'u: device_id -> asyncio.Lock
+        self._device_locks: Dict[str, asyncio.Lock] = {}
+
         # Safety defaults
         self._default_max_duration = 60  # minutes
 
@@ -54,6 +72,7 @@ class RelayController:
         else:
             logger.info("RelayController initialized")
 
+    @_serialized_per_device
     async def turn_on(
         self,
         device_id: str,
@@ -154,6 +173,7 @@ class RelayController:
             message=f"Device {device_id} turned on" + (f" for {duration_minutes} minutes" if duration_minutes else "")
         )
 
+    @_serialized_per_device
     async def turn_off(
         self,
         device_id: str,
@@ -252,6 +272,13 @@ class RelayController:
             message=f"Device {device_id} turned off"
         )
 
+    def _device_lock(self, device_id: str) -> asyncio.Lock:
+        """Cihazın komut lock'unu al (yoksa oluştur)"""
+        lock = self._device_locks.get(device_id)
+        if lock is None:
+            lock = self._device_locks[device_id] = asyncio.Lock()
+        return lock
+
     async def schedule_off(self, device_id: str, after_minutes: int) -> None:
         """
         Belirli süre sonra kapatmayı zamanla
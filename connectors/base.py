@@ -33,3 +33,12 @@ class BaseConnector(ABC):
     async def health_check(self) -> dict:
         """Bağlantı sağlığını kontrol et"""
         pass
+
+    async def __aenter__(self) -> "BaseConnector":
+        """async with desteği: girişte bağlan"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        """async with desteği: çıkışta bağlantıyı kapat"""
+        await self.disconnect()
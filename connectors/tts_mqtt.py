@@ -4,7 +4,6 @@ Sera Otonom - TTS MQTT Connector
 Tek MQTT bağlantısı üzerinden hem uplink (sensör verisi) hem downlink (relay komutları)
 """
 
-import json
 import logging
 import asyncio
 import ssl
@@ -16,6 +15,7 @@ from dataclasses import dataclass
 import aiomqtt
 
 from .base import BaseConnector
+from utils import json_utils
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +57,7 @@ class TTSMQTTConnector(BaseConnector):
         self.config = config
         self.client: Optional[aiomqtt.Client] = None
         self._message_callback: Optional[Callable] = None
+        self._callback_is_coro = False  # on_message'da bir kez belirlenir
         self._receive_task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
         self._client_lock = asyncio.Lock()
@@ -206,6 +207,7 @@ class TTSMQTTConnector(BaseConnector):
                 Signature: callback(parsed_message: dict) -> None
         """
         self._message_callback = callback
+        self._callback_is_coro = asyncio.iscoroutinefunction(callback)
 
     async def start_listening(self) -> None:
         """Uplink mesaj dinlemeye başla"""
@@ -235,8 +237,8 @@ class TTSMQTTConnector(BaseConnector):
                     break
 
                 try:
-                    # Parse message
-                    payload = json.loads(message.payload.decode())
+                    # Parse message: bytes doğrudan parser'a verilir (decode kopyası yok)
+                    payload = json_utils.loads(message.payload)
 
                     # Extract device info from topic
                     topic_parts = str(message.topic).split('/')
@@ -253,17 +255,21 @@ class TTSMQTTConnector(BaseConnector):
                     self.stats['uplinks_received'] += 1
                     self.stats['last_uplink_time'] = parsed['received_at']
 
-                    logger.debug(f"Received uplink from {device_id}")
+                    logger.debug("Received uplink from %s", device_id)
 
-                    # Call callback
-                    if self._message_callback:
+                    # Call callback (async kontrolü kayıtta yapıldı)
+                    callback = self._message_callback
+                    if callback:
                         try:
-                            await self._async_callback(parsed)
+                            if self._callback_is_coro:
+                                await callback(parsed)
+                            else:
+                                callback(parsed)
                         except Exception as e:
                             logger.error(f"Callback error: {e}")
                             self.stats['errors'] += 1
 
-                except json.JSONDecodeError as e:
+                except json_utils.JSONDecodeError as e:
                     logger.error(f"JSON decode error: {e}")
                     self.stats['errors'] += 1
                 except Exception as e:
@@ -276,13 +282,6 @@ class TTSMQTTConnector(BaseConnector):
             logger.error(f"Message loop error: {e}")
             self.stats['errors'] += 1
 
-    async def _async_callback(self, message: Dict[str, Any]) -> None:
-        """Callback'i async olarak çağır"""
-        if asyncio.iscoroutinefunction(self._message_callback):
-            await self._message_callback(message)
-        else:
-            self._message_callback(message)
-
     # ==================== DOWNLINK (Send) ====================
 
     async def send_downlink(
@@ -333,7 +332,7 @@ class TTSMQTTConnector(BaseConnector):
             async with self._client_lock:
                 await self.client.publish(
                     topic=topic,
-                    payload=json.dumps(downlink_message),
+                    payload=json_utils.dumps(downlink_message),
                     qos=self.qos
                 )
 
@@ -7,8 +7,9 @@ Retry logic, caching ve stats tracking ile
 
 import logging
 import asyncio
+import time
 from typing import Optional, List
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, field
 import aiohttp
 from .base import BaseConnector
@@ -19,6 +20,13 @@ logger = logging.getLogger(__name__)
 MAX_RETRIES = 3
 RETRY_DELAYS = [2, 4, 8]  # Exponential backoff in seconds
 RETRY_STATUS_CODES = {500, 502, 503, 504, 429}  # Server errors + rate limit
+FAILURE_TTL_SECONDS = 30.0  # Negative cache: başarısız istekten sonra API'ye gitmeme süresi
+
+# Connection pool configuration
+DNS_CACHE_TTL_SECONDS = 300
+KEEPALIVE_TIMEOUT_SECONDS = 30
+
+_UTC = timezone.utc
 
 
 @dataclass
@@ -40,6 +48,7 @@ class WeatherConnector(BaseConnector):
     """OpenWeatherMap API Connector with retry logic and caching"""
 
     BASE_URL = "https://api.openweathermap.org/data/2.5"
+    ONECALL_URL = "https://api.openweathermap.org/data/3.0/onecall"
 
     def __init__(self, config: dict):
         """
@@ -53,13 +62,24 @@ class WeatherConnector(BaseConnector):
         self.api_key = config.get("api_key", "")
         self.lat = config.get("location", {}).get("lat", 0)
         self.lon = config.get("location", {}).get("lon", 0)
+        # One Call yanıtında şehir adı yok; gösterilecek ad config'den gelir
+        self.location_name = config.get("location", {}).get("name", "")
         self.session: Optional[aiohttp.ClientSession] = None
 
-        # Cache
+        # Eşzamanlı API isteklerini sınırla (kendi kendine 429 üretmemek için)
+        self._max_concurrent = config.get("max_concurrent_requests", 4)
+        self._sem = asyncio.Semaphore(self._max_concurrent)
+
+        # Cache (current + daily forecast, tek One Call yanıtından doldurulur)
         self._cache: Optional[WeatherData] = None
+        self._forecast_cache: Optional[List[dict]] = None
         self._cache_time: Optional[datetime] = None
         self._cache_ttl: timedelta = timedelta(minutes=15)
 
+        # Negative cache (monotonic deadline, 0 = aktif değil)
+        self._failure_deadline: float = 0.0
+        self._failure_ttl: float = config.get("failure_ttl_seconds", FAILURE_TTL_SECONDS)
+
         # Stats
         self._stats = {
             "requests": 0,
@@ -70,10 +90,20 @@ class WeatherConnector(BaseConnector):
         }
 
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Lazy HTTP session initialization"""
+        """
+        Lazy HTTP session initialization
+
+        Tüm istekler tek session'ı paylaşır; bağlantılar keep-alive ile açık
+        tutulur ve DNS sonucu cache'lenir (her çağrıda yeni TCP/TLS el sıkışması yok).
+        """
         if self.session is None or self.session.closed:
             timeout = aiohttp.ClientTimeout(total=30)
-            self.session = aiohttp.ClientSession(timeout=timeout)
+            connector = aiohttp.TCPConnector(
+                limit=self._max_concurrent,
+                ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+                keepalive_timeout=KEEPALIVE_TIMEOUT_SECONDS
+            )
+            self.session = aiohttp.ClientSession(timeout=timeout, connector=connector)
             self.is_connected = True
             logger.info("Weather API session created")
         return self.session
@@ -104,81 +134,86 @@ class WeatherConnector(BaseConnector):
             logger.error(f"Failed to close session: {e}")
             return False
 
-    async def _request_with_retry(self, endpoint: str, params: dict) -> Optional[dict]:
+    async def _request_with_retry(
+        self,
+        endpoint: str,
+        params: dict,
+        base_url: Optional[str] = None
+    ) -> Optional[dict]:
         """
         Core retry logic for API requests
 
         Args:
             endpoint: API endpoint (e.g., "/weather")
             params: Query parameters
+            base_url: Base URL override (default: BASE_URL)
 
         Returns:
             JSON response dict or None on failure
         """
         session = await self._get_session()
-        url = f"{self.BASE_URL}{endpoint}"
-        self._stats["requests"] += 1
-
-        for attempt in range(MAX_RETRIES):
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        self._stats["successes"] += 1
-                        return await response.json()
-                    elif response.status in RETRY_STATUS_CODES:
-                        logger.warning(
-                            f"Weather API retryable error: {response.status}, "
-                            f"attempt {attempt + 1}/{MAX_RETRIES}"
-                        )
-                        if attempt < MAX_RETRIES - 1:
-                            self._stats["retries"] += 1
-                            await asyncio.sleep(RETRY_DELAYS[attempt])
-                            continue
-                        else:
-                            self._stats["failures"] += 1
-                            error_text = await response.text()
-                            logger.error(f"Weather API failed after retries: {response.status} - {error_text}")
-                            return None
-                    else:
-                        # Non-retryable error
-                        self._stats["failures"] += 1
-                        error_text = await response.text()
-                        logger.error(f"Weather API error: {response.status} - {error_text}")
+        url = f"{base_url or self.BASE_URL}{endpoint}"
+        stats = self._stats
+        stats["requests"] += 1
+        retries = 0
+
+        try:
+            for attempt in range(MAX_RETRIES):
+                last_attempt = attempt >= MAX_RETRIES - 1
+                try:
+                    async with self._sem:
+                        async with session.get(url, params=params) as response:
+                            if response.status == 200:
+                                stats["successes"] += 1
+                                return await response.json()
+                            elif response.status in RETRY_STATUS_CODES:
+                                logger.warning(
+                                    f"Weather API retryable error: {response.status}, "
+                                    f"attempt {attempt + 1}/{MAX_RETRIES}"
+                                )
+                                if last_attempt:
+                                    stats["failures"] += 1
+                                    error_text = await response.text()
+                                    logger.error(f"Weather API failed after retries: {response.status} - {error_text}")
+                                    return None
+                            else:
+                                # Non-retryable error
+                                stats["failures"] += 1
+                                error_text = await response.text()
+                                logger.error(f"Weather API error: {response.status} - {error_text}")
+                                return None
+
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Weather API timeout, attempt {attempt + 1}/{MAX_RETRIES}"
+                    )
+                    if last_attempt:
+                        stats["failures"] += 1
+                        logger.error("Weather API failed: timeout after all retries")
                         return None
 
-            except asyncio.TimeoutError:
-                logger.warning(
-                    f"Weather API timeout, attempt {attempt + 1}/{MAX_RETRIES}"
-                )
-                if attempt < MAX_RETRIES - 1:
-                    self._stats["retries"] += 1
-                    await asyncio.sleep(RETRY_DELAYS[attempt])
-                    continue
-                else:
-                    self._stats["failures"] += 1
-                    logger.error("Weather API failed: timeout after all retries")
-                    return None
+                except aiohttp.ClientError as e:
+                    logger.warning(
+                        f"Weather API connection error: {e}, attempt {attempt + 1}/{MAX_RETRIES}"
+                    )
+                    if last_attempt:
+                        stats["failures"] += 1
+                        logger.error(f"Weather API failed: {e}")
+                        return None
 
-            except aiohttp.ClientError as e:
-                logger.warning(
-                    f"Weather API connection error: {e}, attempt {attempt + 1}/{MAX_RETRIES}"
-                )
-                if attempt < MAX_RETRIES - 1:
-                    self._stats["retries"] += 1
-                    await asyncio.sleep(RETRY_DELAYS[attempt])
-                    continue
-                else:
-                    self._stats["failures"] += 1
-                    logger.error(f"Weather API failed: {e}")
+                except Exception as e:
+                    stats["failures"] += 1
+                    logger.error(f"Weather API unexpected error: {e}")
                     return None
 
-            except Exception as e:
-                self._stats["failures"] += 1
-                logger.error(f"Weather API unexpected error: {e}")
-                return None
+                # Backoff semaphore dışında beklenir, slot diğer isteklere kalsın
+                retries += 1
+                await asyncio.sleep(RETRY_DELAYS[attempt])
 
-        self._stats["failures"] += 1
-        return None
+            stats["failures"] += 1
+            return None
+        finally:
+            stats["retries"] += retries
 
     def _is_cache_valid(self) -> bool:
         """Check if cache is still valid (within TTL)"""
@@ -186,6 +221,84 @@ class WeatherConnector(BaseConnector):
             return False
         return datetime.now() - self._cache_time < self._cache_ttl
 
+    async def _fetch_onecall(self) -> bool:
+        """
+        One Call API ile current + daily forecast'i tek istekte al ve cache'le
+
+        Returns:
+            Başarılı ise True
+        """
+        params = {
+            "lat": self.lat,
+            "lon": self.lon,
+            "appid": self.api_key,
+            "units": "metric",
+            "lang": "tr",
+            "exclude": "minutely,hourly,alerts"
+        }
+
+        # Yakın zamanda başarısız olduysa retry zincirini tekrar çalıştırma
+        if time.monotonic() < self._failure_deadline:
+            logger.debug("Weather API in failure backoff, skipping request")
+            return False
+
+        data = await self._request_with_retry("", params, base_url=self.ONECALL_URL)
+        if not data:
+            self._failure_deadline = time.monotonic() + self._failure_ttl
+            return False
+
+        self._failure_deadline = 0.0
+
+        self._cache = self._parse_current(data)
+        self._forecast_cache = self._parse_daily(data)
+        self._cache_time = datetime.now()
+        return True
+
+    def _parse_current(self, data: dict) -> WeatherData:
+        """One Call yanıtından WeatherData oluştur"""
+        current = data.get("current", {})
+        weather = (current.get("weather") or [{}])[0]
+        daily = data.get("daily") or [{}]
+        today = daily[0]
+        today_temp = today.get("temp", {})
+        pop = today.get("pop")
+
+        return WeatherData(
+            temperature=current.get("temp"),
+            humidity=current.get("humidity"),
+            description=weather.get("description", ""),
+            wind_speed=current.get("wind_speed"),
+            clouds=current.get("clouds"),
+            timestamp=datetime.now(),
+            location=self.location_name,
+            forecast_high=today_temp.get("max"),
+            forecast_low=today_temp.get("min"),
+            rain_probability=pop * 100 if pop is not None else None
+        )
+
+    def _parse_daily(self, data: dict) -> List[dict]:
+        """One Call yanıtındaki daily listesini sadeleştir"""
+        forecasts = []
+        for item in data.get("daily", []):
+            dt = datetime.fromtimestamp(item.get("dt", 0), tz=_UTC)
+            temp = item.get("temp", {})
+            weather = (item.get("weather") or [{}])[0]
+            pop = item.get("pop", 0)
+
+            forecasts.append({
+                "datetime": dt.isoformat(timespec="seconds"),
+                "temperature": temp.get("day"),
+                "temp_min": temp.get("min"),
+                "temp_max": temp.get("max"),
+                "humidity": item.get("humidity"),
+                "description": weather.get("description", ""),
+                "wind_speed": item.get("wind_speed"),
+                "clouds": item.get("clouds"),
+                "rain_probability": pop * 100  # Convert to percentage
+            })
+
+        return forecasts
+
     async def get_current_weather(self, force_refresh: bool = False) -> Optional[WeatherData]:
         """
         Get current weather with cache support
@@ -202,41 +315,8 @@ class WeatherConnector(BaseConnector):
             logger.debug("Weather cache hit")
             return self._cache
 
-        params = {
-            "lat": self.lat,
-            "lon": self.lon,
-            "appid": self.api_key,
-            "units": "metric",
-            "lang": "tr"
-        }
-
-        data = await self._request_with_retry("/weather", params)
-
-        if data:
-            # Parse response
-            main = data.get("main", {})
-            weather = data.get("weather", [{}])[0]
-            wind = data.get("wind", {})
-            clouds = data.get("clouds", {})
-
-            weather_data = WeatherData(
-                temperature=main.get("temp"),
-                humidity=main.get("humidity"),
-                description=weather.get("description", ""),
-                wind_speed=wind.get("speed"),
-                clouds=clouds.get("all"),
-                timestamp=datetime.now(),
-                location=data.get("name", ""),
-                forecast_high=main.get("temp_max"),
-                forecast_low=main.get("temp_min"),
-                rain_probability=None  # Current weather doesn't include this
-            )
-
-            # Update cache
-            self._cache = weather_data
-            self._cache_time = datetime.now()
-
-            return weather_data
+        if await self._fetch_onecall():
+            return self._cache
 
         # Graceful degradation: return stale cache on failure
         if self._cache is not None:
@@ -247,48 +327,24 @@ class WeatherConnector(BaseConnector):
 
     async def get_forecast(self, days: int = 3) -> Optional[List[dict]]:
         """
-        5-day forecast with simplified response
+        Daily forecast with simplified response
+
+        get_current_weather ile aynı One Call yanıtını paylaşır; cache geçerliyse
+        ek HTTP isteği yapılmaz.
 
         Args:
-            days: Number of days (max 5)
+            days: Number of days (max 8)
 
         Returns:
             List of forecast dicts or None on failure
         """
-        params = {
-            "lat": self.lat,
-            "lon": self.lon,
-            "appid": self.api_key,
-            "units": "metric",
-            "lang": "tr",
-            "cnt": min(days * 8, 40)  # 8 entries per day (3-hour intervals)
-        }
+        if self._is_cache_valid() and self._forecast_cache is not None:
+            self._stats["cache_hits"] += 1
+            logger.debug("Forecast cache hit")
+            return self._forecast_cache[:days]
 
-        data = await self._request_with_retry("/forecast", params)
-
-        if data:
-            forecasts = []
-            for item in data.get("list", []):
-                dt = datetime.fromtimestamp(item.get("dt", 0))
-                main = item.get("main", {})
-                weather = item.get("weather", [{}])[0]
-                wind = item.get("wind", {})
-                clouds = item.get("clouds", {})
-                pop = item.get("pop", 0)
-
-                forecasts.append({
-                    "datetime": dt.isoformat(),
-                    "temperature": main.get("temp"),
-                    "temp_min": main.get("temp_min"),
-                    "temp_max": main.get("temp_max"),
-                    "humidity": main.get("humidity"),
-                    "description": weather.get("description", ""),
-                    "wind_speed": wind.get("speed"),
-                    "clouds": clouds.get("all"),
-                    "rain_probability": pop * 100  # Convert to percentage
-                })
-
-            return forecasts
+        if await self._fetch_onecall():
+            return self._forecast_cache[:days]
 
         return None
 
@@ -338,12 +394,15 @@ class WeatherConnector(BaseConnector):
         Returns:
             Normalize edilmiş hava durumu verisi
         """
-        weather_data = await self.get_current_weather()
+        # Cache geçerliyse ikinci coroutine'e girmeden doğrudan dön
+        if self._is_cache_valid():
+            self._stats["cache_hits"] += 1
+            return self._map_weather_data_to_dict(self._cache)
 
+        weather_data = await self.get_current_weather()
         if weather_data:
             return self._map_weather_data_to_dict(weather_data)
-        else:
-            return {"error": "Failed to get weather data"}
+        return {"error": "Failed to get weather data"}
 
     def _map_weather_data_to_dict(self, weather_data: WeatherData) -> dict:
         """Convert WeatherData to legacy dict format"""
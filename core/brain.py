@@ -10,9 +10,10 @@ Bu modül tüm sistemi koordine eder:
 
 import logging
 import asyncio
-import uuid
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import itertools
+import secrets
+from typing import Optional, Dict, Any, Callable, List, Tuple
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 from .claude_runner import ClaudeRunner, ClaudeResponse, FallbackDecisionMaker
@@ -25,6 +26,26 @@ from actions import ActionExecutor, RelayController
 logger = logging.getLogger(__name__)
 
 
+def _iso_now() -> str:
+    """UTC zaman damgası ('Z' son ekli ISO 8601)"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+# thoughts.json'a yazılan ham Claude çıktısının üst sınırı
+MAX_THOUGHT_OUTPUT_CHARS = 1000
+
+# Kayıt ID'leri sadece log/karar korelasyonu için; process nonce + sayaç yeterli.
+# Nonce 32 bit (eski uuid4()[:8] kadar): sayaç her başlangıçta sıfırlandığından
+# restart'lar arası çakışmayı nonce önler
+_ID_NONCE = secrets.token_hex(4)
+_ID_COUNTER = itertools.count()
+
+
+def _short_id() -> str:
+    """14 karakterlik kayıt ID'si (8 hex nonce + 6 hex sayaç)"""
+    return f"{_ID_NONCE}{next(_ID_COUNTER):06x}"
+
+
 class SeraBrain:
     """Ana orchestrator sınıfı"""
 
@@ -69,8 +90,10 @@ class SeraBrain:
         brain_config = self.settings.get("brain", {})
         self.cycle_interval = brain_config.get("cycle_interval_seconds", 300)
         self.claude_timeout = brain_config.get("claude_timeout_seconds", 120)
+        self.pretty_prompt = brain_config.get("pretty_prompt_json", False)
         self.max_retries = brain_config.get("max_retries", 3)
         self.decision_limits = brain_config.get("decision_limits", {})
+        self.write_linger = brain_config.get("write_linger_ms", 200) / 1000
 
         # Components (lazily initialized)
         self.data_collector: Optional[DataCollector] = None
@@ -87,6 +110,10 @@ class SeraBrain:
         self._last_cycle_time: Optional[datetime] = None
         self._last_decision: Optional[ClaudeResponse] = None
 
+        # State write-back kuyruğu (sadece brain çalışırken aktif)
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
         if self.dry_run:
             logger.info("SeraBrain initialized [DRY-RUN MODE]")
         else:
@@ -115,7 +142,7 @@ class SeraBrain:
                 logger.warning("DataCollector connector initialization partial failure")
                 # Don't fail completely, some connectors may work
         except Exception as e:
-            logger.error(f"DataCollector initialization failed: {e}")
+            logger.error("DataCollector initialization failed: %s", e)
             success = False
 
         # Initialize ClaudeRunner
@@ -123,11 +150,12 @@ class SeraBrain:
             try:
                 self.claude_runner = ClaudeRunner(
                     timeout=self.claude_timeout,
-                    max_retries=self.max_retries
+                    max_retries=self.max_retries,
+                    pretty_context=self.pretty_prompt
                 )
                 logger.info("ClaudeRunner initialized")
             except Exception as e:
-                logger.error(f"ClaudeRunner initialization failed: {e}")
+                logger.error("ClaudeRunner initialization failed: %s", e)
                 self.claude_runner = None
 
         # Initialize FallbackDecisionMaker
@@ -195,7 +223,7 @@ class SeraBrain:
             interval_seconds=self._calculate_seconds_until_midnight(),
             run_immediately=False
         )
-        logger.info(f"Daily reset task scheduled (first run in {self._calculate_seconds_until_midnight()} seconds)")
+        logger.info("Daily reset task scheduled (first run in %s seconds)", self._calculate_seconds_until_midnight())
 
         logger.info("Scheduled tasks configured")
 
@@ -219,7 +247,7 @@ class SeraBrain:
                 self.scheduler.tasks["daily_reset"].interval_seconds = 86400
                 logger.debug("Daily reset interval set to 24 hours")
         except Exception as e:
-            logger.error(f"Daily reset failed: {e}")
+            logger.error("Daily reset failed: %s", e)
 
     async def start(self) -> None:
         """Brain döngüsünü başlat"""
@@ -232,6 +260,10 @@ class SeraBrain:
 
         self.is_running = True
 
+        # Döngü yan yazımlarını toplayan writer
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_back_loop(self._write_queue))
+
         # Scheduler'ı başlat
         if self.scheduler:
             await self.scheduler.start()
@@ -249,6 +281,13 @@ class SeraBrain:
         if self.scheduler:
             await self.scheduler.stop()
 
+        # Bekleyen state yazımlarını diske aktar
+        await self._stop_write_back()
+
+        # Yarım kalan Claude sürecini kapat
+        if self.claude_runner:
+            await self.claude_runner.close()
+
         # RelayController'ı kapat
         if self.relay_controller:
             await self.relay_controller.shutdown()
@@ -266,30 +305,32 @@ class SeraBrain:
         Returns:
             Döngü sonucu (decision, thoughts, actions)
         """
+        now_iso = _iso_now()
+
         # Check mode before proceeding
         try:
             device_states = self.state_manager.read("device_states")
             mode = device_states.get("mode", {}).get("current", "auto")
             if mode != "auto":
-                logger.info(f"Cycle skipped - mode is {mode}")
+                logger.info("Cycle skipped - mode is %s", mode)
                 return {
                     "cycle_id": f"skipped_{datetime.now().strftime('%H%M%S')}",
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "timestamp": now_iso,
                     "success": True,
                     "skipped": True,
                     "reason": f"Mode is {mode}"
                 }
         except Exception as e:
-            logger.warning(f"Could not check mode: {e}")
+            logger.warning("Could not check mode: %s", e)
 
         self._cycle_count += 1
         cycle_id = f"cycle_{self._cycle_count}_{datetime.now().strftime('%H%M%S')}"
 
-        logger.info(f"Starting brain cycle: {cycle_id}")
+        logger.info("Starting brain cycle: %s", cycle_id)
 
         result = {
             "cycle_id": cycle_id,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": now_iso,
             "success": False,
             "decision": None,
             "reasoning": None,
@@ -301,7 +342,7 @@ class SeraBrain:
             context = await self._collect_context()
             if not context or "error" in context:
                 result["error"] = context.get("error", "Failed to collect context")
-                logger.error(f"Context collection failed: {result['error']}")
+                logger.error("Context collection failed: %s", result['error'])
                 return result
 
             # 2. Karar ver
@@ -314,22 +355,22 @@ class SeraBrain:
                 result["analysis"] = decision_result.analysis
 
                 # 3. Kararı işle
-                await self._process_decision(decision_result)
+                await self._process_decision(decision_result, now_iso)
 
                 # 4. Kaydet
-                await self._save_decision(decision_result, cycle_id)
+                await self._save_decision(decision_result, cycle_id, now_iso)
 
                 self._last_decision = decision_result
-                self._last_cycle_time = datetime.utcnow()
+                self._last_cycle_time = datetime.now(timezone.utc).replace(tzinfo=None)
 
-                logger.info(f"Cycle {cycle_id} completed: {decision_result.decision.get('action', 'none')}")
+                logger.info("Cycle %s completed: %s", cycle_id, decision_result.decision.get('action', 'none'))
             else:
                 result["error"] = decision_result.error
-                logger.warning(f"Cycle {cycle_id} decision failed: {decision_result.error}")
+                logger.warning("Cycle %s decision failed: %s", cycle_id, decision_result.error)
 
         except Exception as e:
             result["error"] = str(e)
-            logger.error(f"Cycle {cycle_id} failed with exception: {e}")
+            logger.error("Cycle %s failed with exception: %s", cycle_id, e)
 
         return result
 
@@ -357,9 +398,9 @@ class SeraBrain:
                 if result.success:
                     logger.info("Decision made by Claude")
                     return result
-                logger.warning(f"Claude failed: {result.error}")
+                logger.warning("Claude failed: %s", result.error)
             except Exception as e:
-                logger.error(f"Claude exception: {e}")
+                logger.error("Claude exception: %s", e)
 
         # Fallback dene
         if self.use_fallback and self.fallback_maker:
@@ -372,12 +413,13 @@ class SeraBrain:
             error="No decision maker available"
         )
 
-    async def _process_decision(self, result: ClaudeResponse) -> None:
+    async def _process_decision(self, result: ClaudeResponse, now_iso: Optional[str] = None) -> None:
         """
         Kararı pending_actions'a ekle
 
         Args:
             result: Karar sonucu
+            now_iso: Döngü zaman damgası (verilmezse şimdi)
         """
         if not result.success or not result.decision:
             return
@@ -391,89 +433,166 @@ class SeraBrain:
 
         # Action'ı pending_actions'a ekle
         pending_action = {
-            "id": str(uuid.uuid4())[:8],
+            "id": _short_id(),
             "action": action,
             "device": decision.get("device"),
             "duration_minutes": decision.get("duration_minutes"),
             "reason": decision.get("reason"),
             "confidence": decision.get("confidence"),
-            "created_at": datetime.utcnow().isoformat() + "Z",
+            "created_at": now_iso or _iso_now(),
             "status": "pending"
         }
 
         try:
-            device_state = self.state_manager.read("device_states")
-            pending = device_state.get("pending_actions", [])
-            pending.append(pending_action)
+            def _queue(state: dict) -> None:
+                state.setdefault("pending_actions", []).append(pending_action)
 
-            self.state_manager.update("device_states", {
-                "pending_actions": pending,
-                "timestamp": datetime.utcnow().isoformat() + "Z"
-            })
+            self._write_state("device_states", _queue)
 
-            logger.info(f"Action queued: {action} for {decision.get('device')}")
+            logger.info("Action queued: %s for %s", action, decision.get('device'))
 
         except Exception as e:
-            logger.error(f"Failed to queue action: {e}")
+            logger.error("Failed to queue action: %s", e)
 
-    async def _save_decision(self, result: ClaudeResponse, cycle_id: str) -> None:
+    async def _save_decision(
+        self,
+        result: ClaudeResponse,
+        cycle_id: str,
+        now_iso: Optional[str] = None
+    ) -> None:
         """
         Kararı state'e kaydet
 
         Args:
             result: Karar sonucu
             cycle_id: Döngü ID'si
+            now_iso: Döngü zaman damgası (verilmezse şimdi)
         """
+        now_iso = now_iso or _iso_now()
+
         try:
             # Save to decisions.json
             decision_entry = {
-                "id": str(uuid.uuid4())[:8],
+                "id": _short_id(),
                 "cycle_id": cycle_id,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "timestamp": now_iso,
                 "decision": result.decision,
                 "analysis": result.analysis,
                 "confidence": result.decision.get("confidence") if result.decision else None,
-                "source": "fallback" if "[Fallback" in result.raw_output else "claude"
+                "source": result.source
             }
 
-            self.state_manager.append_to_list(
-                "decisions",
-                "decisions",
-                decision_entry,
-                max_items=100  # Son 100 karar
-            )
+            # Kararı ekle ve istatistikleri güncelle (tek okuma + tek yazma)
+            def _record_decision(state: dict) -> None:
+                decisions = state.setdefault("decisions", [])
+                decisions.append(decision_entry)
+                if len(decisions) > 100:  # Son 100 karar
+                    state["decisions"] = decisions[-100:]
 
-            # Update stats
-            decisions_state = self.state_manager.read("decisions")
-            stats = decisions_state.get("stats", {})
-            stats["total_decisions"] = stats.get("total_decisions", 0) + 1
-            stats["last_decision_id"] = decision_entry["id"]
+                stats = state.setdefault("stats", {})
+                stats["total_decisions"] = stats.get("total_decisions", 0) + 1
+                stats["last_decision_id"] = decision_entry["id"]
+                state["last_updated"] = now_iso
 
-            self.state_manager.update("decisions", {
-                "stats": stats,
-                "last_updated": datetime.utcnow().isoformat() + "Z"
-            })
+            self._write_state("decisions", _record_decision)
 
             # Save reasoning to thoughts.json
             thought_entry = {
-                "id": str(uuid.uuid4())[:8],
+                "id": _short_id(),
                 "cycle_id": cycle_id,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "timestamp": now_iso,
                 "reasoning": result.reasoning,
-                "raw_output": result.raw_output[:1000] if result.raw_output else None  # Truncate
+                "raw_output": self._truncate_raw_output(result.raw_output)
             }
 
-            self.state_manager.append_to_list(
-                "thoughts",
-                "thoughts",
-                thought_entry,
-                max_items=50  # Son 50 düşünce
-            )
+            def _record_thought(state: dict) -> None:
+                thoughts = state.setdefault("thoughts", [])
+                thoughts.append(thought_entry)
+                if len(thoughts) > 50:  # Son 50 düşünce
+                    state["thoughts"] = thoughts[-50:]
 
-            logger.debug(f"Decision and thoughts saved for cycle {cycle_id}")
+            self._write_state("thoughts", _record_thought)
+
+            logger.debug("Decision and thoughts saved for cycle %s", cycle_id)
 
         except Exception as e:
-            logger.error(f"Failed to save decision: {e}")
+            logger.error("Failed to save decision: %s", e)
+
+    def _write_state(self, state_name: str, fn: Callable[[dict], None]) -> None:
+        """
+        State değişikliğini uygula
+
+        Brain çalışırken write-back kuyruğuna atılır ve toplu yazılır;
+        aksi halde hemen tek mutate ile yazılır.
+
+        Args:
+            state_name: State dosya adı
+            fn: State'i in-place değiştiren fonksiyon
+        """
+        if self._write_queue is not None:
+            self._write_queue.put_nowait((state_name, fn))
+        else:
+            self.state_manager.mutate(state_name, fn)
+
+    async def _write_back_loop(self, queue: asyncio.Queue) -> None:
+        """Kuyruktaki yazımları kısa bir bekleme ile toplayıp dosya başına bir kez yaz"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            # Aynı döngünün diğer yazımlarının gelmesini bekle
+            await asyncio.sleep(self.write_linger)
+
+            batch = [item]
+            stop = False
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush_writes(batch)
+            if stop:
+                return
+
+    def _flush_writes(self, batch: List[Tuple[str, Callable[[dict], None]]]) -> None:
+        """Yazımları state dosyasına göre grupla ve her dosyayı bir kez yaz"""
+        grouped: Dict[str, List[Callable[[dict], None]]] = {}
+        for state_name, fn in batch:
+            grouped.setdefault(state_name, []).append(fn)
+
+        for state_name, fns in grouped.items():
+            def _apply(state: dict, fns=fns) -> None:
+                for fn in fns:
+                    fn(state)
+
+            try:
+                self.state_manager.mutate(state_name, _apply)
+            except Exception as e:
+                logger.error("Failed to write %s: %s", state_name, e)
+
+    async def _stop_write_back(self) -> None:
+        """Writer'ı durdur; kuyrukta kalanlar yazılır"""
+        if self._write_queue is None:
+            return
+
+        self._write_queue.put_nowait(None)
+        if self._writer_task:
+            await self._writer_task
+
+        self._write_queue = None
+        self._writer_task = None
+
+    @staticmethod
+    def _truncate_raw_output(raw_output: str) -> Optional[str]:
+        """thoughts.json için ham çıktıyı kısalt (kısa çıktı olduğu gibi döner)"""
+        if not raw_output:
+            return None
+        if len(raw_output) > MAX_THOUGHT_OUTPUT_CHARS:
+            return raw_output[:MAX_THOUGHT_OUTPUT_CHARS]
+        return raw_output
 
     async def _update_weather(self) -> dict:
         """Weather güncelleme görevi"""
@@ -489,7 +608,7 @@ class SeraBrain:
             İşlem sonucu
         """
         result = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _iso_now(),
             "processed": 0,
             "shutoffs": []
         }
@@ -508,10 +627,10 @@ class SeraBrain:
             result["shutoffs"] = shutoffs
 
             if results or shutoffs:
-                logger.info(f"Executor cycle: {len(results)} actions processed, {len(shutoffs)} shutoffs triggered")
+                logger.info("Executor cycle: %s actions processed, %s shutoffs triggered", len(results), len(shutoffs))
 
         except Exception as e:
-            logger.error(f"Executor cycle error: {e}")
+            logger.error("Executor cycle error: %s", e)
             result["error"] = str(e)
 
         return result
@@ -6,16 +6,44 @@ Claude Code CLI'ı çağıran modül
 
 import subprocess
 import asyncio
+import functools
 import logging
-import json
+import operator
+import os
 import re
-from typing import Optional, Any
+from typing import Optional, Any, Iterable, List
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from utils import json_utils
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_SYSTEM_PROMPT = "Sen bir sera yönetim AI agent'ısın."
+
+# build_prompt'un context sonrası sabit kısmı
+_PROMPT_SUFFIX = (
+    "\n```\n\n---\n\n"
+    "Yukarıdaki verileri analiz et ve karar ver. "
+    "Çıktını mutlaka belirtilen JSON formatında ver.\n"
+)
+
+# Yanıt parse regex'leri (modül yüklenirken bir kez derlenir)
+_JSON_FENCE_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r'\{.*"decision".*\}', re.DOTALL)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_prompt_cached(path_str: str, mtime: float) -> str:
+    """
+    Prompt şablonunu diskten oku (process başına bir kez)
+
+    mtime cache anahtarının parçası; dosya değişirse yeniden okunur.
+    """
+    with open(path_str, 'r', encoding='utf-8') as f:
+        return f.read()
+
 
 @dataclass
 class ClaudeResponse:
@@ -28,35 +56,52 @@ class ClaudeResponse:
     error: Optional[str] = None
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
     execution_time_ms: int = 0
+    source: str = "claude"  # "claude" veya "fallback"
+
+
+def _consume_result(future: asyncio.Future) -> None:
+    """Tamamlanan future'ın sonucunu/hatasını al (loglanmamış exception uyarısını önler)"""
+    if not future.cancelled():
+        future.exception()
 
 
 class ClaudeRunner:
     """Claude Code CLI wrapper"""
 
-    def __init__(self, timeout: int = 120, max_retries: int = 3):
+    def __init__(self, timeout: int = 120, max_retries: int = 3, pretty_context: bool = False):
         """
         Claude Runner'ı başlat
 
         Args:
             timeout: Maksimum çalışma süresi (saniye)
             max_retries: Hata durumunda tekrar deneme sayısı
+            pretty_context: Context JSON'u girintili yaz (debug için; token maliyeti artar)
         """
         self.timeout = timeout
         self.max_retries = max_retries
-        self.prompt_template_path = Path("prompts/sera_agent.md")
+        self.pretty_context = pretty_context
+        self.prompt_template_path = Path("prompts/sera_agent.md").resolve()
         self._system_prompt: Optional[str] = None
+        self._prompt_source: Optional[str] = None
+        self._prompt_prefix: str = ""
+
+        # Aynı anda tek CLI süreci (scheduler + manuel tetikleme çakışmasın)
+        self._lock = asyncio.Lock()
+        self._process: Optional[asyncio.subprocess.Process] = None
+        # close() sonrası yeni CLI süreci başlatılmaz (retry dahil)
+        self._closed = False
         logger.info("ClaudeRunner initialized")
 
     def _load_system_prompt(self) -> str:
-        """Sistem prompt'unu yükle (lazy loading)"""
-        if self._system_prompt is None:
-            try:
-                with open(self.prompt_template_path, 'r', encoding='utf-8') as f:
-                    self._system_prompt = f.read()
-                logger.debug("Loaded system prompt from sera_agent.md")
-            except FileNotFoundError:
-                logger.warning(f"System prompt not found: {self.prompt_template_path}")
-                self._system_prompt = "Sen bir sera yönetim AI agent'ısın."
+        """Sistem prompt'unu yükle (process genelinde cache'li)"""
+        path_str = str(self.prompt_template_path)
+        try:
+            mtime = os.stat(path_str).st_mtime
+            self._system_prompt = _load_prompt_cached(path_str, mtime)
+        except FileNotFoundError:
+            if self._system_prompt is None:
+                logger.warning("System prompt not found: %s", self.prompt_template_path)
+            self._system_prompt = DEFAULT_SYSTEM_PROMPT
         return self._system_prompt
 
     def build_prompt(self, context: dict) -> str:
@@ -71,24 +116,15 @@ class ClaudeRunner:
         """
         system_prompt = self._load_system_prompt()
 
-        # Context'i JSON formatında ekle
-        context_json = json.dumps(context, indent=2, ensure_ascii=False)
-
-        prompt = f"""{system_prompt}
-
----
-
-## GÜNCEL VERİLER
+        # Sabit kısımlar sistem prompt'u değişene kadar yeniden kurulmaz
+        if system_prompt is not self._prompt_source:
+            self._prompt_prefix = f"{system_prompt}\n\n---\n\n## GÜNCEL VERİLER\n\n```json\n"
+            self._prompt_source = system_prompt
 
-```json
-{context_json}
-```
-
----
+        # Context'i JSON formatında ekle
+        context_json = json_utils.dumps(context, indent=self.pretty_context)
 
-Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON formatında ver.
-"""
-        return prompt
+        return "".join((self._prompt_prefix, context_json, _PROMPT_SUFFIX))
 
     async def run(self, context: dict) -> ClaudeResponse:
         """
@@ -103,11 +139,15 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
         prompt = self.build_prompt(context)
 
         for attempt in range(self.max_retries):
+            if self._closed:
+                return ClaudeResponse(success=False, error="Claude runner closed", raw_output="")
+
             try:
-                logger.info(f"Running Claude Code (attempt {attempt + 1}/{self.max_retries})")
+                logger.info("Running Claude Code (attempt %s/%s)", attempt + 1, self.max_retries)
                 start_time = datetime.now()
 
-                raw_output = await self._execute_claude(prompt)
+                async with self._lock:
+                    raw_output = await self._execute_claude(prompt)
 
                 execution_time = int((datetime.now() - start_time).total_seconds() * 1000)
 
@@ -115,16 +155,16 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
                 response.execution_time_ms = execution_time
 
                 if response.success:
-                    logger.info(f"Claude Code succeeded in {execution_time}ms")
+                    logger.info("Claude Code succeeded in %sms", execution_time)
                     return response
 
                 # Parse başarısız, retry
-                logger.warning(f"Parse failed on attempt {attempt + 1}: {response.error}")
+                logger.warning("Parse failed on attempt %s: %s", attempt + 1, response.error)
 
             except asyncio.TimeoutError:
-                logger.error(f"Claude Code timeout on attempt {attempt + 1}")
+                logger.error("Claude Code timeout on attempt %s", attempt + 1)
             except Exception as e:
-                logger.error(f"Claude Code error on attempt {attempt + 1}: {e}")
+                logger.error("Claude Code error on attempt %s: %s", attempt + 1, e)
 
         # Tüm denemeler başarısız
         return ClaudeResponse(
@@ -143,9 +183,10 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
         Returns:
             Ham CLI çıktısı
         """
+        # Prompt argv yerine stdin'den verilir (ARG_MAX sınırı ve exec kopyası yok)
         cmd = [
             "claude",
-            "-p", prompt,
+            "-p",
             "--output-format", "text",
             "--max-turns", "1"
         ]
@@ -153,27 +194,86 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
         # Run subprocess asynchronously
         process = await asyncio.create_subprocess_exec(
             *cmd,
+            stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
+        self._process = process
+
+        gathered = asyncio.gather(
+            self._write_stdin(process.stdin, prompt.encode('utf-8')),
+            self._read_stream(process.stdout),
+            self._read_stream(process.stderr),
+            process.wait()
+        )
+        # Timeout/iptal sonrası gather'ın sonucu da alınır ("exception was never retrieved" olmasın)
+        gathered.add_done_callback(_consume_result)
 
         try:
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=self.timeout
-            )
+            _, stdout, stderr, _ = await asyncio.wait_for(gathered, timeout=self.timeout)
 
             if process.returncode != 0:
                 error_msg = stderr.decode('utf-8', errors='replace')
-                logger.error(f"Claude CLI error: {error_msg}")
+                logger.error("Claude CLI error: %s", error_msg)
                 raise RuntimeError(f"Claude CLI failed: {error_msg}")
 
             return stdout.decode('utf-8', errors='replace')
 
-        except asyncio.TimeoutError:
-            process.kill()
-            await process.wait()
-            raise
+        finally:
+            # Timeout, iptal (shutdown) veya beklenmeyen hata: süreç geride bırakılmaz
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            self._process = None
+
+    async def close(self) -> None:
+        """Çalışan CLI sürecini sonlandır ve yeni çalıştırmaları durdur (shutdown sırasında)"""
+        self._closed = True
+        process = self._process
+        if process is None or process.returncode is not None:
+            return
+
+        logger.info("Terminating running Claude CLI process")
+        process.kill()
+        await process.wait()
+
+    @staticmethod
+    async def _write_stdin(stream: Optional[asyncio.StreamWriter], data: bytes) -> None:
+        """Prompt'u stdin'e yaz ve kapat (EOF)"""
+        if stream is None:
+            return
+
+        try:
+            stream.write(data)
+            await stream.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # Süreç erken çıktı; hata returncode/stderr üzerinden raporlanır
+            pass
+        finally:
+            stream.close()
+
+    @staticmethod
+    async def _read_stream(stream: Optional[asyncio.StreamReader], chunk_size: int = 65536) -> bytearray:
+        """
+        Pipe'ı parça parça oku
+
+        Args:
+            stream: Subprocess stdout/stderr reader
+            chunk_size: Okuma başına maksimum byte
+
+        Returns:
+            Okunan veri
+        """
+        buffer = bytearray()
+        if stream is None:
+            return buffer
+
+        while True:
+            chunk = await stream.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+        return buffer
 
     def parse_response(self, raw_output: str) -> ClaudeResponse:
         """
@@ -193,12 +293,14 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
             )
 
         # JSON bloğunu bul (```json ... ``` veya sadece {...})
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', raw_output)
+        json_match = _JSON_FENCE_RE.search(raw_output)
         if json_match:
             json_str = json_match.group(1)
         else:
-            # Doğrudan JSON objesi ara
-            json_match = re.search(r'\{[\s\S]*"decision"[\s\S]*\}', raw_output)
+            # Doğrudan JSON objesi ara ("decision" yoksa regex taramasına gerek yok)
+            json_match = None
+            if '"decision"' in raw_output:
+                json_match = _JSON_OBJECT_RE.search(raw_output)
             if json_match:
                 json_str = json_match.group(0)
             else:
@@ -209,8 +311,8 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
                 )
 
         try:
-            parsed = json.loads(json_str)
-        except json.JSONDecodeError as e:
+            parsed = json_utils.loads(json_str)
+        except json_utils.JSONDecodeError as e:
             return ClaudeResponse(
                 success=False,
                 raw_output=raw_output,
@@ -279,9 +381,68 @@ Yukarıdaki verileri analiz et ve karar ver. Çıktını mutlaka belirtilen JSON
         return " | ".join(parts) if parts else "Reasoning oluşturulamadı"
 
 
+@dataclass(slots=True, frozen=True)
+class _Thresholds:
+    """Fallback için düzleştirilmiş eşikler (config'den bir kez çözülür)"""
+    temp_crit_hi: float = 38.0
+    temp_warn_hi: float = 32.0
+    temp_warn_lo: float = 15.0
+    hum_warn_hi: float = 90.0
+    soil_crit_lo: float = 20.0
+    soil_warn_lo: float = 30.0
+    soil_warn_hi: float = 80.0
+
+    # alan -> (sensor, thresholds.yaml anahtarı)
+    _CONFIG_KEYS = {
+        "temp_crit_hi": ("temperature", "critical_high"),
+        "temp_warn_hi": ("temperature", "warning_high"),
+        "temp_warn_lo": ("temperature", "warning_low"),
+        "hum_warn_hi": ("humidity", "warning_high"),
+        "soil_crit_lo": ("soil_moisture", "critical_low"),
+        "soil_warn_lo": ("soil_moisture", "warning_low"),
+        "soil_warn_hi": ("soil_moisture", "warning_high"),
+    }
+
+    @classmethod
+    def from_config(cls, threshold_config: dict) -> "_Thresholds":
+        """thresholds.yaml içeriğinden oluştur (eksik değerler varsayılan kalır)"""
+        values = {}
+        for field_name, (sensor_key, thresh_key) in cls._CONFIG_KEYS.items():
+            value = threshold_config.get(sensor_key, {}).get(thresh_key)
+            if value is not None:
+                values[field_name] = value
+        return cls(**values)
+
+
 class FallbackDecisionMaker:
     """Claude çalışmazsa threshold-based kararlar"""
 
+    # Kural tablosu: sensor -> (_Thresholds alanı, karşılaştırma, cihaz, aksiyon,
+    # sebep formatı, endişe formatı, süre dk).
+    # Sensör içinde ilk eşleşen kural geçerli; tablo sırası = öncelik.
+    _RULES = (
+        ("temperature", (
+            ("temp_crit_hi", operator.ge, "fan_01", "fan_on",
+             "Kritik sıcaklık: {}°C", "Kritik sıcaklık ({}°C)", None),
+            ("temp_warn_hi", operator.ge, "fan_01", "fan_on",
+             "Yüksek sıcaklık: {}°C", "Yüksek sıcaklık ({}°C)", None),
+            ("temp_warn_lo", operator.le, "fan_01", "fan_off",
+             "Düşük sıcaklık: {}°C", None, None),
+        )),
+        ("humidity", (
+            ("hum_warn_hi", operator.ge, "fan_01", "fan_on",
+             "Yüksek nem: %{}", "Yüksek nem (%{})", None),
+        )),
+        ("soil_moisture", (
+            ("soil_crit_lo", operator.le, "pump_01", "pump_on",
+             "Kritik toprak nemi: %{}", "Kritik toprak nemi (%{})", 15),
+            ("soil_warn_lo", operator.le, "pump_01", "pump_on",
+             "Düşük toprak nemi: %{}", "Düşük toprak nemi (%{})", 10),
+            ("soil_warn_hi", operator.ge, "pump_01", "pump_off",
+             "Yüksek toprak nemi: %{}", None, None),
+        )),
+    )
+
     def __init__(self, threshold_config: dict):
         """
         Fallback karar vericiyi başlat
@@ -290,8 +451,22 @@ class FallbackDecisionMaker:
             threshold_config: thresholds.yaml içeriği
         """
         self.thresholds = threshold_config
+        self.t = _Thresholds.from_config(threshold_config)
+        self._compiled_rules = self._compile_rules(self.t)
         logger.info("FallbackDecisionMaker initialized")
 
+    @classmethod
+    def _compile_rules(cls, thresholds: _Thresholds) -> tuple:
+        """Kural tablosunu eşik değerleriyle bir kez birleştir"""
+        return tuple(
+            (sensor_key, tuple(
+                (op, getattr(thresholds, field_name), device, action,
+                 reason_fmt, concern_fmt, duration)
+                for field_name, op, device, action, reason_fmt, concern_fmt, duration in rules
+            ))
+            for sensor_key, rules in cls._RULES
+        )
+
     def make_decision(self, sensor_data: dict) -> ClaudeResponse:
         """
         Threshold'lara göre karar ver
@@ -305,69 +480,27 @@ class FallbackDecisionMaker:
         actions = []
         concerns = []
 
-        # Temperature check
-        temp = sensor_data.get("temperature", {}).get("value")
-        if temp is not None:
-            temp_thresh = self.thresholds.get("temperature", {})
-            if temp >= temp_thresh.get("critical_high", 38):
-                actions.append({
-                    "device": "fan_01",
-                    "action": "fan_on",
-                    "reason": f"Kritik sıcaklık: {temp}°C"
-                })
-                concerns.append(f"Kritik sıcaklık ({temp}°C)")
-            elif temp >= temp_thresh.get("warning_high", 32):
-                actions.append({
-                    "device": "fan_01",
-                    "action": "fan_on",
-                    "reason": f"Yüksek sıcaklık: {temp}°C"
-                })
-                concerns.append(f"Yüksek sıcaklık ({temp}°C)")
-            elif temp <= temp_thresh.get("warning_low", 15):
-                actions.append({
-                    "device": "fan_01",
-                    "action": "fan_off",
-                    "reason": f"Düşük sıcaklık: {temp}°C"
-                })
-
-        # Humidity check
-        humidity = sensor_data.get("humidity", {}).get("value")
-        if humidity is not None:
-            hum_thresh = self.thresholds.get("humidity", {})
-            if humidity >= hum_thresh.get("warning_high", 90):
-                actions.append({
-                    "device": "fan_01",
-                    "action": "fan_on",
-                    "reason": f"Yüksek nem: %{humidity}"
-                })
-                concerns.append(f"Yüksek nem (%{humidity})")
-
-        # Soil moisture check
-        soil = sensor_data.get("soil_moisture", {}).get("value")
-        if soil is not None:
-            soil_thresh = self.thresholds.get("soil_moisture", {})
-            if soil <= soil_thresh.get("critical_low", 20):
-                actions.append({
-                    "device": "pump_01",
-                    "action": "pump_on",
-                    "duration_minutes": 15,
-                    "reason": f"Kritik toprak nemi: %{soil}"
-                })
-                concerns.append(f"Kritik toprak nemi (%{soil})")
-            elif soil <= soil_thresh.get("warning_low", 30):
-                actions.append({
-                    "device": "pump_01",
-                    "action": "pump_on",
-                    "duration_minutes": 10,
-                    "reason": f"Düşük toprak nemi: %{soil}"
-                })
-                concerns.append(f"Düşük toprak nemi (%{soil})")
-            elif soil >= soil_thresh.get("warning_high", 80):
-                actions.append({
-                    "device": "pump_01",
-                    "action": "pump_off",
-                    "reason": f"Yüksek toprak nemi: %{soil}"
-                })
+        for sensor_key, rules in self._compiled_rules:
+            value = sensor_data.get(sensor_key, {}).get("value")
+            if value is None:
+                continue
+
+            for op, bound, device, action, reason_fmt, concern_fmt, duration in rules:
+                if not op(value, bound):
+                    continue
+
+                entry = {
+                    "device": device,
+                    "action": action,
+                    "reason": reason_fmt.format(value)
+                }
+                if duration is not None:
+                    entry["duration_minutes"] = duration
+                actions.append(entry)
+
+                if concern_fmt:
+                    concerns.append(concern_fmt.format(value))
+                break
 
         # En öncelikli aksiyonu seç
         if actions:
@@ -398,12 +531,25 @@ class FallbackDecisionMaker:
 
         return ClaudeResponse(
             success=True,
-            raw_output="[Fallback Decision]",
             analysis=analysis,
             decision=decision,
-            reasoning=reasoning
+            reasoning=reasoning,
+            source="fallback"
         )
 
+    def make_decisions(self, readings: Iterable[dict]) -> List[ClaudeResponse]:
+        """
+        Birden fazla sensör okuması için toplu karar (log replay / backfill)
+
+        Args:
+            readings: make_decision'a verilecek sensör verileri
+
+        Returns:
+            Her okuma için ClaudeResponse listesi
+        """
+        make_decision = self.make_decision
+        return [make_decision(sensor_data) for sensor_data in readings]
+
     def _build_reasoning(self, concerns: list, decision: dict) -> str:
         """Reasoning string oluştur"""
         parts = ["[FALLBACK MODE]"]
@@ -6,8 +6,11 @@ Tüm veri kaynaklarını toplayan modül
 
 import logging
 import asyncio
+import copy
+import os
+from contextvars import ContextVar
 from typing import Optional, Callable, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 from connectors import TTSMQTTConnector, WeatherConnector
@@ -17,6 +20,35 @@ from utils.config_loader import get_config_loader
 
 logger = logging.getLogger(__name__)
 
+# İşlenmekte olan MQTT mesajının özeti; mesaj başına tek log kaydı üretmek için.
+# gather ile açılan callback task'ları context'i kopyalar, aynı dict'i paylaşır.
+_msg_ctx: ContextVar[Optional[dict]] = ContextVar("sensor_msg_ctx", default=None)
+
+
+# Trend takibi yapılan sensörler (state güncellemesi ve context tahminleri)
+TREND_NAMES: tuple[str, ...] = ("temperature", "humidity", "soil_moisture")
+
+
+def _empty_context() -> dict:
+    """collect_context iskeleti; her çağrıda yeni boş dict/list'lerle kurulur"""
+    return {
+        "timestamp": "",
+        "sensors": {},
+        "trends": {},
+        "weather": {},
+        "device_states": {},
+        "recent_decisions": []
+    }
+
+
+def _report_error(message: str, error: Exception) -> None:
+    """Hatayı aktif mesaj özetine ekle; mesaj dışında ise doğrudan logla"""
+    ctx = _msg_ctx.get()
+    if ctx is None:
+        logger.error("%s: %s", message, error)
+    else:
+        ctx["errors"].append(f"{message}: {error}")
+
 
 class DataCollector:
     """Sensör ve hava verisi toplayan modül"""
@@ -51,8 +83,25 @@ class DataCollector:
         self.sensor_processor = SensorProcessor(self.device_config, self.threshold_config)
         self.trend_analyzer = TrendAnalyzer(window_hours=6, min_samples=3)
 
-        # Callbacks
-        self._sensor_callbacks: list[Callable] = []
+        # Callbacks: (callback, is_coroutine) - async kontrolü kayıtta bir kez yapılır
+        self._sensor_callbacks: list[tuple[Callable, bool]] = []
+        self._callback_sem = asyncio.Semaphore(
+            self.settings.get("tts", {}).get("max_concurrent_callbacks", 8)
+        )
+
+        # current state için dirty-flag + periyodik flush
+        self._current_dirty: dict = {}
+        self._flush_event = asyncio.Event()
+        self._flush_stopping = False
+        self._flusher_task: Optional[asyncio.Task] = None
+        self.state_flush_interval = self.settings.get("tts", {}).get("state_flush_ms", 250) / 1000
+
+        # Aynı loop tick'indeki çağrılar için ISO timestamp cache'i (sonraki tick'te silinir)
+        self._ts_cache: Optional[str] = None
+
+        # collect_context memo'ları
+        # state adı -> ((mtime_ns, size, inode), state dict); dict paylaşılır, değiştirilmemeli
+        self._state_cache: dict[str, tuple[tuple[int, int, int], dict]] = {}
 
         # State
         self._last_weather_update: Optional[datetime] = None
@@ -91,7 +140,7 @@ class DataCollector:
                 logger.error("MQTT connection failed")
                 success = False
         except Exception as e:
-            logger.error(f"MQTT initialization error: {e}")
+            logger.error("MQTT initialization error: %s", e)
             success = False
 
         # Weather Connector
@@ -101,29 +150,40 @@ class DataCollector:
             await self.weather_connector.connect()
             logger.info("Weather connector initialized")
         except Exception as e:
-            logger.error(f"Weather initialization error: {e}")
+            logger.error("Weather initialization error: %s", e)
             # Weather is optional, don't fail completely
             self.weather_connector = None
 
+        self.start_state_flusher()
+
         self._initialized = True
         return success
 
+    def start_state_flusher(self) -> None:
+        """Sensör state güncellemelerini biriktirip toplu yazan task'ı başlat"""
+        if self._flusher_task is not None:
+            return
+        self._flush_stopping = False
+        self._flusher_task = asyncio.create_task(self._flush_loop())
+
     async def shutdown(self) -> None:
         """Bağlantıları kapat"""
+        await self._stop_state_flusher()
+
         if self.mqtt_connector:
             try:
                 await self.mqtt_connector.stop_listening()
                 await self.mqtt_connector.disconnect()
                 logger.info("MQTT connector disconnected")
             except Exception as e:
-                logger.error(f"MQTT disconnect error: {e}")
+                logger.error("MQTT disconnect error: %s", e)
 
         if self.weather_connector:
             try:
                 await self.weather_connector.disconnect()
                 logger.info("Weather connector disconnected")
             except Exception as e:
-                logger.error(f"Weather disconnect error: {e}")
+                logger.error("Weather disconnect error: %s", e)
 
         self._initialized = False
 
@@ -134,7 +194,7 @@ class DataCollector:
         Args:
             callback: Callback fonksiyonu (sync veya async)
         """
-        self._sensor_callbacks.append(callback)
+        self._sensor_callbacks.append((callback, asyncio.iscoroutinefunction(callback)))
 
     async def _on_sensor_message(self, raw_message: dict) -> None:
         """
@@ -143,6 +203,9 @@ class DataCollector:
         Args:
             raw_message: Ham TTS mesajı
         """
+        ctx = {"device_id": raw_message.get("device_id"), "processed": False, "measurements": 0, "errors": []}
+        token = _msg_ctx.set(ctx)
+
         try:
             # TTS mesajını parse et
             payload = raw_message.get("payload", {})
@@ -150,13 +213,15 @@ class DataCollector:
             # Process sensor data
             processed = self.sensor_processor.process(payload)
             if not processed:
-                logger.warning("Could not process sensor message")
                 return
 
-            logger.debug(f"Processed sensor data from {processed.get('device_id')}")
+            ctx["processed"] = True
+            ctx["device_id"] = processed.get("device_id")
+            measurements = processed.get("measurements", [])
+            ctx["measurements"] = len(measurements)
 
             # Update trend analyzer
-            for measurement in processed.get("measurements", []):
+            for measurement in measurements:
                 name = measurement.get("name")
                 value = measurement.get("value")
                 if name and value is not None:
@@ -165,18 +230,60 @@ class DataCollector:
             # Update state
             await self._update_sensor_state(processed)
 
-            # Call registered callbacks
-            for callback in self._sensor_callbacks:
+            # Call registered callbacks: sync olanlar sırayla, async olanlar paralel
+            pending = []
+            for callback, is_coroutine in self._sensor_callbacks:
+                if is_coroutine:
+                    pending.append(self._run_async_callback(callback, processed))
+                    continue
                 try:
-                    if asyncio.iscoroutinefunction(callback):
-                        await callback(processed)
-                    else:
-                        callback(processed)
+                    callback(processed)
                 except Exception as e:
-                    logger.error(f"Sensor callback error: {e}")
+                    _report_error("Sensor callback error", e)
+
+            if pending:
+                await asyncio.gather(*pending)
 
         except Exception as e:
-            logger.error(f"Error processing sensor message: {e}")
+            _report_error("Error processing sensor message", e)
+
+        finally:
+            _msg_ctx.reset(token)
+            self._log_message_summary(ctx)
+
+    @staticmethod
+    def _log_message_summary(ctx: dict) -> None:
+        """Mesaj başına tek log kaydı (hata > işlenemedi > debug önceliğiyle)"""
+        if ctx["errors"]:
+            level = logging.ERROR
+        elif not ctx["processed"]:
+            level = logging.WARNING
+        else:
+            level = logging.DEBUG
+
+        if logger.isEnabledFor(level):
+            logger.log(
+                level,
+                "Sensor message from %s: processed=%s, measurements=%d, errors=%s",
+                ctx["device_id"], ctx["processed"], ctx["measurements"], ctx["errors"] or None,
+                extra={"sensor_msg": ctx}
+            )
+
+    async def _run_async_callback(self, callback: Callable, processed: dict) -> None:
+        """
+        Async callback'i concurrency limiti altında çalıştır
+
+        Hata mesaj özetine eklenir ve yutulur; bir callback'in hatası diğerlerini iptal etmez.
+
+        Args:
+            callback: Async callback
+            processed: İşlenmiş sensör verisi
+        """
+        async with self._callback_sem:
+            try:
+                await callback(processed)
+            except Exception as e:
+                _report_error("Sensor callback error", e)
 
     async def _update_sensor_state(self, processed: dict) -> None:
         """
@@ -186,12 +293,11 @@ class DataCollector:
             processed: İşlenmiş sensör verisi
         """
         try:
-            updates = {"timestamp": datetime.utcnow().isoformat() + "Z"}
-
+            sensors_delta = {}
             for measurement in processed.get("measurements", []):
                 name = measurement.get("name")
                 if name:
-                    updates[f"sensors.{name}"] = {
+                    sensors_delta[name] = {
                         "value": measurement.get("value"),
                         "unit": measurement.get("unit"),
                         "status": measurement.get("status"),
@@ -199,19 +305,74 @@ class DataCollector:
                     }
 
             # Also update trends
-            for name in ["temperature", "humidity", "soil_moisture"]:
+            trends_delta = {}
+            for name in TREND_NAMES:
                 trend = self.trend_analyzer.get_trend(name)
-                updates[f"trends.{name}"] = {
+                trends_delta[name] = {
                     "direction": trend.get("direction"),
                     "rate": trend.get("rate"),
                     "rate_formatted": trend.get("rate_formatted")
                 }
 
-            self.state_manager.update("current", updates)
-            logger.debug("Sensor state updated")
+            timestamp = self._now_iso()
 
+            if self._flusher_task is not None:
+                # Flusher çalışıyorsa sadece dirty'ye işle; yazım flush'ta yapılır
+                dirty = self._current_dirty
+                dirty["timestamp"] = timestamp
+                dirty.setdefault("sensors", {}).update(sensors_delta)
+                dirty.setdefault("trends", {}).update(trends_delta)
+                self._flush_event.set()
+                return
+
+            # İç içe tek güncelleme; deep merge diğer sensörleri korur
+            updates = {
+                "timestamp": timestamp,
+                "sensors": sensors_delta,
+                "trends": trends_delta
+            }
+            await asyncio.to_thread(self.state_manager.update, "current", updates)
+
+        except Exception as e:
+            _report_error("Error updating sensor state", e)
+
+    async def _flush_loop(self) -> None:
+        """Dirty current state'i kısa bir bekleme ile toplayıp tek yazımla diske aktar"""
+        while True:
+            await self._flush_event.wait()
+            if not self._flush_stopping:
+                # Aynı burst'teki diğer mesajların gelmesini bekle
+                await asyncio.sleep(self.state_flush_interval)
+            self._flush_event.clear()
+            await self._flush_current()
+            if self._flush_stopping:
+                return
+
+    async def _flush_current(self) -> None:
+        """Biriken sensör güncellemelerini current state'e yaz"""
+        if not self._current_dirty:
+            return
+        dirty, self._current_dirty = self._current_dirty, {}
+        try:
+            await asyncio.to_thread(self.state_manager.update, "current", dirty)
+            logger.debug("Sensor state flushed")
+        except Exception as e:
+            logger.error("Error flushing sensor state: %s", e)
+
+    async def _stop_state_flusher(self) -> None:
+        """Flusher'ı durdur; bekleyen güncellemeler son bir kez yazılır"""
+        task = self._flusher_task
+        if task is None:
+            return
+        self._flush_stopping = True
+        self._flush_event.set()
+        try:
+            await task
         except Exception as e:
-            logger.error(f"Error updating sensor state: {e}")
+            logger.error("State flusher error: %s", e)
+        self._flusher_task = None
+        # Son flush sırasında gelmiş olabilecek güncellemeler
+        await self._flush_current()
 
     async def update_weather(self) -> dict:
         """
@@ -243,18 +404,20 @@ class DataCollector:
 
             # Update state
             if result["current"] or result["forecast"]:
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                ts = now.isoformat() + "Z"
                 weather_state = {
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "timestamp": ts,
                     "current": result["current"],
                     "forecast": result["forecast"],
-                    "last_update": datetime.utcnow().isoformat() + "Z"
+                    "last_update": ts
                 }
-                self.state_manager.write("weather", weather_state)
-                self._last_weather_update = datetime.utcnow()
+                await asyncio.to_thread(self.state_manager.write, "weather", weather_state)
+                self._last_weather_update = now
                 logger.info("Weather data updated")
 
         except Exception as e:
-            logger.error(f"Error updating weather: {e}")
+            logger.error("Error updating weather: %s", e)
             result["error"] = str(e)
 
         return result
@@ -266,63 +429,132 @@ class DataCollector:
         Returns:
             Context dictionary
         """
-        context = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "sensors": {},
-            "trends": {},
-            "weather": {},
-            "device_states": {},
-            "recent_decisions": []
-        }
+        context = _empty_context()
+        context["timestamp"] = self._now_iso()
 
         try:
+            # Dosya okumaları tek seferde worker thread'de; event loop bloklanmaz
+            states = await asyncio.to_thread(self._read_context_states)
+
             # Current sensor state
-            current_state = self.state_manager.read("current")
+            current_state = states["current"]
             context["sensors"] = current_state.get("sensors", {})
-            context["trends"] = current_state.get("trends", {})
             context["data_quality"] = current_state.get("data_quality", {})
 
+            trends = current_state.get("trends", {})
+
             # Add predictions from trend analyzer
-            for sensor_type in ["temperature", "humidity", "soil_moisture"]:
+            for sensor_type in TREND_NAMES:
+                # predict() yeni örnek yoksa cache'ten döner
                 prediction = self.trend_analyzer.predict(sensor_type, hours_ahead=3)
                 if prediction:
-                    if sensor_type not in context["trends"]:
-                        context["trends"][sensor_type] = {}
-                    context["trends"][sensor_type]["prediction_3h"] = prediction
+                    trends[sensor_type] = {**trends.get(sensor_type, {}), "prediction_3h": prediction}
+            context["trends"] = trends
 
             # Weather data
-            try:
-                weather_state = self.state_manager.read("weather")
+            weather_state = states["weather"]
+            if weather_state is not None:
                 context["weather"] = {
                     "current": weather_state.get("current"),
                     "forecast": weather_state.get("forecast"),
                     "last_update": weather_state.get("last_update")
                 }
-            except FileNotFoundError:
-                logger.debug("Weather state not found")
 
             # Device states
-            try:
-                device_state = self.state_manager.read("device_states")
+            device_state = states["device_states"]
+            if device_state is not None:
                 context["device_states"] = device_state.get("devices", {})
                 context["pending_actions"] = device_state.get("pending_actions", [])
-            except FileNotFoundError:
-                logger.debug("Device state not found")
 
             # Recent decisions (last 5)
-            try:
-                decisions_state = self.state_manager.read("decisions")
+            decisions_state = states["decisions"]
+            if decisions_state is not None:
                 all_decisions = decisions_state.get("decisions", [])
                 context["recent_decisions"] = all_decisions[-5:] if all_decisions else []
-            except FileNotFoundError:
-                logger.debug("Decisions state not found")
 
         except Exception as e:
-            logger.error(f"Error collecting context: {e}")
+            logger.error("Error collecting context: %s", e)
             context["error"] = str(e)
 
         return context
 
+    def _now_iso(self) -> str:
+        """
+        UTC ISO timestamp ("...Z"); aynı loop tick'indeki çağrılar aynı string'i paylaşır
+
+        Returns:
+            ISO 8601 timestamp
+        """
+        cached = self._ts_cache
+        if cached is not None:
+            return cached
+        cached = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        try:
+            # Cache bir sonraki loop iterasyonunda düşer
+            asyncio.get_running_loop().call_soon(self._clear_ts_cache)
+        except RuntimeError:
+            return cached  # Loop dışında: cache'lenmez
+        self._ts_cache = cached
+        return cached
+
+    def _clear_ts_cache(self) -> None:
+        """Tick sonunda timestamp cache'ini düşür"""
+        self._ts_cache = None
+
+    def _read_context_states(self) -> dict[str, Optional[dict]]:
+        """
+        collect_context için state dosyalarını oku (worker thread'de çalışır)
+
+        Dönen dict'ler cache'in kopyasıdır; context'i değiştiren tüketici cache'i bozmaz.
+
+        Returns:
+            State adı -> state dict (opsiyonel dosya yoksa None)
+
+        Raises:
+            FileNotFoundError: current state yoksa
+        """
+        states = {"current": self._cached_read("current")}
+        for state_name in ("weather", "device_states", "decisions"):
+            try:
+                states[state_name] = self._cached_read(state_name)
+            except FileNotFoundError:
+                logger.debug("%s state not found", state_name)
+                states[state_name] = None
+        return copy.deepcopy(states)
+
+    def _cached_read(self, state_name: str) -> dict:
+        """
+        State dosyasını mtime/boyut/inode değişmediyse cache'ten oku
+
+        Dönen dict paylaşılır, değiştirilmemeli.
+
+        Args:
+            state_name: State dosya adı
+
+        Returns:
+            State dictionary
+
+        Raises:
+            FileNotFoundError: State dosyası ve template'i yoksa
+        """
+        try:
+            st = os.stat(self.state_manager.path_for(state_name))
+        except FileNotFoundError:
+            # Dosya yok: template'den oluşturmayı state_manager dener
+            self._state_cache.pop(state_name, None)
+            return self.state_manager.read(state_name)
+
+        # StateManager tmp + os.replace ile yazar: her yazım yeni inode getirir, aynı boyut
+        # ve mtime çözünürlüğü içindeki yeniden yazım da cache'i geçersiz kılar
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self._state_cache.get(state_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        state = self.state_manager.read(state_name)
+        self._state_cache[state_name] = (key, state)
+        return state
+
     def get_mqtt_status(self) -> dict:
         """MQTT bağlantı durumunu al"""
         if not self.mqtt_connector:
@@ -6,6 +6,9 @@ Periyodik görevleri zamanlayan modül
 
 import logging
 import asyncio
+import heapq
+import itertools
+import time
 from typing import Callable, Optional, Any, Awaitable, Union
 from datetime import datetime
 from enum import Enum
@@ -23,7 +26,7 @@ class TaskStatus(Enum):
     CANCELLED = "cancelled"
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskStats:
     """Görev istatistikleri"""
     run_count: int = 0
@@ -33,11 +36,22 @@ class TaskStats:
     last_success: Optional[datetime] = None
     last_failure: Optional[datetime] = None
     last_error: Optional[str] = None
-    total_duration_ms: int = 0
-    avg_duration_ms: float = 0.0
+    total_duration_ns: int = 0  # Başarılı çalışmaların toplam süresi (int ns)
 
+    @property
+    def total_duration_ms(self) -> int:
+        """Toplam süre (ms)"""
+        return self.total_duration_ns // 1_000_000
 
-@dataclass
+    @property
+    def avg_duration_ms(self) -> float:
+        """Çalışma başına ortalama süre (ms); sadece okunurken hesaplanır"""
+        if not self.run_count:
+            return 0.0
+        return self.total_duration_ns / self.run_count / 1_000_000
+
+
+@dataclass(slots=True)
 class ScheduledTask:
     """Zamanlanmış görev"""
     name: str
@@ -47,7 +61,12 @@ class ScheduledTask:
     run_immediately: bool = False
     status: TaskStatus = TaskStatus.PENDING
     stats: TaskStats = field(default_factory=TaskStats)
-    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+    is_coroutine: bool = field(init=False)  # callback async mı? (bir kez belirlenir)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False, compare=False)
+    _gen: int = field(default=0, repr=False, compare=False)  # Heap girdisi geçerlilik sayacı
+
+    def __post_init__(self) -> None:
+        self.is_coroutine = asyncio.iscoroutinefunction(self.callback)
 
 
 class SeraScheduler:
@@ -64,7 +83,13 @@ class SeraScheduler:
         self.tasks: dict[str, ScheduledTask] = {}
         self.is_running = False
         self._stop_event = asyncio.Event()
-        logger.info(f"SeraScheduler initialized with {default_interval_seconds}s default interval")
+
+        # Tek dispatcher: (next_due_monotonic_ns, seq, task, gen) min-heap
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._wake_event = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        logger.info("SeraScheduler initialized with %ss default interval", default_interval_seconds)
 
     def add_task(
         self,
@@ -88,7 +113,7 @@ class SeraScheduler:
             Başarılı ise True
         """
         if name in self.tasks:
-            logger.warning(f"Task already exists: {name}")
+            logger.warning("Task already exists: %s", name)
             return False
 
         task = ScheduledTask(
@@ -99,11 +124,11 @@ class SeraScheduler:
             run_immediately=run_immediately
         )
         self.tasks[name] = task
-        logger.info(f"Task added: {name} (interval={task.interval_seconds}s, enabled={enabled})")
+        logger.info("Task added: %s (interval=%ss, enabled=%s)", name, task.interval_seconds, enabled)
 
-        # Scheduler çalışıyorsa görevi başlat
+        # Scheduler çalışıyorsa görevi zamanla
         if self.is_running and enabled:
-            task._task = asyncio.create_task(self._task_loop(task))
+            self._schedule_initial(task)
 
         return True
 
@@ -118,17 +143,18 @@ class SeraScheduler:
             Başarılı ise True
         """
         if name not in self.tasks:
-            logger.warning(f"Task not found: {name}")
+            logger.warning("Task not found: %s", name)
             return False
 
         task = self.tasks[name]
+        task._gen += 1  # Heap'teki girdisi geçersiz
 
         # Running task'ı iptal et
         if task._task and not task._task.done():
             task._task.cancel()
 
         del self.tasks[name]
-        logger.info(f"Task removed: {name}")
+        logger.info("Task removed: %s", name)
         return True
 
     def enable_task(self, name: str) -> bool:
@@ -142,7 +168,7 @@ class SeraScheduler:
             Başarılı ise True
         """
         if name not in self.tasks:
-            logger.warning(f"Task not found: {name}")
+            logger.warning("Task not found: %s", name)
             return False
 
         task = self.tasks[name]
@@ -150,11 +176,12 @@ class SeraScheduler:
             return True
 
         task.enabled = True
-        logger.info(f"Task enabled: {name}")
+        logger.info("Task enabled: %s", name)
 
-        # Scheduler çalışıyorsa görevi başlat
+        # Scheduler çalışıyorsa görevi zamanla
         if self.is_running:
-            task._task = asyncio.create_task(self._task_loop(task))
+            task._gen += 1
+            self._schedule_initial(task)
 
         return True
 
@@ -169,18 +196,19 @@ class SeraScheduler:
             Başarılı ise True
         """
         if name not in self.tasks:
-            logger.warning(f"Task not found: {name}")
+            logger.warning("Task not found: %s", name)
             return False
 
         task = self.tasks[name]
         task.enabled = False
+        task._gen += 1  # Heap'teki girdisi geçersiz
 
         # Running task'ı iptal et
         if task._task and not task._task.done():
             task._task.cancel()
             task.status = TaskStatus.CANCELLED
 
-        logger.info(f"Task disabled: {name}")
+        logger.info("Task disabled: %s", name)
         return True
 
     async def run_task_once(self, name: str) -> Optional[Any]:
@@ -194,7 +222,7 @@ class SeraScheduler:
             Callback sonucu veya None (hata durumunda)
         """
         if name not in self.tasks:
-            logger.warning(f"Task not found: {name}")
+            logger.warning("Task not found: %s", name)
             return None
 
         task = self.tasks[name]
@@ -210,74 +238,104 @@ class SeraScheduler:
         Returns:
             Callback sonucu
         """
+        stats = task.stats
         task.status = TaskStatus.RUNNING
-        task.stats.run_count += 1
-        task.stats.last_run = datetime.now()
-
-        start_time = datetime.now()
+        stats.run_count += 1
+        stats.last_run = datetime.now()
+        start_ns = time.monotonic_ns()
 
         try:
             # Sync veya async callback'i çalıştır
-            if asyncio.iscoroutinefunction(task.callback):
+            if task.is_coroutine:
                 result = await task.callback()
             else:
                 result = task.callback()
 
             # Başarılı
-            duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
-            task.stats.success_count += 1
-            task.stats.last_success = datetime.now()
-            task.stats.total_duration_ms += duration_ms
-            task.stats.avg_duration_ms = task.stats.total_duration_ms / task.stats.run_count
+            duration_ns = time.monotonic_ns() - start_ns
+            stats.success_count += 1
+            stats.last_success = datetime.now()
+            stats.total_duration_ns += duration_ns
             task.status = TaskStatus.COMPLETED
 
-            logger.debug(f"Task {task.name} completed in {duration_ms}ms")
+            logger.debug("Task %s completed in %dms", task.name, duration_ns // 1_000_000)
             return result
 
         except asyncio.CancelledError:
             task.status = TaskStatus.CANCELLED
-            logger.info(f"Task {task.name} cancelled")
+            logger.info("Task %s cancelled", task.name)
             raise
         except Exception as e:
-            task.stats.failure_count += 1
-            task.stats.last_failure = datetime.now()
-            task.stats.last_error = str(e)
+            stats.failure_count += 1
+            stats.last_failure = datetime.now()
+            stats.last_error = str(e)
             task.status = TaskStatus.FAILED
 
-            logger.error(f"Task {task.name} failed: {e}")
+            logger.error("Task %s failed: %s", task.name, e)
             return None
 
-    async def _task_loop(self, task: ScheduledTask) -> None:
+    def _push(self, task: ScheduledTask, due_ns: int) -> None:
+        """Görevi heap'e ekle ve dispatcher'ı uyandır (due_ns: monotonic_ns)"""
+        heapq.heappush(self._heap, (due_ns, next(self._seq), task, task._gen))
+        self._wake_event.set()
+
+    @staticmethod
+    def _interval_ns(task: ScheduledTask) -> int:
+        """Görev aralığı (int ns)"""
+        return int(task.interval_seconds * 1_000_000_000)
+
+    def _schedule_initial(self, task: ScheduledTask) -> None:
+        """İlk çalışmayı zamanla (run_immediately ise hemen)"""
+        delay_ns = 0 if task.run_immediately else self._interval_ns(task)
+        self._push(task, time.monotonic_ns() + delay_ns)
+
+    def _is_current(self, task: ScheduledTask, gen: int) -> bool:
+        """Heap girdisi hâlâ geçerli mi? (kaldırılmış/pasif görevler atlanır)"""
+        return (
+            self.is_running
+            and task.enabled
+            and task._gen == gen
+            and self.tasks.get(task.name) is task
+        )
+
+    async def _dispatcher_loop(self) -> None:
+        """Tek timer ile en yakın görevi bekle ve vadesi gelenleri çalıştır"""
+        loop = asyncio.get_running_loop()
+
+        while not self._stop_event.is_set():
+            self._wake_event.clear()
+            now_ns = time.monotonic_ns()
+
+            while self._heap and self._heap[0][0] <= now_ns:
+                _, _, task, gen = heapq.heappop(self._heap)
+                if self._is_current(task, gen):
+                    task._task = asyncio.create_task(self._run_scheduled(task, gen))
+
+            if not self._heap:
+                await self._wake_event.wait()
+                continue
+
+            delay = (self._heap[0][0] - now_ns) / 1_000_000_000
+            handle = loop.call_later(delay, self._wake_event.set)
+            try:
+                await self._wake_event.wait()
+            finally:
+                handle.cancel()
+
+    async def _run_scheduled(self, task: ScheduledTask, gen: int) -> None:
         """
-        Tek bir görev için async döngü
+        Zamanlanmış çalışma; bitince bir sonrakini zamanla
 
-        Args:
-            task: Döngüsü çalıştırılacak görev
+        Interval çalışma bitişinden itibaren sayılır, görev kendisiyle çakışmaz.
         """
         try:
-            # run_immediately ise hemen çalıştır
-            if task.run_immediately:
-                await self._execute_task(task)
-
-            while not self._stop_event.is_set() and task.enabled:
-                try:
-                    # Interval bekle
-                    await asyncio.wait_for(
-                        self._stop_event.wait(),
-                        timeout=task.interval_seconds
-                    )
-                    # Stop event set edildi, çık
-                    break
-                except asyncio.TimeoutError:
-                    # Timeout - normal durum, çalıştır
-                    pass
-
-                if task.enabled and not self._stop_event.is_set():
-                    await self._execute_task(task)
-
+            await self._execute_task(task)
         except asyncio.CancelledError:
-            task.status = TaskStatus.CANCELLED
-            logger.debug(f"Task loop cancelled: {task.name}")
+            logger.debug("Task run cancelled: %s", task.name)
+            return
+
+        if self._is_current(task, gen):
+            self._push(task, time.monotonic_ns() + self._interval_ns(task))
 
     async def start(self) -> None:
         """Tüm görevleri başlat"""
@@ -287,13 +345,15 @@ class SeraScheduler:
 
         self._stop_event.clear()
         self.is_running = True
+        self._heap.clear()
 
-        # Aktif görevleri başlat
+        # Aktif görevleri zamanla
         for task in self.tasks.values():
             if task.enabled:
-                task._task = asyncio.create_task(self._task_loop(task))
+                self._schedule_initial(task)
 
-        logger.info(f"Scheduler started with {len(self.tasks)} tasks")
+        self._dispatcher = asyncio.create_task(self._dispatcher_loop())
+        logger.info("Scheduler started with %s tasks", len(self.tasks))
 
     async def stop(self, timeout: float = 5.0) -> None:
         """
@@ -307,25 +367,26 @@ class SeraScheduler:
 
         self._stop_event.set()
         self.is_running = False
+        self._wake_event.set()
 
-        # Tüm task'ları topla
+        if self._dispatcher:
+            await self._dispatcher
+            self._dispatcher = None
+        self._heap.clear()
+
+        # Çalışmakta olan görevleri topla
         running_tasks = [
             task._task for task in self.tasks.values()
             if task._task and not task._task.done()
         ]
 
         if running_tasks:
-            # Graceful shutdown dene
-            try:
-                await asyncio.wait_for(
-                    asyncio.gather(*running_tasks, return_exceptions=True),
-                    timeout=timeout
-                )
-            except asyncio.TimeoutError:
-                # Zorla iptal et
-                for t in running_tasks:
-                    t.cancel()
-                await asyncio.gather(*running_tasks, return_exceptions=True)
+            # Graceful shutdown dene; süre dolunca kalanları zorla iptal et
+            _, pending = await asyncio.wait(running_tasks, timeout=timeout)
+            for t in pending:
+                t.cancel()
+            # Sonuçları/hataları topla (retrieve edilmemiş exception uyarısı olmasın)
+            await asyncio.gather(*running_tasks, return_exceptions=True)
 
         logger.info("Scheduler stopped")
 
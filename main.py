@@ -6,48 +6,65 @@ __version__ = "0.1.0"
 # === IMPORTS ===
 import argparse
 import asyncio
+import atexit
+import functools
 import logging
+import os
+import queue
 import signal
+import stat
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
-from logging.handlers import RotatingFileHandler
-
-# Rich (console output)
-from rich.console import Console
-from rich.logging import RichHandler
-from rich.table import Table
-from rich.panel import Panel
+from typing import TYPE_CHECKING, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Project imports
 PROJECT_ROOT = Path(__file__).parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from core.brain import SeraBrain
 from utils.config_loader import get_config_loader
 from utils.state_manager import get_state_manager
 
+# Ağır modüller (Rich, SeraBrain) kullanıldıkları fonksiyonlarda import edilir;
+# --version / status gibi hızlı komutlar brain stack'ini yüklemez.
+if TYPE_CHECKING:
+    from rich.console import Console
+    from core.brain import SeraBrain
+
 # === CONSTANTS ===
 LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)-20s | %(message)s"
 LOG_DIR = PROJECT_ROOT / "logs"
 LOG_FILE = "sera.log"
 MAX_BYTES = 5 * 1024 * 1024  # 5MB
 BACKUP_COUNT = 5
+LOG_FLUSH_RECORDS = 64      # Bu kadar kayıtta bir diske flush
+LOG_FLUSH_INTERVAL = 30.0   # veya bu kadar saniyede bir (ERROR+ anında yazılır)
+LOG_SIZE_CHECK_RECORDS = 1000  # Boyut sayacı bu kadar kayıtta bir fstat ile doğrulanır
 
-console = Console()
 logger = logging.getLogger("sera")
 
 
+@functools.lru_cache(maxsize=1)
+def get_console() -> "Console":
+    """Paylaşılan Rich console (ilk kullanımda oluşturulur)"""
+    from rich.console import Console
+    return Console()
+
+
 # === GRACEFUL SHUTDOWN ===
 class GracefulShutdown:
     """Signal handler for graceful shutdown"""
 
     def __init__(self):
         self.shutdown_requested = False
-        self._brain: Optional[SeraBrain] = None
+        self._brain: Optional["SeraBrain"] = None
+        # wait_for_shutdown'da çalışan loop içinde oluşturulur
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
-    def set_brain(self, brain: SeraBrain) -> None:
+    def set_brain(self, brain: "SeraBrain") -> None:
         """Set brain instance for shutdown"""
         self._brain = brain
 
@@ -55,8 +72,20 @@ class GracefulShutdown:
         """Handle SIGINT/SIGTERM"""
         sig_name = signal.Signals(signum).name
         logger.info(f"Received {sig_name}, requesting shutdown...")
-        console.print(f"\n[yellow]Kapatılıyor... ({sig_name})[/yellow]")
+        get_console().print(f"\n[yellow]Kapatılıyor... ({sig_name})[/yellow]")
         self.shutdown_requested = True
+        if self._event is not None and self._loop is not None:
+            # signal.signal veya başka thread'den de güvenli
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait_for_shutdown(self) -> None:
+        """Shutdown istenene kadar bekle (polling yok, sinyalde uyanır)"""
+        if self._event is None:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+        if self.shutdown_requested:
+            return
+        await self._event.wait()
 
     async def shutdown(self, timeout: float = 10.0) -> None:
         """Gracefully shutdown brain with timeout"""
@@ -76,6 +105,132 @@ shutdown_handler = GracefulShutdown()
 
 
 # === LOGGING SETUP ===
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    Her kayıtta flush etmeyen RotatingFileHandler
+
+    Kayıtlar stream buffer'ında birikir; N kayıtta, T saniyede bir veya
+    ERROR ve üstü bir kayıt geldiğinde diske yazılır. Yeni kayıt gelmese de
+    T saniyelik flush'ı FlushingQueueListener tetikler. Dosya boyutu
+    tell()/stat ile değil sayaçla izlenir; sayaç her size_check_records
+    kayıtta bir flush sonrası fstat ile gerçek boyuta eşitlenir (dışarıdan
+    truncate edilen dosya gibi sapmalar için).
+    """
+
+    def __init__(
+        self,
+        filename,
+        flush_records: int = LOG_FLUSH_RECORDS,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        size_check_records: int = LOG_SIZE_CHECK_RECORDS,
+        **kwargs
+    ):
+        super().__init__(filename, **kwargs)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.size_check_records = size_check_records
+        self._pending = 0
+        self._since_size_check = 0
+        self._last_flush = time.monotonic()
+        self._size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg.encode(self.encoding or "utf-8"))
+
+            if self.maxBytes > 0 and self._size > 0 and self._size + size > self.maxBytes:
+                self.doRollover()
+                self._size = 0
+                self._since_size_check = 0
+
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._size += size
+            self._pending += 1
+            self._since_size_check += 1
+
+            now = time.monotonic()
+            if (
+                record.levelno >= logging.ERROR
+                or self._pending >= self.flush_records
+                or now - self._last_flush >= self.flush_interval
+            ):
+                self._flush_pending(now)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _flush_pending(self, now: float) -> None:
+        """Buffer'ı diske yaz, sayaçları sıfırla; gerekirse boyutu fstat ile eşitle"""
+        self.flush()
+        self._pending = 0
+        self._last_flush = now
+        if self._since_size_check >= self.size_check_records:
+            self._size = os.fstat(self.stream.fileno()).st_size
+            self._since_size_check = 0
+
+    def flush_due_in(self) -> Optional[float]:
+        """Bekleyen kayıtların zamanlı flush'ına kalan saniye (bekleyen yoksa None)"""
+        if not self._pending:
+            return None
+        return max(0.0, self._last_flush + self.flush_interval - time.monotonic())
+
+    def flush_if_due(self) -> None:
+        """Zamanı gelmişse bekleyen kayıtları diske yaz (yeni kayıt beklemeden)"""
+        self.acquire()
+        try:
+            now = time.monotonic()
+            if self._pending and now - self._last_flush >= self.flush_interval:
+                self._flush_pending(now)
+        finally:
+            self.release()
+
+
+class FlushingQueueListener(QueueListener):
+    """
+    Kuyruk boşken de buffer'lı handler'ları zamanında flush eden QueueListener
+
+    Kuyruk, en yakın flush zamanına kadar timeout ile beklenir; sessiz bir
+    daemon'da bile buffer'daki kayıtlar flush_interval içinde diske yazılır.
+    """
+
+    def __init__(self, queue_, *handlers, respect_handler_level: bool = False):
+        super().__init__(queue_, *handlers, respect_handler_level=respect_handler_level)
+        self._buffered = tuple(h for h in handlers if isinstance(h, BufferedRotatingFileHandler))
+
+    def dequeue(self, block: bool):
+        while True:
+            due = [d for d in (h.flush_due_in() for h in self._buffered) if d is not None]
+            try:
+                return self.queue.get(block, min(due) if due else None)
+            except queue.Empty:
+                if not block or not due:
+                    raise
+                for handler in self._buffered:
+                    handler.flush_if_due()
+
+
+# Dosya handler'ını besleyen arka plan thread'i (setup_logging başlatır)
+_log_listener: Optional[FlushingQueueListener] = None
+
+
+def stop_logging() -> None:
+    """Log listener'ı durdur; kuyrukta kalan kayıtlar dosyaya yazılır"""
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.flush()
+
+
+atexit.register(stop_logging)
+
+
 def setup_logging(debug: bool) -> None:
     """
     Setup logging with console and file handlers
@@ -83,6 +238,7 @@ def setup_logging(debug: bool) -> None:
     Args:
         debug: Enable DEBUG level logging
     """
+    global _log_listener
     level = logging.DEBUG if debug else logging.INFO
 
     # Create logs directory
@@ -93,11 +249,14 @@ def setup_logging(debug: bool) -> None:
     root_logger.setLevel(level)
 
     # Clear existing handlers
+    stop_logging()
     root_logger.handlers.clear()
 
     # 1. Rich console handler
+    from rich.logging import RichHandler
+
     rich_handler = RichHandler(
-        console=console,
+        console=get_console(),
         show_time=True,
         show_path=debug,
         rich_tracebacks=True,
@@ -106,8 +265,10 @@ def setup_logging(debug: bool) -> None:
     rich_handler.setLevel(level)
     root_logger.addHandler(rich_handler)
 
-    # 2. Rotating file handler
-    file_handler = RotatingFileHandler(
+    # 2. Rotating file handler: arka plan thread'inde, buffer'lı yazım.
+    # Hot path sadece kuyruğa ekler. Rich handler doğrudan kalır; QueueHandler
+    # exc_info'yu string'e çevirdiği için rich traceback'ler kaybolurdu.
+    file_handler = BufferedRotatingFileHandler(
         LOG_DIR / LOG_FILE,
         maxBytes=MAX_BYTES,
         backupCount=BACKUP_COUNT,
@@ -115,7 +276,14 @@ def setup_logging(debug: bool) -> None:
     )
     file_handler.setLevel(level)
     file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    root_logger.addHandler(file_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setLevel(level)
+    root_logger.addHandler(queue_handler)
+
+    _log_listener = FlushingQueueListener(log_queue, file_handler, respect_handler_level=True)
+    _log_listener.start()
 
     # 3. Quiet noisy library loggers
     for lib_logger in ['aiomqtt', 'aiohttp', 'asyncio', 'urllib3']:
@@ -125,13 +293,7 @@ def setup_logging(debug: bool) -> None:
 
 
 # === CLI PARSER ===
-def create_parser() -> argparse.ArgumentParser:
-    """Create argument parser"""
-    parser = argparse.ArgumentParser(
-        prog="sera-otonom",
-        description="Sera Otonom - Akıllı Sera Yönetim Sistemi",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+_EPILOG = """
 Örnekler:
   python main.py --version          Versiyon göster
   python main.py status             Sistem durumunu göster
@@ -139,6 +301,21 @@ def create_parser() -> argparse.ArgumentParser:
   python main.py --dry-run          Komut göndermeden simüle et
   python main.py --no-claude        Fallback mod kullan
         """
+
+
+@functools.lru_cache(maxsize=1)
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Create argument parser
+
+    Parser process başına bir kez oluşturulur; dönen nesne paylaşılır,
+    değiştirilmemelidir (add_argument/set_defaults çağırmayın).
+    """
+    parser = argparse.ArgumentParser(
+        prog="sera-otonom",
+        description="Sera Otonom - Akıllı Sera Yönetim Sistemi",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=_EPILOG
     )
 
     parser.add_argument(
@@ -192,6 +369,14 @@ def create_parser() -> argparse.ArgumentParser:
 
 
 # === HEALTH CHECK ===
+def _stat_mode(path: Path) -> int:
+    """Yolun st_mode'u; yoksa (veya erişilemiyorsa) 0"""
+    try:
+        return os.stat(path).st_mode
+    except OSError:
+        return 0
+
+
 def check_health() -> dict:
     """
     Check system health and required files
@@ -202,40 +387,35 @@ def check_health() -> dict:
     issues = []
     warnings = []
 
+    # Her yol için tek stat: varlık ve tip aynı çağrıdan okunur
     # Check config/settings.yaml
     settings_path = PROJECT_ROOT / "config" / "settings.yaml"
-    if not settings_path.exists():
+    if not stat.S_ISREG(_stat_mode(settings_path)):
         issues.append(f"Config dosyası bulunamadı: {settings_path}")
 
     # Check .env (warning only)
-    env_path = PROJECT_ROOT / ".env"
-    if not env_path.exists():
+    if not _stat_mode(PROJECT_ROOT / ".env"):
         warnings.append(".env dosyası bulunamadı (opsiyonel)")
 
     # Check state/templates/
     templates_path = PROJECT_ROOT / "state" / "templates"
-    if not templates_path.exists():
+    if not stat.S_ISDIR(_stat_mode(templates_path)):
         issues.append(f"Template dizini bulunamadı: {templates_path}")
 
-    # Check MQTT config (warning only)
+    # MQTT ve weather kontrolleri (warning only) - settings tek sefer yüklenir
     try:
-        config_loader = get_config_loader()
-        settings = config_loader.load("settings")
+        settings = get_config_loader().load("settings")
+    except Exception:
+        settings = None  # Will be caught as critical error above
+
+    if settings is not None:
         mqtt_config = settings.get('tts', {}).get('mqtt', {})
         if not mqtt_config.get('broker'):
             warnings.append("MQTT broker yapılandırılmamış")
-    except Exception:
-        pass  # Will be caught as critical error above
 
-    # Check weather API key (warning only)
-    try:
-        config_loader = get_config_loader()
-        settings = config_loader.load("settings")
         weather_key = settings.get('weather', {}).get('api_key')
-        if not weather_key or weather_key.startswith('${'):
+        if not weather_key or str(weather_key).startswith('${'):
             warnings.append("Weather API key yapılandırılmamış")
-    except Exception:
-        pass
 
     # Log warnings
     for warning in warnings:
@@ -249,6 +429,28 @@ def check_health() -> dict:
 
 
 # === STATUS COMMAND ===
+# Cihaz durumu -> (sembol, etiket); bilinmeyen durumlar kapalı gösterilir
+_DEVICE_OFF_MARKUP = ("[red]○[/red]", "KAPALI")
+_DEVICE_STATE_MARKUP = {
+    "on": ("[green]●[/green]", "AÇIK"),
+    "off": _DEVICE_OFF_MARKUP,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _display_name(raw_id: str) -> str:
+    """soil_moisture -> Soil Moisture"""
+    return raw_id.replace('_', ' ').title()
+
+
+def _tree_lines(rows: list) -> str:
+    """Satırları ağaç dalı önekleriyle birleştir (son satır └─)"""
+    last = len(rows) - 1
+    return "\n".join(
+        f"{'└─' if i == last else '├─'} {row}" for i, row in enumerate(rows)
+    )
+
+
 def show_status() -> int:
     """
     Show system status from state files
@@ -258,21 +460,16 @@ def show_status() -> int:
     """
     state_manager = get_state_manager()
 
-    # Read state files
-    try:
-        device_states = state_manager.read("device_states")
-    except Exception:
-        device_states = {}
-
-    try:
-        decisions = state_manager.read("decisions")
-    except Exception:
-        decisions = {}
+    # Read state files (salt okunur görünümler; StateManager orjson ile parse eder)
+    def read_state(name: str) -> dict:
+        try:
+            return state_manager.read_view(name)
+        except Exception:
+            return {}
 
-    try:
-        current = state_manager.read("current")
-    except Exception:
-        current = {}
+    device_states = read_state("device_states")
+    decisions = read_state("decisions")
+    current = read_state("current")
 
     # Build status display
     status_lines = []
@@ -304,7 +501,8 @@ def show_status() -> int:
     conn_lines.append(f"├─ MQTT:           {mqtt_symbol} {mqtt_text}")
 
     # Claude status from last decision
-    last_decision = decisions.get('decisions', [{}])[-1] if decisions.get('decisions') else {}
+    decision_list = decisions.get('decisions')
+    last_decision = decision_list[-1] if decision_list else {}
     claude_active = last_decision.get('source') == 'claude'
     claude_symbol = "[green]●[/green]" if claude_active else "[yellow]○[/yellow]"
     claude_text = "Aktif" if claude_active else "Devre dışı"
@@ -313,45 +511,28 @@ def show_status() -> int:
     conn_content = "\n".join(conn_lines)
 
     # Devices section
-    device_lines = []
     devices = device_states.get('devices', {})
-
+    device_rows = []
     for device_id, device_info in devices.items():
-        state = device_info.get('state', 'off')
-        if state == 'on':
-            symbol = "[green]●[/green]"
-            text = "AÇIK"
-        else:
-            symbol = "[red]○[/red]"
-            text = "KAPALI"
-
-        # Format device name nicely
-        device_name = device_id.replace('_', ' ').title()
-        device_lines.append(f"├─ {device_name:14s} {symbol} {text}")
-
-    # Adjust last item prefix
-    if device_lines:
-        device_lines[-1] = device_lines[-1].replace("├─", "└─")
+        symbol, text = _DEVICE_STATE_MARKUP.get(device_info.get('state', 'off'), _DEVICE_OFF_MARKUP)
+        device_rows.append(f"{_display_name(device_id):14s} {symbol} {text}")
 
-    device_content = "\n".join(device_lines) if device_lines else "└─ Cihaz yok"
+    device_content = _tree_lines(device_rows) if device_rows else "└─ Cihaz yok"
 
     # Sensors section (from current.json)
-    sensor_lines = []
     sensors = current.get('sensors', {})
+    sensor_rows = [
+        f"{_display_name(sensor_name):14s} {sensor_data['value']}{sensor_data.get('unit', '')}"
+        for sensor_name, sensor_data in sensors.items()
+        if sensor_data.get('value') is not None
+    ]
 
-    for sensor_name, sensor_data in sensors.items():
-        value = sensor_data.get('value')
-        unit = sensor_data.get('unit', '')
-        if value is not None:
-            sensor_display = sensor_name.replace('_', ' ').title()
-            sensor_lines.append(f"├─ {sensor_display:14s} {value}{unit}")
-
-    if sensor_lines:
-        sensor_lines[-1] = sensor_lines[-1].replace("├─", "└─")
-
-    sensor_content = "\n".join(sensor_lines) if sensor_lines else "└─ Sensör verisi yok"
+    sensor_content = _tree_lines(sensor_rows) if sensor_rows else "└─ Sensör verisi yok"
 
     # Build full output
+    from rich.panel import Panel
+
+    console = get_console()
     console.print()
     console.print(Panel(
         f"[bold]SERA OTONOM DURUMU[/bold]\n\n"
@@ -380,6 +561,8 @@ async def run_once(args) -> int:
     """
     logger.info("Starting single cycle mode")
 
+    from core.brain import SeraBrain
+
     use_claude = not args.no_claude
     dry_run = args.dry_run
 
@@ -420,6 +603,8 @@ async def run_continuous(args) -> int:
     """
     logger.info("Starting continuous mode")
 
+    from core.brain import SeraBrain
+
     use_claude = not args.no_claude
     dry_run = args.dry_run
 
@@ -442,8 +627,7 @@ async def run_continuous(args) -> int:
         await brain.start()
 
         # Wait for shutdown signal
-        while not shutdown_handler.shutdown_requested:
-            await asyncio.sleep(1)
+        await shutdown_handler.wait_for_shutdown()
 
         logger.info("Shutdown requested, stopping...")
         await shutdown_handler.shutdown()
@@ -504,15 +688,17 @@ def main() -> int:
     if not health['ok']:
         for issue in health['issues']:
             logger.error(f"Kritik: {issue}")
-        console.print("[red]Kritik hatalar nedeniyle başlatılamıyor![/red]")
+        get_console().print("[red]Kritik hatalar nedeniyle başlatılamıyor![/red]")
         return 1
 
     # Run async main
     try:
         return asyncio.run(async_main(args))
     except KeyboardInterrupt:
-        console.print("\n[yellow]Kullanıcı tarafından durduruldu[/yellow]")
+        get_console().print("\n[yellow]Kullanıcı tarafından durduruldu[/yellow]")
         return 130
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
@@ -5,11 +5,87 @@ Ham sensör verilerini normalize eden ve valide eden modül
 """
 
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
+from utils.json_utils import dumps
+
 logger = logging.getLogger(__name__)
 
+# Status önceliği (get_status_summary en kötüsünü seçer)
+_STATUS_RANK = {"normal": 0, "warning": 1, "critical": 2}
+_STATUS_BY_RANK = ("normal", "warning", "critical")
+
+# Eksik metadata için paylaşılan boş dict (salt okunur)
+_EMPTY: dict = {}
+
+# Config içeriği -> önceden derlenmiş tablolar (yeniden oluşturulan processor'lar paylaşır)
+TABLE_CACHE_SIZE = 4
+_TABLE_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _classify(value: float, rules: tuple) -> str:
+    """Önceden çözülmüş eşik tablosuna göre status belirle"""
+    critical_low, critical_high, warning_low, warning_high, optimal_low, optimal_high, has_optimal = rules
+
+    # Critical kontrol
+    if value <= critical_low or value >= critical_high:
+        return "critical"
+
+    # Warning kontrol
+    if value <= warning_low or value >= warning_high:
+        return "warning"
+
+    # Optimal aralıkta mı? Dışındaysa warning değerlerinin içinde ama optimal değil
+    if has_optimal and not (optimal_low <= value <= optimal_high):
+        return "warning"
+
+    return "normal"
+
+
+def _make_extractor(steps: tuple) -> Callable[[dict], List[dict]]:
+    """
+    Bir device için ölçüm çıkarım fonksiyonu oluştur
+
+    steps: (name, decoded_field, unit, valid_range, geçerlilik sınırları, status kuralları)
+    demetleri; sınırlar/kurallar None ise validate()/determine_status() varsayılanı uygulanır.
+    Ölçüm dict'leri, sabit alanları dolu bir şablonun kopyasıdır (dict.copy
+    altı anahtarlı literal kurmaktan ucuzdur).
+    """
+    plan = tuple(
+        (
+            name, decoded_field, bounds, rules,
+            {"name": name, "value": None, "unit": unit, "valid": None, "status": None,
+             "valid_range": valid_range}
+        )
+        for name, decoded_field, unit, valid_range, bounds, rules in steps
+    )
+
+    def extract(decoded_payload: dict) -> List[dict]:
+        measurements: List[dict] = []
+        for name, decoded_field, bounds, rules, template in plan:
+            raw_value = decoded_payload.get(decoded_field)
+            if raw_value is None:
+                continue
+
+            # Değeri float'a çevir
+            try:
+                value = float(raw_value)
+            except (TypeError, ValueError):
+                logger.warning("Invalid value for %s: %s", name, raw_value)
+                continue
+
+            measurement = template.copy()
+            measurement["value"] = value
+            measurement["valid"] = bounds is None or bounds[0] <= value <= bounds[1]
+            measurement["status"] = "normal" if rules is None else _classify(value, rules)
+            measurements.append(measurement)
+        return measurements
+
+    return extract
+
 
 class SensorProcessor:
     """Sensör veri işleyici"""
@@ -24,9 +100,42 @@ class SensorProcessor:
         """
         self.device_config = device_config
         self.threshold_config = threshold_config or {}
-        self._build_sensor_map()
+        # (epoch saniyesi, ISO string): aynı saniyedeki mesajlar aynı string'i kullanır
+        self._ts_cache: Tuple[int, str] = (-1, "")
+        self._load_tables()
         logger.info("SensorProcessor initialized")
 
+    def _load_tables(self) -> None:
+        """
+        Lookup tablolarını oluştur veya aynı config için önbellekten al
+
+        sensor_map/device_id_map her instance'ın kendi device_config'inden kurulur;
+        yalnızca türetilmiş tablolar instance'lar arasında paylaşılır, salt okunur kabul edilir.
+        """
+        self._build_sensor_map()
+        try:
+            key = dumps([self.device_config, self.threshold_config])
+        except TypeError:
+            key = None  # JSON'a çevrilemeyen config: önbelleksiz derle
+
+        tables = _TABLE_CACHE.get(key) if key is not None else None
+        if tables is not None:
+            _TABLE_CACHE.move_to_end(key)
+            (self._valid_range_by_name, self._fallback_range_by_name,
+             self._status_rules, self._extractors) = tables
+            return
+
+        self._build_valid_ranges()
+        self._build_status_rules()
+        self._build_extractors()
+        if key is not None:
+            _TABLE_CACHE[key] = (
+                self._valid_range_by_name, self._fallback_range_by_name,
+                self._status_rules, self._extractors
+            )
+            if len(_TABLE_CACHE) > TABLE_CACHE_SIZE:
+                _TABLE_CACHE.popitem(last=False)
+
     def _build_sensor_map(self) -> None:
         """Device config'den sensör haritası oluştur"""
         self.sensor_map: Dict[str, dict] = {}
@@ -39,6 +148,81 @@ class SensorProcessor:
             if device_id:
                 self.device_id_map[device_id] = sensor_data
 
+    def _build_valid_ranges(self) -> None:
+        """validate() için ölçüm adı -> (alt, üst) geçerlilik aralığı indekslerini oluştur"""
+        # Device config: aynı ada sahip ilk 2 elemanlı valid_range geçerli
+        self._valid_range_by_name: Dict[str, Tuple[float, float]] = {}
+        for sensor_data in self.sensor_map.values():
+            for measurement in sensor_data.get("measurements", []):
+                valid_range = measurement.get("valid_range", [])
+                if len(valid_range) == 2:
+                    self._valid_range_by_name.setdefault(
+                        measurement.get("name"), (valid_range[0], valid_range[1])
+                    )
+
+        # Fallback: critical değerler + %10 margin (sensör hatası payı)
+        self._fallback_range_by_name: Dict[str, Tuple[float, float]] = {}
+        for sensor_type, threshold in self.threshold_config.items():
+            if not isinstance(threshold, dict):
+                continue
+            critical_low = threshold.get("critical_low")
+            critical_high = threshold.get("critical_high")
+            if critical_low is not None and critical_high is not None:
+                margin = (critical_high - critical_low) * 0.1
+                self._fallback_range_by_name[sensor_type] = (critical_low - margin, critical_high + margin)
+
+    def _build_status_rules(self) -> None:
+        """
+        determine_status() için eşik tablosunu önceden çöz
+
+        Eksik eşikler ±inf ile doldurulur; böylece çağrı başına dict.get ve
+        None kontrolü gerekmez. Değer: (crit_low, crit_high, warn_low, warn_high,
+        opt_low, opt_high, optimal_range_var_mı)
+        """
+        inf = float("inf")
+        self._status_rules: Dict[str, Tuple[float, float, float, float, float, float, bool]] = {}
+        for sensor_type, threshold in self.threshold_config.items():
+            if not isinstance(threshold, dict) or not threshold:
+                continue
+
+            def bound(key: str, default: float) -> float:
+                value = threshold.get(key)
+                return default if value is None else value
+
+            optimal_range = threshold.get("optimal_range", [])
+            has_optimal = len(optimal_range) == 2
+            self._status_rules[sensor_type] = (
+                bound("critical_low", -inf),
+                bound("critical_high", inf),
+                bound("warning_low", -inf),
+                bound("warning_high", inf),
+                optimal_range[0] if has_optimal else -inf,
+                optimal_range[1] if has_optimal else inf,
+                has_optimal
+            )
+
+    def _build_extractors(self) -> None:
+        """
+        Device başına ölçüm çıkarım fonksiyonlarını derle
+
+        Geçerlilik aralığı ve status kuralları ölçüm başına önceden çözülür;
+        mesaj başına validate()/determine_status() çağrısı yapılmaz.
+        """
+        self._extractors: Dict[str, Callable[[dict], List[dict]]] = {}
+        for device_id, sensor_data in self.device_id_map.items():
+            steps = []
+            for measurement in sensor_data.get("measurements", []):
+                name = measurement.get("name", "")
+                steps.append((
+                    name,
+                    measurement.get("decoded_field", ""),
+                    measurement.get("unit", ""),
+                    measurement.get("valid_range", []),
+                    self._valid_bounds(name),
+                    self._status_rules.get(name)
+                ))
+            self._extractors[device_id] = _make_extractor(tuple(steps))
+
     def process(self, raw_message: dict) -> Optional[dict]:
         """
         Ham TTS mesajını işle
@@ -49,6 +233,32 @@ class SensorProcessor:
         Returns:
             Normalize edilmiş sensör verisi veya None (hata durumunda)
         """
+        return self._process(raw_message, self._now_iso())
+
+    def process_batch(self, raw_messages: List[dict]) -> List[dict]:
+        """
+        Birden fazla ham TTS mesajını tek seferde işle
+
+        Zaman damgası batch başına bir kez formatlanır; işlenemeyen
+        mesajlar sonuçtan çıkarılır.
+
+        Args:
+            raw_messages: TTS MQTT mesajları
+
+        Returns:
+            Normalize edilmiş sensör verileri (giriş sırasıyla)
+        """
+        now_iso = self._now_iso()
+        process = self._process
+        results = []
+        for raw_message in raw_messages:
+            processed = process(raw_message, now_iso)
+            if processed is not None:
+                results.append(processed)
+        return results
+
+    def _process(self, raw_message: dict, now_iso: str) -> Optional[dict]:
+        """process/process_batch ortak gövdesi; now_iso işlenme zaman damgası"""
         try:
             # TTS mesaj yapısı: end_device_ids, received_at, uplink_message
             device_ids = raw_message.get("end_device_ids", {})
@@ -57,53 +267,27 @@ class SensorProcessor:
 
             uplink = raw_message.get("uplink_message", {})
             decoded_payload = uplink.get("decoded_payload", {})
-            received_at = raw_message.get("received_at", datetime.now().isoformat())
+            received_at = raw_message.get("received_at")
+            if received_at is None:
+                received_at = now_iso
 
             # Device config'den sensör bilgisi al
             sensor_config = self.device_id_map.get(device_id)
             if not sensor_config:
-                logger.warning(f"Unknown device_id: {device_id}")
+                logger.warning("Unknown device_id: %s", device_id)
                 return None
 
-            # Ölçümleri işle
-            measurements: List[dict] = []
-            for measurement in sensor_config.get("measurements", []):
-                measurement_name = measurement.get("name", "")
-                decoded_field = measurement.get("decoded_field", "")
-                valid_range = measurement.get("valid_range", [])
-                unit = measurement.get("unit", "")
-
-                raw_value = decoded_payload.get(decoded_field)
-                if raw_value is None:
-                    continue
-
-                # Değeri float'a çevir
-                try:
-                    value = float(raw_value)
-                except (TypeError, ValueError):
-                    logger.warning(f"Invalid value for {measurement_name}: {raw_value}")
-                    continue
-
-                # Validasyon
-                is_valid = self.validate(measurement_name, value)
-                status = self.determine_status(measurement_name, value)
-
-                measurements.append({
-                    "name": measurement_name,
-                    "value": value,
-                    "unit": unit,
-                    "valid": is_valid,
-                    "status": status,
-                    "valid_range": valid_range
-                })
+            # Ölçümleri device'a özel derlenmiş fonksiyonla işle
+            measurements = self._extractors[device_id](decoded_payload)
 
             if not measurements:
-                logger.warning(f"No valid measurements for device {device_id}")
+                logger.warning("No valid measurements for device %s", device_id)
                 return None
 
             # Metadata
-            rx_metadata = uplink.get("rx_metadata", [{}])
-            first_rx = rx_metadata[0] if rx_metadata else {}
+            rx_metadata = uplink.get("rx_metadata")
+            first_rx = rx_metadata[0] if rx_metadata else _EMPTY
+            gateway_ids = first_rx.get("gateway_ids") or _EMPTY
 
             return {
                 "device_id": device_id,
@@ -111,21 +295,37 @@ class SensorProcessor:
                 "sensor_type": sensor_config.get("type", "unknown"),
                 "location": sensor_config.get("location", "unknown"),
                 "timestamp": received_at,
-                "processed_at": datetime.now().isoformat(),
+                "processed_at": now_iso,
                 "measurements": measurements,
                 "metadata": {
                     "rssi": first_rx.get("rssi"),
                     "snr": first_rx.get("snr"),
-                    "gateway_id": first_rx.get("gateway_ids", {}).get("gateway_id"),
+                    "gateway_id": gateway_ids.get("gateway_id"),
                     "f_cnt": uplink.get("f_cnt"),
                     "f_port": uplink.get("f_port")
                 }
             }
 
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
             return None
 
+    def _now_iso(self) -> str:
+        """
+        Yerel saat ISO timestamp'i (saniye hassasiyeti, saniye başına bir kez formatlanır)
+
+        Returns:
+            ISO 8601 timestamp
+        """
+        t = time.time()
+        second = int(t)
+        cached_second, cached = self._ts_cache
+        if second == cached_second:
+            return cached
+        cached = datetime.fromtimestamp(second).isoformat(timespec="seconds")
+        self._ts_cache = (second, cached)
+        return cached
+
     def validate(self, sensor_type: str, value: Any) -> bool:
         """
         Değerin geçerli aralıkta olup olmadığını kontrol et
@@ -142,25 +342,44 @@ class SensorProcessor:
         except (TypeError, ValueError):
             return False
 
-        # Device config'den valid_range kontrolü
-        for sensor_id, sensor_data in self.sensor_map.items():
-            for measurement in sensor_data.get("measurements", []):
-                if measurement.get("name") == sensor_type:
-                    valid_range = measurement.get("valid_range", [])
-                    if len(valid_range) == 2:
-                        return valid_range[0] <= value <= valid_range[1]
+        valid_range = self._valid_bounds(sensor_type)
+        if valid_range is not None:
+            return valid_range[0] <= value <= valid_range[1]
 
-        # Fallback: threshold config'den kontrol
-        threshold = self.threshold_config.get(sensor_type, {})
-        critical_low = threshold.get("critical_low")
-        critical_high = threshold.get("critical_high")
+        return True  # Config yoksa varsayılan olarak geçerli kabul et
 
-        if critical_low is not None and critical_high is not None:
-            # Critical değerlerin biraz dışında olabilir (sensör hatası için margin)
-            margin = (critical_high - critical_low) * 0.1
-            return (critical_low - margin) <= value <= (critical_high + margin)
+    def validate_many(self, pairs: Iterable[Tuple[str, Any]]) -> List[bool]:
+        """
+        Birden fazla (sensör tipi, değer) çiftini doğrula
 
-        return True  # Config yoksa varsayılan olarak geçerli kabul et
+        Geçerlilik aralığı her sensör tipi için bir kez aranır; sonuçlar
+        tek tek validate() çağrılarıyla aynıdır.
+
+        Args:
+            pairs: (sensor_type, value) çiftleri
+
+        Returns:
+            pairs ile aynı sırada geçerlilik listesi
+        """
+        bounds_by_type: Dict[str, Optional[Tuple[float, float]]] = {}
+        results = []
+        for sensor_type, value in pairs:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                results.append(False)
+                continue
+
+            if sensor_type in bounds_by_type:
+                bounds = bounds_by_type[sensor_type]
+            else:
+                bounds = bounds_by_type[sensor_type] = self._valid_bounds(sensor_type)
+            results.append(bounds is None or bounds[0] <= value <= bounds[1])
+        return results
+
+    def _valid_bounds(self, sensor_type: str) -> Optional[Tuple[float, float]]:
+        """Device config'den valid_range, yoksa threshold config'den margin'li aralık"""
+        return self._valid_range_by_name.get(sensor_type) or self._fallback_range_by_name.get(sensor_type)
 
     def determine_status(self, sensor_type: str, value: Any) -> str:
         """
@@ -178,49 +397,36 @@ class SensorProcessor:
         except (TypeError, ValueError):
             return "unknown"
 
-        threshold = self._get_threshold_config(sensor_type)
-        if not threshold:
+        rules = self._status_rules.get(sensor_type)
+        if rules is None:
             return "normal"  # Config yoksa normal kabul et
 
-        optimal_range = threshold.get("optimal_range", [])
-        warning_low = threshold.get("warning_low")
-        warning_high = threshold.get("warning_high")
-        critical_low = threshold.get("critical_low")
-        critical_high = threshold.get("critical_high")
-
-        # Critical kontrol
-        if critical_low is not None and value <= critical_low:
-            return "critical"
-        if critical_high is not None and value >= critical_high:
-            return "critical"
-
-        # Warning kontrol
-        if warning_low is not None and value <= warning_low:
-            return "warning"
-        if warning_high is not None and value >= warning_high:
-            return "warning"
-
-        # Optimal aralıkta mı?
-        if len(optimal_range) == 2:
-            if optimal_range[0] <= value <= optimal_range[1]:
-                return "normal"
-            else:
-                # Optimal dışında ama warning değerlerinin içinde
-                return "warning"
+        return _classify(value, rules)
 
-        return "normal"
-
-    def _get_threshold_config(self, sensor_type: str) -> dict:
+    def determine_status_batch(self, sensor_type: str, values: Iterable[Any]) -> List[str]:
         """
-        Sensör tipi için threshold config'i al
+        Aynı sensör tipindeki birden fazla değerin durumunu belirle
+
+        Eşik tablosu batch başına bir kez çözülür; sonuçlar tek tek
+        determine_status() çağrılarıyla aynıdır.
 
         Args:
             sensor_type: Sensör tipi
+            values: Kontrol edilecek değerler
 
         Returns:
-            Threshold config dictionary
+            values ile aynı sırada status listesi
         """
-        return self.threshold_config.get(sensor_type, {})
+        rules = self._status_rules.get(sensor_type)
+        statuses = []
+        for value in values:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                statuses.append("unknown")
+                continue
+            statuses.append("normal" if rules is None else _classify(value, rules))
+        return statuses
 
     def get_status_summary(self, measurements: List[dict]) -> str:
         """
@@ -232,13 +438,15 @@ class SensorProcessor:
         Returns:
             En kötü status
         """
-        statuses = [m.get("status", "normal") for m in measurements]
-
-        if "critical" in statuses:
-            return "critical"
-        if "warning" in statuses:
-            return "warning"
-        return "normal"
+        # Tek geçiş: en yüksek öncelik; critical görülünce daha kötüsü olamaz
+        worst = 0
+        for m in measurements:
+            rank = _STATUS_RANK.get(m.get("status", "normal"), 0)
+            if rank > worst:
+                worst = rank
+                if worst == 2:
+                    break
+        return _STATUS_BY_RANK[worst]
 
 
 if __name__ == "__main__":
@@ -2,16 +2,27 @@
 Sera Otonom - Trend Analyzer
 
 Linear regression ile sensör verilerinden trend hesaplayan modül
-Pure Python implementasyonu (numpy kullanmaz)
+Regresyon toplamları örnek eklenip çıkarıldıkça artımlı güncellenir
 """
 
 import logging
-from typing import Dict, List, Optional, Tuple
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from math import fsum
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Zaman ofsetleri mikrosaniye tamsayı
+_ONE_US = timedelta(microseconds=1)
+_US_PER_HOUR = 3_600_000_000
+
+# Σx² - (Σx)²/n gibi farklarda bu oranın altı yuvarlama gürültüsü kabul edilir
+_CANCEL_TOLERANCE = 1e-10
+
 
 @dataclass
 class Sample:
@@ -20,6 +31,234 @@ class Sample:
     timestamp: datetime
 
 
+class SampleSeries:
+    """
+    Bir sensörün örnek penceresi (SoA)
+
+    Değerler float64, zamanlar int64 dizide tutulur; zaman base_time'a göre
+    mikrosaniye ofsetidir (datetime çözünürlüğü; tamsayı olduğundan
+    pencere karşılaştırmaları ve base kaydırma yuvarlamasızdır).
+
+    Regresyon için Σx, Σy, Σx², Σxy, Σy² ekleme ve çıkarmada O(1) güncellenir,
+    böylece regression() pencereyi taramaz. x base_time'dan itibaren saat,
+    y ise referans değere (_y_ref) göre farktır: iki eksen de küçük tutulur,
+    Σy² - (Σy)²/n gibi farklar büyük mutlak değerlerde (ör. lux) iptal
+    hatasına düşmez. Pencere tamamen yenilendiğinde base_time ve _y_ref ilk
+    örneğe taşınır, toplamlar baştan hesaplanır (çıkarma kaynaklı birikmiş
+    yuvarlama hatası sıfırlanır).
+    Sample nesneleri yalnızca erişimde üretilir.
+    """
+
+    __slots__ = ("base_time", "values", "offsets", "version", "_sums", "_y_ref", "_evicted", "_sorted")
+
+    def __init__(self, base_time: datetime):
+        self.base_time = base_time
+        self.values = array("d")
+        self.offsets = array("q")
+        self.version = 0  # her ekleme/çıkarmada artar (cache geçersizleme)
+        self._sums = [0.0, 0.0, 0.0, 0.0, 0.0]  # Σx, Σy, Σx², Σxy, Σy²
+        self._y_ref = 0.0  # toplamlardaki y = değer - _y_ref
+        self._evicted = 0  # son yeniden hesaplamadan beri çıkarılan örnek sayısı
+        self._sorted = True  # offsets artan sırada mı (binary search için)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index: int) -> Sample:
+        return Sample(value=self.values[index], timestamp=self.timestamp_at(index))
+
+    def __iter__(self) -> Iterator[Sample]:
+        for i in range(len(self.values)):
+            yield self[i]
+
+    def append(self, value: float, timestamp: datetime) -> None:
+        """Örnek ekle (boş pencerede base_time yeni örneğe taşınır)"""
+        if not self.values:
+            self.base_time = timestamp
+            self._sums = [0.0, 0.0, 0.0, 0.0, 0.0]
+            self._y_ref = float(value)
+            self._evicted = 0
+            self._sorted = True
+        offset = (timestamp - self.base_time) // _ONE_US
+        if self.offsets and offset < self.offsets[-1]:
+            self._sorted = False
+        self.values.append(value)
+        self.offsets.append(offset)
+        self.version += 1
+
+        y = self.values[-1] - self._y_ref
+        x = offset / _US_PER_HOUR
+        sums = self._sums
+        sums[0] += x
+        sums[1] += y
+        sums[2] += x * x
+        sums[3] += x * y
+        sums[4] += y * y
+
+    def extend(self, values: Iterable[float], timestamps: Iterable[datetime]) -> None:
+        """Toplu örnek ekle; yeni örneklerin toplam katkısı tek geçişte eklenir"""
+        new_values = array("d", values)
+        timestamps = list(timestamps)
+        if len(new_values) != len(timestamps):
+            raise ValueError("values ve timestamps aynı uzunlukta olmalı")
+        if not new_values:
+            return
+
+        if not self.values:
+            self.base_time = timestamps[0]
+            self._sums = [0.0, 0.0, 0.0, 0.0, 0.0]
+            self._y_ref = new_values[0]
+            self._evicted = 0
+            self._sorted = True
+
+        base_time = self.base_time
+        new_offsets = array("q", ((timestamp - base_time) // _ONE_US for timestamp in timestamps))
+        if self._sorted:
+            previous = self.offsets[-1] if self.offsets else new_offsets[0]
+            for offset in new_offsets:
+                if offset < previous:
+                    self._sorted = False
+                    break
+                previous = offset
+
+        y_ref = self._y_ref
+        xs = [offset / _US_PER_HOUR for offset in new_offsets]
+        ys = [value - y_ref for value in new_values]
+        sums = self._sums
+        sums[0] += fsum(xs)
+        sums[1] += fsum(ys)
+        sums[2] += fsum(x * x for x in xs)
+        sums[3] += fsum(x * y for x, y in zip(xs, ys))
+        sums[4] += fsum(y * y for y in ys)
+
+        self.values.extend(new_values)
+        self.offsets.extend(new_offsets)
+        self.version += 1
+
+    def timestamp_at(self, index: int) -> datetime:
+        """index'teki örneğin zaman damgası"""
+        return self.base_time + timedelta(microseconds=self.offsets[index])
+
+    def drop_older_than(self, cutoff_time: datetime) -> None:
+        """cutoff_time ve öncesindeki örnekleri çıkar"""
+        offsets = self.offsets
+        if not offsets:
+            return
+        cutoff = (cutoff_time - self.base_time) // _ONE_US
+
+        # Örnekler genelde zaman sırasında gelir: eskiler baştaki blok, binary search ile bulunur
+        if self._sorted:
+            self._drop_first(bisect_right(offsets, cutoff))
+            return
+
+        stale = 0
+        n = len(offsets)
+        while stale < n and offsets[stale] <= cutoff:
+            stale += 1
+        self._drop_first(stale)
+
+        # Sıra dışı gelmiş eski örnek kaldıysa tam filtre
+        # (_drop_first base_time'ı kaydırmış olabilir; cutoff yeniden hesaplanır)
+        offsets = self.offsets
+        cutoff = (cutoff_time - self.base_time) // _ONE_US
+        if offsets and min(offsets) <= cutoff:
+            keep = [i for i, offset in enumerate(offsets) if offset > cutoff]
+            self.values = array("d", (self.values[i] for i in keep))
+            self.offsets = array("q", (offsets[i] for i in keep))
+            self.version += 1
+            self._rebase()
+
+    def keep_last(self, count: int) -> None:
+        """Sadece son count örneği tut"""
+        self._drop_first(len(self.values) - count)
+
+    def _drop_first(self, count: int) -> None:
+        """İlk count örneği çıkar, katkılarını toplamlardan düş"""
+        if count <= 0:
+            return
+        sums = self._sums
+        values = self.values
+        offsets = self.offsets
+        y_ref = self._y_ref
+        # Dilim kopyası almadan indeksle oku (taşma rejiminde count genelde 1)
+        for i in range(count):
+            y = values[i] - y_ref
+            x = offsets[i] / _US_PER_HOUR
+            sums[0] -= x
+            sums[1] -= y
+            sums[2] -= x * x
+            sums[3] -= x * y
+            sums[4] -= y * y
+        del values[:count]
+        del offsets[:count]
+        self.version += 1
+
+        self._evicted += count
+        if self._evicted >= len(self.values):
+            self._rebase()
+
+    def _rebase(self) -> None:
+        """base_time ve _y_ref'i ilk örneğe taşı, toplamları baştan hesapla"""
+        self._evicted = 0
+        if not self.values:
+            self._sums = [0.0, 0.0, 0.0, 0.0, 0.0]
+            return
+
+        offsets = self.offsets
+        self._sorted = all(offsets[i] <= offsets[i + 1] for i in range(len(offsets) - 1))
+
+        shift = offsets[0]
+        if shift:
+            self.base_time = self.timestamp_at(0)
+            self.offsets = array("q", (offset - shift for offset in self.offsets))
+
+        y_ref = self._y_ref = self.values[0]
+        xs = [offset / _US_PER_HOUR for offset in self.offsets]
+        ys = [value - y_ref for value in self.values]
+        self._sums = [
+            fsum(xs),
+            fsum(ys),
+            fsum(x * x for x in xs),
+            fsum(x * y for x, y in zip(xs, ys)),
+            fsum(y * y for y in ys),
+        ]
+
+    def mean(self) -> float:
+        """Değer ortalaması (Σy'den, tarama yapmadan)"""
+        return self._y_ref + self._sums[1] / len(self.values) if self.values else 0.0
+
+    def regression(self) -> Tuple[float, float, float]:
+        """
+        Toplamlardan kapalı form OLS (O(1))
+
+        Returns:
+            (slope, intercept, r_squared); intercept ilk örneğin zamanına göre
+        """
+        n = len(self.values)
+        if n < 2:
+            return 0.0, 0.0, 0.0
+
+        sx, sy, sxx, sxy, syy = self._sums
+        x_mean = sx / n
+        y_mean = sy / n
+
+        # Merkezlenmiş toplamlar; iptal hatası payının altındakiler sıfır sayılır
+        sxx_c = sxx - sx * x_mean
+        if sxx_c <= _CANCEL_TOLERANCE * sxx:
+            return 0.0, self._y_ref + y_mean, 0.0
+        sxy_c = sxy - sx * y_mean
+        syy_c = syy - sy * y_mean
+
+        slope = sxy_c / sxx_c
+        intercept = self._y_ref + y_mean - slope * (x_mean - self.offsets[0] / _US_PER_HOUR)
+
+        if syy_c <= _CANCEL_TOLERANCE * syy:
+            return slope, intercept, 0.0
+        r_squared = 1 - (syy_c - slope * sxy_c) / syy_c
+
+        return slope, intercept, r_squared
+
+
 class TrendAnalyzer:
     """Linear regression tabanlı trend hesaplayıcı"""
 
@@ -39,6 +278,9 @@ class TrendAnalyzer:
         "light": "lux"
     }
 
+    # predict() LRU cache boyutu (sensör x ufuk kombinasyonları için yeterli)
+    PREDICTION_CACHE_SIZE = 32
+
     def __init__(self, window_hours: int = 6, min_samples: int = 3, max_samples: int = 1000):
         """
         Analyzer'ı başlat
@@ -51,7 +293,13 @@ class TrendAnalyzer:
         self.window_hours = window_hours
         self.min_samples = min_samples
         self.max_samples = max_samples
-        self.history: Dict[str, List[Sample]] = {}
+        self.history: Dict[str, SampleSeries] = {}
+        # (sensör, pencere, pencere versiyonu, ufuk) -> tahmin
+        self._pred_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        # sensör -> (pencere, pencere versiyonu, (slope, intercept, r_squared))
+        self._regression_cache: Dict[str, Tuple[SampleSeries, int, Tuple[float, float, float]]] = {}
+        # sensör -> (trend eşiği, birim); get_trend ilk çağrıda doldurur
+        self._trend_params: Dict[str, Tuple[float, str]] = {}
         logger.info(f"TrendAnalyzer initialized with {window_hours}h window, min {min_samples} samples")
 
     def add_sample(self, sensor_type: str, value: float, timestamp: Optional[datetime] = None) -> None:
@@ -63,83 +311,100 @@ class TrendAnalyzer:
             value: Ölçüm değeri
             timestamp: Zaman damgası (None ise şimdiki zaman)
         """
+        # Zaman verilmediyse saat tek kez okunur, temizlik de aynı anı kullanır
+        now = None
         if timestamp is None:
-            timestamp = datetime.now()
+            timestamp = now = datetime.now()
 
-        if sensor_type not in self.history:
-            self.history[sensor_type] = []
+        series = self.history.get(sensor_type)
+        if series is None:
+            series = self.history[sensor_type] = SampleSeries(timestamp)
 
-        self.history[sensor_type].append(Sample(value=value, timestamp=timestamp))
+        series.append(value, timestamp)
 
         # Eski örnekleri temizle
-        self._cleanup_old_samples(sensor_type)
+        self._cleanup_old_samples(sensor_type, now)
 
-        logger.debug(f"Added sample for {sensor_type}: {value} at {timestamp}")
+        logger.debug("Added sample for %s: %s at %s", sensor_type, value, timestamp)
 
-    def _cleanup_old_samples(self, sensor_type: str) -> None:
+    def add_samples(
+        self, sensor_type: str, values: Iterable[float], timestamps: Iterable[datetime]
+    ) -> None:
         """
-        Eski örnekleri temizle
+        Birden fazla örneği tek seferde ekle
+
+        Pencere temizliği ve cache geçersizleme tüm batch için bir kez yapılır.
 
         Args:
             sensor_type: Sensör tipi
+            values: Ölçüm değerleri
+            timestamps: Zaman damgaları (values ile aynı sırada)
+
+        Raises:
+            ValueError: values ve timestamps uzunlukları farklı
         """
-        if sensor_type not in self.history:
+        values = list(values)
+        timestamps = list(timestamps)
+        if len(values) != len(timestamps):
+            raise ValueError("values ve timestamps aynı uzunlukta olmalı")
+        if not timestamps:
             return
 
-        samples = self.history[sensor_type]
-
-        # Zaman bazlı temizlik
-        cutoff_time = datetime.now() - timedelta(hours=self.window_hours)
-        samples = [s for s in samples if s.timestamp > cutoff_time]
+        series = self.history.get(sensor_type)
+        if series is None:
+            series = self.history[sensor_type] = SampleSeries(timestamps[0])
 
-        # Sayı bazlı temizlik
-        if len(samples) > self.max_samples:
-            samples = samples[-self.max_samples:]
+        series.extend(values, timestamps)
+        self._cleanup_old_samples(sensor_type)
 
-        self.history[sensor_type] = samples
+        logger.debug("Added %s samples for %s", len(timestamps), sensor_type)
 
-    def _calculate_linear_regression(self, samples: List[Sample]) -> Tuple[float, float, float]:
+    def _cleanup_old_samples(self, sensor_type: str, now: Optional[datetime] = None) -> None:
         """
-        Pure Python linear regression hesapla
+        Eski örnekleri temizle
 
         Args:
-            samples: Örnek listesi
-
-        Returns:
-            (slope, intercept, r_squared)
+            sensor_type: Sensör tipi
+            now: Şimdiki zaman (None ise okunur)
         """
-        if len(samples) < 2:
-            return 0.0, 0.0, 0.0
-
-        # x = timestamp (saat cinsinden), y = value
-        base_time = samples[0].timestamp
-        x_values = [(s.timestamp - base_time).total_seconds() / 3600 for s in samples]
-        y_values = [s.value for s in samples]
+        series = self.history.get(sensor_type)
+        if series is None:
+            return
 
-        n = len(samples)
+        # Zaman bazlı temizlik
+        if now is None:
+            now = datetime.now()
+        series.drop_older_than(now - timedelta(hours=self.window_hours))
 
-        # Ortalamalar
-        x_mean = sum(x_values) / n
-        y_mean = sum(y_values) / n
+        # Sayı bazlı temizlik
+        series.keep_last(self.max_samples)
 
-        # Kovaryans ve varyans
-        numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_values, y_values))
-        denominator = sum((x - x_mean) ** 2 for x in x_values)
+    def _calculate_linear_regression(self, samples: SampleSeries) -> Tuple[float, float, float]:
+        """
+        Linear regression hesapla (en küçük kareler)
 
-        if denominator == 0:
-            return 0.0, y_mean, 0.0
+        Args:
+            samples: Örnek penceresi
 
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
+        Returns:
+            (slope, intercept, r_squared); x ekseni ilk örnekten itibaren saat
+        """
+        return samples.regression()
 
-        # R-squared (determination coefficient)
-        y_pred = [slope * x + intercept for x in x_values]
-        ss_res = sum((y - yp) ** 2 for y, yp in zip(y_values, y_pred))
-        ss_tot = sum((y - y_mean) ** 2 for y in y_values)
+    def _cached_regression(self, sensor_type: str, samples: SampleSeries) -> Tuple[float, float, float]:
+        """
+        Pencere değişmediyse son regresyon sonucunu döndür
 
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0.0
+        get_summary aynı pencere için get_trend ve üç predict çağırır;
+        regresyon pencere başına bir kez hesaplanır.
+        """
+        cached = self._regression_cache.get(sensor_type)
+        if cached is not None and cached[0] is samples and cached[1] == samples.version:
+            return cached[2]
 
-        return slope, intercept, r_squared
+        result = self._calculate_linear_regression(samples)
+        self._regression_cache[sensor_type] = (samples, samples.version, result)
+        return result
 
     def get_trend(self, sensor_type: str) -> dict:
         """
@@ -157,7 +422,7 @@ class TrendAnalyzer:
                 "sample_count": int
             }
         """
-        samples = self.history.get(sensor_type, [])
+        samples = self.history.get(sensor_type, ())
 
         if len(samples) < self.min_samples:
             return {
@@ -169,10 +434,15 @@ class TrendAnalyzer:
                 "error": f"Insufficient samples (need {self.min_samples}, have {len(samples)})"
             }
 
-        slope, intercept, r_squared = self._calculate_linear_regression(samples)
+        slope, intercept, r_squared = self._cached_regression(sensor_type, samples)
 
-        # Trend yönünü belirle
-        threshold = self.TREND_THRESHOLDS.get(sensor_type, 0.5)
+        # Trend yönünü belirle (eşik ve birim sensör başına bir kez çözülür)
+        params = self._trend_params.get(sensor_type)
+        if params is None:
+            params = self._trend_params[sensor_type] = (
+                self.TREND_THRESHOLDS.get(sensor_type, 0.5), self.UNITS.get(sensor_type, "")
+            )
+        threshold, unit = params
         if abs(slope) < threshold:
             direction = "stable"
         elif slope > 0:
@@ -180,10 +450,8 @@ class TrendAnalyzer:
         else:
             direction = "falling"
 
-        # Formatla
-        unit = self.UNITS.get(sensor_type, "")
-        sign = "+" if slope >= 0 else ""
-        rate_formatted = f"{sign}{slope:.2f}{unit}/hour"
+        # Formatla (%+ pozitiflere '+' ekler)
+        rate_formatted = "%+.2f%s/hour" % (slope, unit)
 
         return {
             "direction": direction,
@@ -209,34 +477,69 @@ class TrendAnalyzer:
                 "current_value": float
             }
             veya None (yeterli veri yoksa)
-        """
-        samples = self.history.get(sensor_type, [])
 
-        if len(samples) < self.min_samples:
-            return None
+        Yeni örnek gelmediyse önceki sonuç cache'ten döner (paylaşılan dict, değiştirilmemeli).
+        """
+        return self.predict_many(sensor_type, (hours_ahead,)).get(hours_ahead)
 
-        slope, intercept, r_squared = self._calculate_linear_regression(samples)
+    def predict_many(self, sensor_type: str, horizons: Iterable[float]) -> Dict[float, dict]:
+        """
+        Birden fazla ufuk için tahmin (pencere ve regresyon bir kez çözülür)
 
-        # Son değer ve tahmin
-        last_sample = samples[-1]
-        base_time = samples[0].timestamp
-        current_hours = (last_sample.timestamp - base_time).total_seconds() / 3600
-        future_hours = current_hours + hours_ahead
+        Args:
+            sensor_type: Sensör tipi
+            horizons: Kaç saat sonrası değerleri
 
-        predicted_value = slope * future_hours + intercept
-        prediction_time = last_sample.timestamp + timedelta(hours=hours_ahead)
+        Returns:
+            ufuk -> predict() formatında tahmin; yeterli veri yoksa boş dict
+        """
+        samples = self.history.get(sensor_type)
+
+        if samples is None or len(samples) < self.min_samples:
+            return {}
+
+        # Örnek penceresi değişmediyse (aynı seri, aynı version) tahmin tekrar hesaplanmaz
+        series_version = samples.version
+        last_time = samples.timestamp_at(-1)
+        current_hours = (samples.offsets[-1] - samples.offsets[0]) / _US_PER_HOUR
+        current_value = samples.values[-1]
+        pred_cache = self._pred_cache
+        regression = None
+
+        predictions: Dict[float, dict] = {}
+        for hours_ahead in horizons:
+            cache_key = (sensor_type, samples, series_version, hours_ahead)
+            prediction = pred_cache.get(cache_key)
+            if prediction is not None:
+                pred_cache.move_to_end(cache_key)
+                predictions[hours_ahead] = prediction
+                continue
+
+            if regression is None:
+                regression = self._cached_regression(sensor_type, samples)
+            slope, intercept, r_squared = regression
+
+            predicted_value = slope * (current_hours + hours_ahead) + intercept
+            prediction_time = last_time + timedelta(hours=hours_ahead)
+
+            # Confidence r_squared'e göre azalır ve zaman uzadıkça daha da düşer
+            time_factor = max(0.5, 1.0 - (hours_ahead / 24))  # 24 saat sonrası için %50 düşüş
+            confidence = r_squared * time_factor
+
+            prediction = {
+                "predicted_value": round(predicted_value, 2),
+                "prediction_time": prediction_time.isoformat(),
+                "confidence": round(max(0.0, min(1.0, confidence)), 2),
+                "current_value": current_value,
+                "hours_ahead": hours_ahead
+            }
 
-        # Confidence r_squared'e göre azalır ve zaman uzadıkça daha da düşer
-        time_factor = max(0.5, 1.0 - (hours_ahead / 24))  # 24 saat sonrası için %50 düşüş
-        confidence = r_squared * time_factor
+            pred_cache[cache_key] = prediction
+            if len(pred_cache) > self.PREDICTION_CACHE_SIZE:
+                pred_cache.popitem(last=False)
+            predictions[hours_ahead] = prediction
 
-        return {
-            "predicted_value": round(predicted_value, 2),
-            "prediction_time": prediction_time.isoformat(),
-            "confidence": round(max(0.0, min(1.0, confidence)), 2),
-            "current_value": last_sample.value,
-            "hours_ahead": hours_ahead
-        }
+        return predictions
 
     def get_summary(self, sensor_type: str) -> dict:
         """
@@ -248,7 +551,7 @@ class TrendAnalyzer:
         Returns:
             Kapsamlı trend özeti
         """
-        samples = self.history.get(sensor_type, [])
+        samples = self.history.get(sensor_type)
         trend = self.get_trend(sensor_type)
 
         if not samples:
@@ -259,30 +562,30 @@ class TrendAnalyzer:
                 "predictions": None
             }
 
-        values = [s.value for s in samples]
+        values = samples.values
 
-        # İstatistikler
+        # İstatistikler: min/max birer tarama, ortalama artımlı toplamdan
+        low = min(values)
+        high = max(values)
         statistics = {
-            "min": min(values),
-            "max": max(values),
-            "mean": sum(values) / len(values),
+            "min": low,
+            "max": high,
+            "mean": samples.mean(),
             "latest": values[-1],
-            "range": max(values) - min(values),
+            "range": high - low,
             "sample_count": len(samples)
         }
 
         if len(samples) >= 2:
-            statistics["first_timestamp"] = samples[0].timestamp.isoformat()
-            statistics["last_timestamp"] = samples[-1].timestamp.isoformat()
-            duration = (samples[-1].timestamp - samples[0].timestamp).total_seconds() / 3600
+            statistics["first_timestamp"] = samples.timestamp_at(0).isoformat()
+            statistics["last_timestamp"] = samples.timestamp_at(-1).isoformat()
+            duration = (samples.offsets[-1] - samples.offsets[0]) / _US_PER_HOUR
             statistics["duration_hours"] = round(duration, 2)
 
         # Tahminler (1, 3, 6 saat)
-        predictions = {}
-        for hours in [1, 3, 6]:
-            pred = self.predict(sensor_type, hours)
-            if pred:
-                predictions[f"{hours}h"] = pred
+        predictions = {
+            f"{hours}h": pred for hours, pred in self.predict_many(sensor_type, (1, 3, 6)).items()
+        }
 
         return {
             "sensor_type": sensor_type,
@@ -299,10 +602,13 @@ class TrendAnalyzer:
         Args:
             sensor_type: Belirli sensör tipi (None ise tümü)
         """
+        self._pred_cache.clear()
         if sensor_type:
+            self._regression_cache.pop(sensor_type, None)
             self.history.pop(sensor_type, None)
             logger.info(f"Cleared history for {sensor_type}")
         else:
+            self._regression_cache.clear()
             self.history.clear()
             logger.info("Cleared all history")
 
@@ -14,6 +14,7 @@ Not: Weather API testi için .env dosyasında WEATHER_API_KEY tanımlı olmalı.
 """
 
 import asyncio
+import copy
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -28,6 +29,31 @@ from processors.sensor_processor import SensorProcessor
 from processors.trend_analyzer import TrendAnalyzer
 
 
+# Örnek TTS uplink mesajı; testler kopyalayıp sadece değişen alanları yazar
+SAMPLE_UPLINK = {
+    "end_device_ids": {
+        "device_id": "sera-temp-hum-01",
+        "dev_eui": "0000000000000001"
+    },
+    "received_at": None,
+    "uplink_message": {
+        "decoded_payload": {
+            "temperature": 26.5,
+            "humidity": 68.0
+        },
+        "rx_metadata": [
+            {
+                "rssi": -75,
+                "snr": 8.5,
+                "gateway_ids": {"gateway_id": "test-gw-01"}
+            }
+        ],
+        "f_cnt": 150,
+        "f_port": 1
+    }
+}
+
+
 def print_section(title: str) -> None:
     """Print section header"""
     print("\n" + "=" * 60)
@@ -64,50 +90,46 @@ async def test_weather_connector() -> bool:
             print_result("Connector initialization", True)
             return True
 
-        connector = WeatherConnector(weather_config)
-        print_result("Connector initialization", True)
-
-        # Connect test
-        connected = await connector.connect()
-        print_result("Session creation", connected)
+        # Tüm çağrılar tek session'ı (keep-alive bağlantı havuzu) paylaşır
+        async with WeatherConnector(weather_config) as connector:
+            print_result("Connector initialization", True)
+            print_result("Session creation", connector.is_connected)
 
-        if not connected:
-            return False
+            if not connector.is_connected:
+                return False
 
-        # Health check
-        health = await connector.health_check()
-        print_result("Health check", health.get("healthy", False),
-                    f"Status: {health.get('status_code', 'N/A')}")
+            # Health check
+            health = await connector.health_check()
+            print_result("Health check", health.get("healthy", False),
+                        f"Status: {health.get('status_code', 'N/A')}")
 
-        if not health.get("healthy"):
-            print(f"         Error: {health.get('error', 'Unknown')}")
-            await connector.disconnect()
-            return False
+            if not health.get("healthy"):
+                print(f"         Error: {health.get('error', 'Unknown')}")
+                return False
 
-        # Get current weather
-        current = await connector.get_current()
-        has_current = "error" not in current
-        print_result("Get current weather", has_current)
+            # Get current weather
+            current = await connector.get_current()
+            has_current = "error" not in current
+            print_result("Get current weather", has_current)
 
-        if has_current:
-            temp = current.get("temperature", {})
-            print(f"         Location: {current.get('location', {}).get('name', 'Unknown')}")
-            print(f"         Temperature: {temp.get('current')}°C")
-            print(f"         Humidity: {current.get('humidity', {}).get('value')}%")
-            weather = current.get("weather", {})
-            print(f"         Condition: {weather.get('description', 'N/A')}")
+            if has_current:
+                temp = current.get("temperature", {})
+                print(f"         Location: {current.get('location', {}).get('name', 'Unknown')}")
+                print(f"         Temperature: {temp.get('current')}°C")
+                print(f"         Humidity: {current.get('humidity', {}).get('value')}%")
+                weather = current.get("weather", {})
+                print(f"         Condition: {weather.get('description', 'N/A')}")
 
-        # Get forecast
-        forecast = await connector.get_forecast(days=2)
-        has_forecast = "error" not in forecast
-        print_result("Get forecast (2 days)", has_forecast)
+            # Get forecast
+            forecast = await connector.get_forecast(days=2)
+            has_forecast = "error" not in forecast
+            print_result("Get forecast (2 days)", has_forecast)
 
-        if has_forecast:
-            print(f"         Forecast entries: {forecast.get('forecast_count', 0)}")
+            if has_forecast:
+                print(f"         Forecast entries: {forecast.get('forecast_count', 0)}")
 
-        # Disconnect
-        disconnected = await connector.disconnect()
-        print_result("Session cleanup", disconnected)
+        # Context manager çıkışında session kapatılır
+        print_result("Session cleanup", connector.session is None)
 
         return has_current and has_forecast
 
@@ -138,8 +160,8 @@ def test_sensor_processor() -> bool:
         ]
 
         all_valid = True
-        for sensor_type, value, expected in valid_tests:
-            result = processor.validate(sensor_type, value)
+        valid_results = processor.validate_many((sensor_type, value) for sensor_type, value, _ in valid_tests)
+        for (sensor_type, value, expected), result in zip(valid_tests, valid_results):
             success = result == expected
             all_valid = all_valid and success
             print_result(f"Validate {sensor_type}={value}", success,
@@ -164,28 +186,7 @@ def test_sensor_processor() -> bool:
                         f"Expected: {expected}, Got: {result}")
 
         # Process message test
-        sample_message = {
-            "end_device_ids": {
-                "device_id": "sera-temp-hum-01",
-                "dev_eui": "0000000000000001"
-            },
-            "received_at": datetime.now().isoformat(),
-            "uplink_message": {
-                "decoded_payload": {
-                    "temperature": 26.5,
-                    "humidity": 68.0
-                },
-                "rx_metadata": [
-                    {
-                        "rssi": -75,
-                        "snr": 8.5,
-                        "gateway_ids": {"gateway_id": "test-gw-01"}
-                    }
-                ],
-                "f_cnt": 150,
-                "f_port": 1
-            }
-        }
+        sample_message = {**SAMPLE_UPLINK, "received_at": datetime.now().isoformat()}
 
         result = processor.process(sample_message)
         process_success = result is not None
@@ -217,9 +218,10 @@ def test_trend_analyzer() -> bool:
         print("\n  Simulating rising temperature trend...")
         base_time = datetime.now() - timedelta(hours=5)
 
+        hourly = [base_time + timedelta(hours=i) for i in range(6)]
+
         rising_data = [20.0, 21.5, 23.0, 24.5, 26.0, 27.5]
-        for i, value in enumerate(rising_data):
-            analyzer.add_sample("temperature", value, base_time + timedelta(hours=i))
+        analyzer.add_samples("temperature", rising_data, hourly)
 
         trend = analyzer.get_trend("temperature")
         rising_ok = trend.get("direction") == "rising"
@@ -248,8 +250,7 @@ def test_trend_analyzer() -> bool:
         analyzer.clear_history()
 
         stable_data = [65.0, 64.8, 65.2, 65.1, 64.9, 65.0]
-        for i, value in enumerate(stable_data):
-            analyzer.add_sample("humidity", value, base_time + timedelta(hours=i))
+        analyzer.add_samples("humidity", stable_data, hourly)
 
         trend = analyzer.get_trend("humidity")
         stable_ok = trend.get("direction") == "stable"
@@ -260,8 +261,7 @@ def test_trend_analyzer() -> bool:
         print("\n  Simulating falling soil moisture trend...")
 
         falling_data = [70.0, 65.0, 60.0, 55.0, 50.0, 45.0]
-        for i, value in enumerate(falling_data):
-            analyzer.add_sample("soil_moisture", value, base_time + timedelta(hours=i))
+        analyzer.add_samples("soil_moisture", falling_data, hourly)
 
         trend = analyzer.get_trend("soil_moisture")
         falling_ok = trend.get("direction") == "falling"
@@ -293,37 +293,37 @@ def test_integration() -> bool:
         base_time = datetime.now() - timedelta(hours=5)
         temp_values = [22.0, 23.5, 25.0, 26.5, 28.0, 29.5]
 
-        processed_count = 0
-        for i, temp in enumerate(temp_values):
-            timestamp = base_time + timedelta(hours=i)
+        # Mesaj iskeleti bir kez kopyalanır, döngüde sadece değişen alanlar yazılır
+        # (process sonucu mesajdaki dict'lere referans tutmaz)
+        raw_message = copy.deepcopy(SAMPLE_UPLINK)
+        decoded_payload = raw_message["uplink_message"]["decoded_payload"]
+
+        # Okuma zamanları ve ISO string'leri döngü dışında bir kez hesaplanır
+        reading_times = [base_time + timedelta(hours=i) for i in range(len(temp_values))]
+        reading_isos = [timestamp.isoformat() for timestamp in reading_times]
 
+        processed_count = 0
+        collected = {}
+        for i, (temp, timestamp, received_at) in enumerate(zip(temp_values, reading_times, reading_isos)):
             # Simulate TTS message
-            raw_message = {
-                "end_device_ids": {
-                    "device_id": "sera-temp-hum-01",
-                    "dev_eui": "0000000000000001"
-                },
-                "received_at": timestamp.isoformat(),
-                "uplink_message": {
-                    "decoded_payload": {
-                        "temperature": temp,
-                        "humidity": 65 - i * 2  # Decreasing humidity
-                    }
-                }
-            }
+            raw_message["received_at"] = received_at
+            decoded_payload["temperature"] = temp
+            decoded_payload["humidity"] = 65 - i * 2  # Decreasing humidity
 
             # Process message
             result = processor.process(raw_message)
             if result:
                 processed_count += 1
 
-                # Add to trend analyzer
+                # Trend analyzer için ölçüm adına göre biriktir
                 for m in result.get("measurements", []):
-                    analyzer.add_sample(
-                        m["name"],
-                        m["value"],
-                        timestamp
-                    )
+                    values, timestamps = collected.setdefault(m["name"], ([], []))
+                    values.append(m["value"])
+                    timestamps.append(timestamp)
+
+        # Her sensör tek batch ile eklenir
+        for name, (values, timestamps) in collected.items():
+            analyzer.add_samples(name, values, timestamps)
 
         print_result(f"Processed {processed_count}/{len(temp_values)} messages", processed_count == len(temp_values))
 
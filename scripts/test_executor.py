@@ -24,6 +24,21 @@ from actions import RelayController, RelayCommandResult, ActionExecutor, ActionS
 from utils.state_manager import get_state_manager
 from utils.config_loader import get_config_loader
 
+# Brain testi import hatasını kendi sonucu olarak raporlar; script yine çalışır
+try:
+    from core import SeraBrain
+    BRAIN_IMPORT_ERROR = None
+except Exception as e:  # pragma: no cover - ortam bağımlı
+    SeraBrain = None
+    BRAIN_IMPORT_ERROR = e
+
+DEFAULT_DEVICE_CONFIG = {
+    "relays": {
+        "pump_01": {"max_on_duration_minutes": 60},
+        "fan_01": {"max_on_duration_minutes": 120}
+    }
+}
+
 
 def setup_logging(verbose: bool = False):
     """Logging ayarla"""
@@ -35,6 +50,15 @@ def setup_logging(verbose: bool = False):
     )
 
 
+def load_device_config() -> dict:
+    """devices.yaml'ı yükle, yoksa varsayılan config'e düş"""
+    try:
+        return get_config_loader().load("devices")
+    except FileNotFoundError:
+        print("  [WARN] devices.yaml bulunamadı, varsayılan config kullanılıyor")
+        return DEFAULT_DEVICE_CONFIG
+
+
 async def test_imports():
     """Import testleri"""
     print("\n" + "=" * 60)
@@ -60,38 +84,28 @@ async def test_imports():
     return all_passed
 
 
-async def test_relay_controller():
+async def test_relay_controller(device_config: dict):
     """RelayController testleri (MQTT olmadan)"""
     print("\n" + "=" * 60)
     print("TEST 2: RelayController Testleri (Simulation Mode)")
     print("=" * 60)
 
-    # Load device config
-    try:
-        config_loader = get_config_loader()
-        device_config = config_loader.load("devices")
-    except FileNotFoundError:
-        print("  [WARN] devices.yaml bulunamadı, varsayılan config kullanılıyor")
-        device_config = {
-            "relays": {
-                "pump_01": {"max_on_duration_minutes": 60},
-                "fan_01": {"max_on_duration_minutes": 120}
-            }
-        }
-
     # Create controller without MQTT (simulation mode)
     controller = RelayController(None, device_config)
     print(f"  [OK] RelayController oluşturuldu (simulation mode)")
 
     # Test turn_on
     print("\n  Testing turn_on:")
-    result = await controller.turn_on("pump_01", duration_minutes=5, reason="test_irrigation")
-    print(f"    pump_01 turn_on: success={result.success}, message={result.message}")
-    if not result.success:
-        print(f"    [WARN] Unexpected failure: {result.error}")
-
-    result = await controller.turn_on("fan_01", duration_minutes=10, reason="test_cooling")
-    print(f"    fan_01 turn_on: success={result.success}, message={result.message}")
+    # Bağımsız cihazlar: komutlar paralel gönderilir (MQTT modunda round-trip'ler örtüşür)
+    plan = [
+        ("pump_01", {"duration_minutes": 5, "reason": "test_irrigation"}),
+        ("fan_01", {"duration_minutes": 10, "reason": "test_cooling"}),
+    ]
+    results = await asyncio.gather(*(controller.turn_on(device, **kwargs) for device, kwargs in plan))
+    for (device, _), result in zip(plan, results):
+        print(f"    {device} turn_on: success={result.success}, message={result.message}")
+        if not result.success:
+            print(f"    [WARN] Unexpected failure: {result.error}")
 
     # Test unknown device
     result = await controller.turn_on("unknown_device")
@@ -107,11 +121,10 @@ async def test_relay_controller():
     # Test turn_off
     print("\n  Testing turn_off:")
     await asyncio.sleep(0.1)  # Small delay
-    result = await controller.turn_off("pump_01", reason="test_complete")
-    print(f"    pump_01 turn_off: success={result.success}, message={result.message}")
-
-    result = await controller.turn_off("fan_01", reason="test_complete")
-    print(f"    fan_01 turn_off: success={result.success}, message={result.message}")
+    devices = ("pump_01", "fan_01")
+    results = await asyncio.gather(*(controller.turn_off(device, reason="test_complete") for device in devices))
+    for device, result in zip(devices, results):
+        print(f"    {device} turn_off: success={result.success}, message={result.message}")
 
     # Test scheduled off
     print("\n  Testing schedule_off:")
@@ -129,24 +142,12 @@ async def test_relay_controller():
     return True
 
 
-async def test_action_executor():
+async def test_action_executor(device_config: dict):
     """ActionExecutor testleri"""
     print("\n" + "=" * 60)
     print("TEST 3: ActionExecutor Testleri")
     print("=" * 60)
 
-    # Load device config
-    try:
-        config_loader = get_config_loader()
-        device_config = config_loader.load("devices")
-    except FileNotFoundError:
-        device_config = {
-            "relays": {
-                "pump_01": {"max_on_duration_minutes": 60},
-                "fan_01": {"max_on_duration_minutes": 120}
-            }
-        }
-
     # Create components
     controller = RelayController(None, device_config)
     executor = ActionExecutor(controller, device_config)
@@ -238,24 +239,12 @@ async def test_state_integration():
     return True
 
 
-async def test_executor_cycle():
+async def test_executor_cycle(device_config: dict):
     """Executor döngüsü testi"""
     print("\n" + "=" * 60)
     print("TEST 5: Executor Döngü Testi")
     print("=" * 60)
 
-    # Load device config
-    try:
-        config_loader = get_config_loader()
-        device_config = config_loader.load("devices")
-    except FileNotFoundError:
-        device_config = {
-            "relays": {
-                "pump_01": {"max_on_duration_minutes": 60},
-                "fan_01": {"max_on_duration_minutes": 120}
-            }
-        }
-
     # Create components
     controller = RelayController(None, device_config)
     executor = ActionExecutor(controller, device_config)
@@ -265,8 +254,8 @@ async def test_executor_cycle():
     # Add a test pending action
     print("  Adding test pending action...")
     try:
-        device_states = state_manager.read("device_states")
-        device_states["pending_actions"].append({
+        # Tek lock altında oku-ekle-yaz (dosya bir kez okunur, bir kez yazılır)
+        state_manager.mutate("device_states", lambda states: states["pending_actions"].append({
             "id": "cycle_test_001",
             "action": "fan_on",
             "device": "fan_01",
@@ -274,8 +263,7 @@ async def test_executor_cycle():
             "reason": "executor_cycle_test",
             "status": "pending",
             "created_at": datetime.utcnow().isoformat() + "Z"
-        })
-        state_manager.write("device_states", device_states)
+        }))
         print("  [OK] Test action added")
     except Exception as e:
         print(f"  [WARN] Could not add test action: {e}")
@@ -310,9 +298,11 @@ async def test_brain_integration():
     print("TEST 6: Brain Entegrasyon Testi")
     print("=" * 60)
 
-    try:
-        from core import SeraBrain
+    if SeraBrain is None:
+        print(f"  [ERROR] Brain test failed: {BRAIN_IMPORT_ERROR}")
+        return False
 
+    try:
         # Create brain (Claude disabled for testing)
         brain = SeraBrain(use_claude=False, use_fallback=True)
         print("  [OK] SeraBrain oluşturuldu")
@@ -370,22 +360,25 @@ async def main():
     print(f"Tarih: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"MQTT testi: {'Evet' if args.with_mqtt else 'Hayır (simulation mode)'}")
 
+    # Cihaz config'i bir kez yüklenir, ilgili testlere parametre olarak verilir
+    device_config = load_device_config()
+
     results = []
 
     # Test 1: Imports
     results.append(("Import Testleri", await test_imports()))
 
     # Test 2: RelayController
-    results.append(("RelayController", await test_relay_controller()))
+    results.append(("RelayController", await test_relay_controller(device_config)))
 
     # Test 3: ActionExecutor
-    results.append(("ActionExecutor", await test_action_executor()))
+    results.append(("ActionExecutor", await test_action_executor(device_config)))
 
     # Test 4: State Integration
     results.append(("State Entegrasyon", await test_state_integration()))
 
     # Test 5: Executor Cycle
-    results.append(("Executor Döngü", await test_executor_cycle()))
+    results.append(("Executor Döngü", await test_executor_cycle(device_config)))
 
     # Test 6: Brain Integration
     results.append(("Brain Entegrasyon", await test_brain_integration()))
@@ -11,9 +11,9 @@ from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from datetime import datetime
 
 # Test edilecek modüller
-from core.claude_runner import ClaudeRunner, ClaudeResponse, FallbackDecisionMaker
+from core.claude_runner import ClaudeRunner, ClaudeResponse, FallbackDecisionMaker, _load_prompt_cached
 from core.scheduler import SeraScheduler, ScheduledTask, TaskStatus, TaskStats
-from core.brain import SeraBrain
+from core.brain import SeraBrain, _short_id
 
 
 # ==================== ClaudeRunner Tests ====================
@@ -43,6 +43,7 @@ class TestClaudeResponse:
     def test_default_timestamp(self):
         response = ClaudeResponse(success=True)
         assert response.timestamp is not None
+        assert response.source == "claude"
 
 
 class TestClaudeRunner:
@@ -67,6 +68,45 @@ class TestClaudeRunner:
         assert "temperature" in prompt
         assert "25" in prompt
 
+    def test_build_prompt_keeps_unicode(self):
+        runner = ClaudeRunner()
+        context = {"alerts": ["Sıcaklık yüksek"], "readings": {1: 2.5}}
+
+        with patch.object(runner, '_load_system_prompt', return_value="Test system prompt"):
+            prompt = runner.build_prompt(context)
+
+        assert "Sıcaklık yüksek" in prompt
+        assert '{"alerts":["Sıcaklık yüksek"],"readings":{"1":2.5}}' in prompt
+
+    def test_build_prompt_pretty_context(self):
+        runner = ClaudeRunner(pretty_context=True)
+
+        with patch.object(runner, '_load_system_prompt', return_value="Test system prompt"):
+            prompt = runner.build_prompt({"a": {"b": 1}})
+
+        assert '{\n  "a": {\n    "b": 1\n  }\n}' in prompt
+
+    def test_system_prompt_read_once_per_process(self, tmp_path):
+        prompt_file = tmp_path / "sera_agent.md"
+        prompt_file.write_text("Cached prompt", encoding="utf-8")
+        _load_prompt_cached.cache_clear()
+
+        runners = [ClaudeRunner(), ClaudeRunner()]
+        for runner in runners:
+            runner.prompt_template_path = prompt_file
+
+        with patch("builtins.open", wraps=open) as mock_open:
+            assert runners[0]._load_system_prompt() == "Cached prompt"
+            assert runners[1]._load_system_prompt() == "Cached prompt"
+
+        assert mock_open.call_count == 1
+
+    def test_system_prompt_missing_file(self, tmp_path):
+        runner = ClaudeRunner()
+        runner.prompt_template_path = tmp_path / "missing.md"
+
+        assert "sera yönetim" in runner._load_system_prompt()
+
     def test_parse_response_valid_json(self):
         runner = ClaudeRunner()
 
@@ -86,6 +126,15 @@ class TestClaudeRunner:
         assert response.decision["action"] == "none"
         assert response.analysis["summary"] == "Test summary"
 
+    def test_parse_response_bare_nested_json(self):
+        runner = ClaudeRunner()
+        raw_output = 'Sonuç: {"analysis": {"summary": "ok"}, "decision": {"action": "fan_on"}} bitti'
+
+        response = runner.parse_response(raw_output)
+        assert response.success is True
+        assert response.decision["action"] == "fan_on"
+        assert response.analysis["summary"] == "ok"
+
     def test_parse_response_no_json(self):
         runner = ClaudeRunner()
         raw_output = "No JSON here"
@@ -110,6 +159,98 @@ class TestClaudeRunner:
         assert response.success is False
         assert "No 'decision' field" in response.error
 
+    @pytest.mark.asyncio
+    async def test_read_stream_chunks(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"abc" * 10)
+        reader.feed_data(b"def")
+        reader.feed_eof()
+
+        data = await ClaudeRunner._read_stream(reader, chunk_size=4)
+
+        assert bytes(data) == b"abc" * 10 + b"def"
+
+    @pytest.mark.asyncio
+    async def test_execute_claude_streams_output(self):
+        import sys
+        runner = ClaudeRunner(timeout=10)
+        real_exec = asyncio.create_subprocess_exec
+
+        captured = {}
+
+        async def fake_exec(*cmd, **kwargs):
+            captured["cmd"] = cmd
+            script = (
+                "import sys; data = sys.stdin.read(); "
+                "sys.stdout.write(data * 2); sys.stderr.write('warn')"
+            )
+            return await real_exec(sys.executable, "-c", script, **kwargs)
+
+        prompt = "Sıcaklık " * 20000
+        with patch('core.claude_runner.asyncio.create_subprocess_exec', side_effect=fake_exec):
+            output = await runner._execute_claude(prompt)
+
+        assert output == prompt * 2
+        assert prompt not in captured["cmd"]
+
+    @pytest.mark.asyncio
+    async def test_close_kills_running_process(self):
+        import sys
+        runner = ClaudeRunner(timeout=30)
+        real_exec = asyncio.create_subprocess_exec
+
+        async def fake_exec(*cmd, **kwargs):
+            return await real_exec(sys.executable, "-c", "import time; time.sleep(30)", **kwargs)
+
+        with patch('core.claude_runner.asyncio.create_subprocess_exec', side_effect=fake_exec):
+            task = asyncio.create_task(runner._execute_claude("prompt"))
+            while runner._process is None:
+                await asyncio.sleep(0.01)
+
+            await runner.close()
+
+            with pytest.raises(RuntimeError):
+                await task
+
+        assert runner._process is None
+
+    @pytest.mark.asyncio
+    async def test_cancel_kills_running_process(self):
+        """Shutdown'da task iptal edilirse CLI süreci de sonlandırılır"""
+        import sys
+        runner = ClaudeRunner(timeout=30)
+        real_exec = asyncio.create_subprocess_exec
+        spawned = []
+
+        async def fake_exec(*cmd, **kwargs):
+            process = await real_exec(sys.executable, "-c", "import time; time.sleep(30)", **kwargs)
+            spawned.append(process)
+            return process
+
+        with patch('core.claude_runner.asyncio.create_subprocess_exec', side_effect=fake_exec):
+            task = asyncio.create_task(runner._execute_claude("prompt"))
+            while runner._process is None:
+                await asyncio.sleep(0.01)
+
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert runner._process is None
+        assert spawned[0].returncode is not None
+
+    @pytest.mark.asyncio
+    async def test_run_stops_after_close(self):
+        """close() sonrası run() yeni CLI süreci başlatmaz"""
+        runner = ClaudeRunner(max_retries=3)
+        await runner.close()
+
+        with patch.object(runner, '_execute_claude', new_callable=AsyncMock) as mock_exec:
+            response = await runner.run({})
+
+        assert response.success is False
+        mock_exec.assert_not_called()
+
     def test_build_reasoning(self):
         runner = ClaudeRunner()
         analysis = {
@@ -167,6 +308,7 @@ class TestFallbackDecisionMaker:
         result = fallback.make_decision(sensor_data)
 
         assert result.success is True
+        assert result.source == "fallback"
         assert result.decision["action"] == "none"
         assert "normal" in result.decision["reason"].lower()
 
@@ -209,6 +351,43 @@ class TestFallbackDecisionMaker:
         assert result.success is True
         assert result.decision["action"] == "fan_on"
 
+    def test_rule_priority_and_concerns(self, fallback):
+        """Sensör içinde ilk kural, sensörler arasında tablo sırası geçerli"""
+        sensor_data = {
+            "temperature": {"value": 39},
+            "humidity": {"value": 70},
+            "soil_moisture": {"value": 25}
+        }
+
+        result = fallback.make_decision(sensor_data)
+
+        assert result.decision["action"] == "fan_on"
+        assert "Kritik sıcaklık" in result.decision["reason"]
+        assert result.analysis["concerns"] == [
+            "Kritik sıcaklık (39°C)",
+            "Düşük toprak nemi (%25)"
+        ]
+
+    def test_thresholds_resolved_once(self, fallback):
+        assert fallback.t.temp_crit_hi == 38
+        assert fallback.t.soil_warn_hi == 80
+
+        defaults = FallbackDecisionMaker({"temperature": {"warning_high": 30}})
+        assert defaults.t.temp_warn_hi == 30
+        assert defaults.t.temp_crit_hi == 38.0
+        assert defaults.make_decision({"temperature": {"value": 31}}).decision["action"] == "fan_on"
+
+    def test_make_decisions_batch(self, fallback):
+        readings = [
+            {"temperature": {"value": 25}, "soil_moisture": {"value": 50}},
+            {"temperature": {"value": 33}},
+            {"soil_moisture": {"value": 85}},
+        ]
+
+        results = fallback.make_decisions(readings)
+
+        assert [r.decision["action"] for r in results] == ["none", "fan_on", "pump_off"]
+
 
 # ==================== Scheduler Tests ====================
 
@@ -228,6 +407,15 @@ class TestScheduledTask:
         assert task.enabled is True
         assert task.status == TaskStatus.PENDING
         assert task.stats.run_count == 0
+        assert task.is_coroutine is False
+
+    def test_async_callback_classified_once(self):
+        async def dummy():
+            pass
+
+        task = ScheduledTask(name="test", callback=dummy, interval_seconds=60)
+
+        assert task.is_coroutine is True
 
 
 class TestSeraScheduler:
@@ -359,6 +547,90 @@ class TestSeraScheduler:
         # Run immediately ile en az 1 kez çalışmış olmalı
         assert call_count[0] >= 1
 
+    @pytest.mark.asyncio
+    async def test_dispatcher_runs_periodic_tasks(self, scheduler):
+        counts = {"fast": 0, "slow": 0}
+
+        async def fast():
+            counts["fast"] += 1
+
+        def slow():
+            counts["slow"] += 1
+
+        scheduler.add_task("fast", fast, interval_seconds=0.02)
+        scheduler.add_task("slow", slow, interval_seconds=10)
+
+        await scheduler.start()
+        await asyncio.sleep(0.15)
+
+        # Görev başına ayrı loop yok, tek dispatcher
+        assert scheduler._dispatcher is not None
+        assert counts["fast"] >= 3
+        assert counts["slow"] == 0
+
+        scheduler.disable_task("fast")
+        runs = counts["fast"]
+        await asyncio.sleep(0.06)
+        assert counts["fast"] == runs
+
+        scheduler.enable_task("fast")
+        await asyncio.sleep(0.06)
+        assert counts["fast"] > runs
+
+        await scheduler.stop()
+        assert scheduler._dispatcher is None
+
+    @pytest.mark.asyncio
+    async def test_task_added_while_running_is_scheduled(self, scheduler):
+        calls = []
+
+        await scheduler.start()
+        scheduler.add_task("late", lambda: calls.append(1), interval_seconds=60, run_immediately=True)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_duration_stats_in_nanoseconds(self, scheduler):
+        async def sleepy():
+            await asyncio.sleep(0.01)
+
+        scheduler.add_task("sleepy", sleepy)
+        await scheduler.run_task_once("sleepy")
+        await scheduler.run_task_once("sleepy")
+
+        stats = scheduler.tasks["sleepy"].stats
+        assert isinstance(stats.total_duration_ns, int)
+        assert stats.total_duration_ns >= 20_000_000
+        assert stats.avg_duration_ms == pytest.approx(stats.total_duration_ns / 2 / 1e6)
+        assert scheduler.get_task_info("sleepy")["stats"]["avg_duration_ms"] >= 10
+
+    def test_task_dataclasses_are_slotted(self, scheduler):
+        scheduler.add_task("test", lambda: None)
+        task = scheduler.tasks["test"]
+
+        assert not hasattr(task, "__dict__")
+        assert not hasattr(task.stats, "__dict__")
+        with pytest.raises(AttributeError):
+            task.stats.unknown_field = 1
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_tasks_after_timeout(self, scheduler):
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        scheduler.add_task("hang", hang, interval_seconds=60, run_immediately=True)
+        await scheduler.start()
+        await started.wait()
+
+        await scheduler.stop(timeout=0.05)
+
+        assert scheduler.tasks["hang"]._task.done()
+
 
 # ==================== SeraBrain Tests ====================
 
@@ -382,6 +654,18 @@ class TestSeraBrain:
         assert status["initialized"] is False
         assert status["cycle_count"] == 0
 
+    def test_get_status_reports_live_components(self, brain):
+        brain.scheduler = Mock()
+        brain.scheduler.get_all_tasks_info = Mock(return_value={"brain_cycle": {"status": "idle"}})
+
+        first = brain.get_status()
+        first["scheduler"]["brain_cycle"]["status"] = "mutated"
+        brain.scheduler.get_all_tasks_info.return_value = {"brain_cycle": {"status": "running"}}
+        second = brain.get_status()
+
+        assert brain.scheduler.get_all_tasks_info.call_count == 2
+        assert second["scheduler"] == {"brain_cycle": {"status": "running"}}
+
     @pytest.mark.asyncio
     async def test_initialize(self, brain):
         with patch.object(brain, 'data_collector', None):
@@ -435,6 +719,82 @@ class TestSeraBrain:
         assert result["success"] is False
         assert "not initialized" in result["error"].lower()
 
+    @pytest.mark.asyncio
+    async def test_write_back_batches_cycle_writes(self, brain, tmp_path):
+        from utils.state_manager import StateManager
+
+        manager = StateManager(base_path=tmp_path)
+        manager.write("device_states", {"pending_actions": []})
+        manager.write("decisions", {"decisions": [], "stats": {}})
+        manager.write("thoughts", {"thoughts": []})
+        brain.state_manager = manager
+        brain.write_linger = 0.01
+
+        brain._write_queue = asyncio.Queue()
+        brain._writer_task = asyncio.create_task(brain._write_back_loop(brain._write_queue))
+
+        response = ClaudeResponse(success=True, decision={"action": "fan_on", "device": "fan_01"})
+
+        with patch.object(manager, '_dump', wraps=manager._dump) as mock_dump:
+            await brain._process_decision(response)
+            await brain._process_decision(response)
+            await brain._save_decision(response, "cycle_1")
+
+            # Henüz diske yazılmadı
+            assert manager.read("device_states")["pending_actions"] == []
+
+            await brain._stop_write_back()
+
+        written = [call.args[0] for call in mock_dump.call_args_list]
+        assert written.count("device_states") == 1
+        assert written.count("decisions") == 1
+        assert len(manager.read("device_states")["pending_actions"]) == 2
+        assert manager.read("decisions")["stats"]["total_decisions"] == 1
+        assert brain._write_queue is None
+
+    def test_truncate_raw_output(self, brain):
+        short = "kısa çıktı"
+        assert brain._truncate_raw_output(short) is short
+        assert brain._truncate_raw_output("") is None
+        assert len(brain._truncate_raw_output("x" * 5000)) == 1000
+
+    def test_short_id_unique_with_process_nonce(self):
+        ids = [_short_id() for _ in range(100)]
+
+        assert len(set(ids)) == 100
+        assert len({i[:8] for i in ids}) == 1
+        assert all(len(i) == 14 for i in ids)
+
+    @pytest.mark.asyncio
+    async def test_save_decision_single_write_per_state(self, brain, tmp_path):
+        from utils.state_manager import StateManager
+
+        manager = StateManager(base_path=tmp_path)
+        manager.write("decisions", {"decisions": [], "stats": {"total_decisions": 4}})
+        manager.write("thoughts", {"thoughts": []})
+        brain.state_manager = manager
+
+        response = ClaudeResponse(
+            success=True,
+            decision={"action": "fan_on", "confidence": 0.8},
+            reasoning="test",
+            source="fallback"
+        )
+
+        with patch.object(manager, '_dump', wraps=manager._dump) as mock_dump:
+            await brain._save_decision(response, "cycle_1", "2025-01-21T10:00:00.000000Z")
+
+        written = [call.args[0] for call in mock_dump.call_args_list]
+        assert written.count("decisions") == 1
+
+        decisions = manager.read("decisions")
+        assert len(decisions["decisions"]) == 1
+        assert decisions["decisions"][0]["source"] == "fallback"
+        assert decisions["stats"]["total_decisions"] == 5
+        assert decisions["stats"]["last_decision_id"] == decisions["decisions"][0]["id"]
+        assert decisions["decisions"][0]["timestamp"] == "2025-01-21T10:00:00.000000Z"
+        assert manager.read("thoughts")["thoughts"][0]["timestamp"] == "2025-01-21T10:00:00.000000Z"
+
 
 # ==================== Daily Reset Tests ====================
 
@@ -0,0 +1,306 @@
+"""
+Sera Otonom - Data Collector Unit Tests
+
+pytest ile data collector testleri
+"""
+
+import pytest
+import asyncio
+import logging
+import os
+import threading
+from unittest.mock import AsyncMock, patch
+
+
+# ==================== DataCollector Tests ====================
+
+class TestDataCollector:
+    """DataCollector testleri"""
+
+    @pytest.fixture
+    def collector(self, tmp_path):
+        from utils.state_manager import StateManager
+        from core.data_collector import DataCollector
+
+        manager = StateManager(base_path=tmp_path)
+        with patch('core.data_collector.get_state_manager', return_value=manager):
+            collector = DataCollector(
+                settings_config={"tts": {"mqtt": {}}, "weather": {}},
+                device_config={"sensors": {}, "relays": {}},
+                threshold_config={"temperature": {"optimal_range": [20, 28]}}
+            )
+        return collector
+
+    @pytest.mark.asyncio
+    async def test_sensor_callbacks_sync_and_async(self, collector):
+        received = []
+
+        def sync_cb(data):
+            received.append(("sync", data["device_id"]))
+
+        async def async_cb(data):
+            received.append(("async", data["device_id"]))
+
+        collector.on_sensor_data(sync_cb)
+        collector.on_sensor_data(async_cb)
+
+        assert [is_coro for _, is_coro in collector._sensor_callbacks] == [False, True]
+
+        processed = {"device_id": "sensor-01", "measurements": []}
+        with patch.object(collector.sensor_processor, 'process', return_value=processed), \
+             patch.object(collector, '_update_sensor_state', new_callable=AsyncMock):
+            await collector._on_sensor_message({"payload": {}})
+
+        assert received == [("sync", "sensor-01"), ("async", "sensor-01")]
+
+    @pytest.mark.asyncio
+    async def test_async_callbacks_run_concurrently(self, collector):
+        started = []
+        release = asyncio.Event()
+
+        async def slow_cb(data):
+            started.append("slow")
+            await release.wait()
+
+        async def failing_cb(data):
+            started.append("failing")
+            raise RuntimeError("boom")
+
+        async def fast_cb(data):
+            started.append("fast")
+            release.set()
+
+        for cb in (slow_cb, failing_cb, fast_cb):
+            collector.on_sensor_data(cb)
+
+        processed = {"device_id": "sensor-01", "measurements": []}
+        with patch.object(collector.sensor_processor, 'process', return_value=processed), \
+             patch.object(collector, '_update_sensor_state', new_callable=AsyncMock):
+            # Seri çalışsaydı slow_cb fast_cb'yi bekleyip kilitlenirdi
+            await asyncio.wait_for(collector._on_sensor_message({"payload": {}}), timeout=1)
+
+        assert sorted(started) == ["failing", "fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_sensor_message_logged_once(self, collector):
+        async def failing_cb(data):
+            raise RuntimeError("boom")
+
+        collector.on_sensor_data(failing_cb)
+        collector.on_sensor_data(lambda data: 1 / 0)
+
+        processed = {"device_id": "sensor-01", "measurements": []}
+        with patch.object(collector.sensor_processor, 'process', return_value=processed), \
+             patch.object(collector, '_update_sensor_state', new_callable=AsyncMock), \
+             patch('core.data_collector.logger') as mock_logger:
+            mock_logger.isEnabledFor.return_value = True
+            await collector._on_sensor_message({"device_id": "sensor-01", "payload": {}})
+
+        mock_logger.error.assert_not_called()
+        mock_logger.log.assert_called_once()
+        level = mock_logger.log.call_args.args[0]
+        summary = mock_logger.log.call_args.kwargs["extra"]["sensor_msg"]
+        assert level == logging.ERROR
+        assert summary["device_id"] == "sensor-01"
+        assert len(summary["errors"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_now_iso_cached_within_tick(self, collector):
+        first = collector._now_iso()
+        assert collector._now_iso() is first
+        assert first.endswith("Z")
+
+        # Sonraki loop iterasyonunda cache düşer
+        await asyncio.sleep(0)
+        assert collector._ts_cache is None
+        assert collector._now_iso() is not first
+
+    def test_now_iso_outside_loop_not_cached(self, collector):
+        collector._now_iso()
+        assert collector._ts_cache is None
+
+    def test_cached_read_reloads_on_change(self, collector):
+        manager = collector.state_manager
+        manager.write("current", {"sensors": {"temperature": {"value": 22}}})
+
+        first = collector._cached_read("current")
+        with patch.object(manager, 'read', wraps=manager.read) as read_spy:
+            assert collector._cached_read("current") is first
+            read_spy.assert_not_called()
+
+        manager.write("current", {"sensors": {"temperature": {"value": 30.5}}})
+        assert collector._cached_read("current")["sensors"]["temperature"]["value"] == 30.5
+
+    def test_cached_read_reloads_same_size_and_mtime(self, collector):
+        """Aynı boyut ve mtime ile yeniden yazılan dosya cache'ten dönmez"""
+        manager = collector.state_manager
+        path = manager.path_for("current")
+        manager.write("current", {"sensors": {"temperature": {"value": 22}}})
+        st = os.stat(path)
+        assert collector._cached_read("current")["sensors"]["temperature"]["value"] == 22
+
+        manager.write("current", {"sensors": {"temperature": {"value": 23}}})
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert os.stat(path).st_size == st.st_size
+
+        assert collector._cached_read("current")["sensors"]["temperature"]["value"] == 23
+
+    @pytest.mark.asyncio
+    async def test_update_sensor_state_nested(self, collector):
+        manager = collector.state_manager
+        manager.write("current", {"sensors": {"humidity": {"value": 60}}, "trends": {}})
+
+        await collector._update_sensor_state({
+            "timestamp": "2025-01-01T12:00:00Z",
+            "measurements": [{"name": "temperature", "value": 24.5, "unit": "°C", "status": "normal"}]
+        })
+
+        state = manager.read("current")
+        assert state["sensors"]["temperature"]["value"] == 24.5
+        assert state["sensors"]["humidity"]["value"] == 60
+        assert set(state["trends"]) == {"temperature", "humidity", "soil_moisture"}
+        assert not any("." in key for key in state)
+
+    @pytest.mark.asyncio
+    async def test_update_sensor_state_cancel_keeps_delta(self, collector):
+        """İptal edilen çağrı, worker thread'in yazacağı delta'yı boşaltmaz"""
+        collector.state_manager.write("current", {"sensors": {}, "trends": {}})
+        processed = {
+            "timestamp": "2025-01-01T12:00:00Z",
+            "measurements": [{"name": "temperature", "value": 24.5}]
+        }
+        started = threading.Event()
+        release = threading.Event()
+        update = collector.state_manager.update
+
+        def slow_update(name, updates):
+            started.set()
+            release.wait(2)
+            return update(name, updates)
+
+        with patch.object(collector.state_manager, 'update', side_effect=slow_update):
+            task = asyncio.create_task(collector._update_sensor_state(processed))
+            await asyncio.to_thread(started.wait, 2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            release.set()
+            # Worker thread iptalden bağımsız olarak yazımı tamamlar
+            for _ in range(200):
+                if collector.state_manager.read("current")["sensors"]:
+                    break
+                await asyncio.sleep(0.01)
+
+        assert collector.state_manager.read("current")["sensors"]["temperature"]["value"] == 24.5
+
+    @pytest.mark.asyncio
+    async def test_state_flusher_coalesces_updates(self, collector):
+        manager = collector.state_manager
+        manager.write("current", {"sensors": {}, "trends": {}})
+        collector.state_flush_interval = 0.05
+        collector.start_state_flusher()
+
+        with patch.object(manager, 'update', wraps=manager.update) as update_spy:
+            for name, value in (("temperature", 24.0), ("humidity", 61.0), ("temperature", 24.5)):
+                await collector._update_sensor_state({
+                    "timestamp": "2025-01-01T12:00:00Z",
+                    "measurements": [{"name": name, "value": value}]
+                })
+            assert update_spy.call_count == 0
+
+            await asyncio.sleep(0.15)
+            assert update_spy.call_count == 1
+
+            await collector._update_sensor_state({
+                "timestamp": "2025-01-01T12:00:05Z",
+                "measurements": [{"name": "soil_moisture", "value": 40.0}]
+            })
+            await collector.shutdown()
+            assert update_spy.call_count == 2
+
+        sensors = manager.read("current")["sensors"]
+        assert sensors["temperature"]["value"] == 24.5
+        assert sensors["humidity"]["value"] == 61.0
+        assert sensors["soil_moisture"]["value"] == 40.0
+        assert collector._flusher_task is None
+
+    def test_cached_read_missing_file_raises(self, collector):
+        with pytest.raises(FileNotFoundError):
+            collector._cached_read("weather")
+
+    @pytest.mark.asyncio
+    async def test_collect_context_reads_off_loop(self, collector):
+        collector.state_manager.write("current", {"sensors": {"temperature": {"value": 22}}})
+        collector.state_manager.write("decisions", {"decisions": [{"id": i} for i in range(8)]})
+
+        reader_threads = []
+        original = collector._read_context_states
+
+        def spy():
+            reader_threads.append(threading.current_thread())
+            return original()
+
+        with patch.object(collector, '_read_context_states', side_effect=spy):
+            context = await collector.collect_context()
+
+        assert reader_threads and reader_threads[0] is not threading.main_thread()
+        assert context["sensors"]["temperature"]["value"] == 22
+        assert [d["id"] for d in context["recent_decisions"]] == [3, 4, 5, 6, 7]
+        # Opsiyonel dosyalar yoksa varsayılanlar korunur
+        assert context["weather"] == {}
+        assert "error" not in context
+
+    @pytest.mark.asyncio
+    async def test_collect_context_template_untouched(self, collector):
+        collector.state_manager.write("current", {"sensors": {"humidity": {"value": 55}}})
+        collector.state_manager.write("decisions", {"decisions": [{"id": 1}]})
+
+        first = await collector.collect_context()
+        second = await collector.collect_context()
+
+        assert first is not second
+        assert first["recent_decisions"] == [{"id": 1}]
+
+    @pytest.mark.asyncio
+    async def test_collect_context_defaults_not_shared(self, collector):
+        """Varsayılan boş container'lar çağrılar arasında paylaşılmaz"""
+        first = await collector.collect_context()
+        first["weather"]["current"] = {"temp": 30}
+        first["device_states"]["pump"] = "on"
+
+        second = await collector.collect_context()
+
+        assert second["weather"] == {}
+        assert second["device_states"] == {}
+        assert first["weather"] is not second["weather"]
+
+    @pytest.mark.asyncio
+    async def test_collect_context_does_not_mutate_cache(self, collector):
+        collector.state_manager.write("current", {"sensors": {}, "trends": {"temperature": {"direction": "rising"}}})
+        for i in range(4):
+            collector.trend_analyzer.add_sample("temperature", 20.0 + i)
+
+        with patch.object(collector.trend_analyzer, '_calculate_linear_regression',
+                          wraps=collector.trend_analyzer._calculate_linear_regression) as regression_spy:
+            context = await collector.collect_context()
+            await collector.collect_context()
+            # Yeni örnek yok: tahmin tek kez hesaplanır
+            assert regression_spy.call_count == 1
+
+        assert "prediction_3h" in context["trends"]["temperature"]
+        assert context["trends"]["temperature"]["direction"] == "rising"
+        assert "prediction_3h" not in collector._cached_read("current")["trends"]["temperature"]
+
+    @pytest.mark.asyncio
+    async def test_collect_context_mutation_does_not_leak(self, collector):
+        """Context'i değiştiren tüketici sonraki context'leri etkilemez"""
+        collector.state_manager.write("current", {"sensors": {"temperature": {"value": 22}}})
+        collector.state_manager.write("decisions", {"decisions": [{"id": 1, "action": "none"}]})
+
+        first = await collector.collect_context()
+        first["sensors"]["temperature"]["value"] = 99
+        first["recent_decisions"][0]["action"] = "mutated"
+
+        second = await collector.collect_context()
+        assert second["sensors"]["temperature"]["value"] == 22
+        assert second["recent_decisions"][0]["action"] == "none"
@@ -155,6 +155,32 @@ class TestRelayController:
             # Should succeed in simulation mode
             assert result.success is True
 
+    @pytest.mark.asyncio
+    async def test_commands_serialized_per_device(self, controller, mock_mqtt):
+        """Aynı cihazın komutları sıralanır, farklı cihazlar paralel gönderilir"""
+        in_flight = []
+        max_in_flight = {}
+
+        async def send(device_id, command, device_config):
+            in_flight.append(device_id)
+            max_in_flight[device_id] = max(max_in_flight.get(device_id, 0), in_flight.count(device_id))
+            max_in_flight["total"] = max(max_in_flight.get("total", 0), len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(device_id)
+            return RelayCommandResult(success=True, device_id=device_id, command=command)
+
+        mock_mqtt.send_relay_command = AsyncMock(side_effect=send)
+
+        results = await asyncio.gather(
+            controller.turn_on("pump_01", reason="test"),
+            controller.turn_off("pump_01", reason="test"),
+            controller.turn_on("fan_01", reason="test"),
+        )
+
+        assert all(result.success for result in results)
+        assert max_in_flight["pump_01"] == 1
+        assert max_in_flight["total"] == 2
+
     @pytest.mark.asyncio
     async def test_scheduled_off(self, controller):
         """Schedule off task'ı test et"""
@@ -0,0 +1,37 @@
+"""
+Sera Otonom - JSON Utils Unit Tests
+
+pytest ile json_utils testleri
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from utils import json_utils
+
+
+# ==================== JSON Utils Tests ====================
+
+class TestJsonUtils:
+    """json_utils test suite (orjson ve stdlib json backend'leri)"""
+
+    @pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+    def use_orjson(self, request):
+        """orjson kuruluysa her iki backend'i de çalıştır"""
+        with patch.object(json_utils, "HAS_ORJSON", request.param and json_utils.orjson is not None):
+            yield request.param
+
+    def test_dumps_serializes_datetimes(self, use_orjson):
+        """datetime alanları her iki backend'de de ISO string'e çevrilir"""
+        payload = {"timestamp": datetime(2024, 1, 15, 10, 30, 0), "measurements": []}
+        data = json_utils.loads(json_utils.dumps(payload))
+        assert data["timestamp"] == "2024-01-15T10:30:00"
+        assert data["measurements"] == []
+
+    def test_dumps_bytes_keeps_utf8(self, use_orjson):
+        """dumps_bytes UTF-8 bytes döner, ASCII kaçışı yapmaz"""
+        raw = json_utils.dumps_bytes({"şehir": "Lefkoşa"}, indent=True)
+        assert isinstance(raw, bytes)
+        assert json_utils.loads(raw) == {"şehir": "Lefkoşa"}
+        assert "Lefkoşa".encode("utf-8") in raw
@@ -4,6 +4,7 @@ Sera Otonom - Main Entry Point Unit Tests
 pytest ile main.py modülü testleri
 """
 
+import os
 import pytest
 import sys
 import argparse
@@ -14,6 +15,8 @@ from unittest.mock import Mock, patch, MagicMock
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from utils.state_manager import StateManager
+
 # Test edilecek modül
 from main import (
     __version__,
@@ -56,6 +59,13 @@ class TestVersion:
 class TestCreateParser:
     """Argparse testleri"""
 
+    def test_parser_built_once(self):
+        """create_parser aynı parser nesnesini döndürür, parse sonuçları bağımsızdır"""
+        parser = create_parser()
+        assert create_parser() is parser
+        assert parser.parse_args(['--once']).once is True
+        assert parser.parse_args([]).once is False
+
     def test_parser_creation(self):
         """Parser oluşturulabilmeli"""
         parser = create_parser()
@@ -201,6 +211,20 @@ class TestCheckHealth:
             assert result['ok'] is True
             assert len(result['issues']) == 0
 
+    @patch('main.get_config_loader')
+    def test_check_health_loads_settings_once(self, mock_config_loader, tmp_path):
+        """settings.yaml tek sefer yüklenir, iki uyarı da ondan üretilir"""
+        mock_loader = MagicMock()
+        mock_loader.load.return_value = {'tts': {'mqtt': {}}, 'weather': {'api_key': '${WEATHER_API_KEY}'}}
+        mock_config_loader.return_value = mock_loader
+
+        with patch('main.PROJECT_ROOT', tmp_path):
+            result = check_health()
+
+        mock_loader.load.assert_called_once_with("settings")
+        assert "MQTT broker yapılandırılmamış" in result['warnings']
+        assert "Weather API key yapılandırılmamış" in result['warnings']
+
     @patch('main.PROJECT_ROOT')
     @patch('main.get_config_loader')
     def test_check_health_env_missing_warning(self, mock_config_loader, mock_root, tmp_path):
@@ -230,6 +254,31 @@ class TestCheckHealth:
             assert result['ok'] is True  # Still OK, just warning
             assert any('.env' in w for w in result['warnings'])
 
+    @patch('main.get_config_loader')
+    def test_check_health_requires_file_and_dir_types(self, mock_config_loader, tmp_path):
+        """settings.yaml dosya, templates dizin olmalı; sadece var olması yetmez"""
+        mock_config_loader.return_value = MagicMock()
+        (tmp_path / "config" / "settings.yaml").mkdir(parents=True)
+        (tmp_path / "state").mkdir()
+        (tmp_path / "state" / "templates").write_text("")
+
+        with patch('main.PROJECT_ROOT', tmp_path):
+            result = check_health()
+
+        assert any('Config dosyası' in issue for issue in result['issues'])
+        assert any('Template dizini' in issue for issue in result['issues'])
+
+    @patch('main.get_config_loader')
+    def test_check_health_one_stat_per_path(self, mock_config_loader, tmp_path):
+        """Her kontrol edilen yol için tek stat çağrısı"""
+        mock_config_loader.return_value = MagicMock()
+
+        with patch('main.PROJECT_ROOT', tmp_path), \
+             patch('main.os.stat', wraps=os.stat) as mock_stat:
+            check_health()
+
+        assert mock_stat.call_count == 3
+
 
 # ==================== GracefulShutdown Tests ====================
 
@@ -258,6 +307,23 @@ class TestGracefulShutdown:
 
         assert gs.shutdown_requested is True
 
+    @pytest.mark.asyncio
+    async def test_wait_for_shutdown_wakes_on_request(self):
+        """wait_for_shutdown sinyal gelince polling olmadan uyanır"""
+        import asyncio
+        import signal
+
+        gs = GracefulShutdown()
+        waiter = asyncio.create_task(gs.wait_for_shutdown())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        gs.request_shutdown(signal.SIGTERM, None)
+        await asyncio.wait_for(waiter, timeout=1)
+
+        # Önceden istenmişse hemen döner
+        await asyncio.wait_for(gs.wait_for_shutdown(), timeout=1)
+
     @pytest.mark.asyncio
     async def test_shutdown_without_brain(self):
         """Brain yokken shutdown çalışmalı"""
@@ -300,6 +366,33 @@ class TestGracefulShutdown:
         await gs.shutdown(timeout=0.1)
 
 
+
+class TestShowStatus:
+    """show_status komutu testleri"""
+
+    def test_show_status_renders_state(self, tmp_path):
+        """State dosyalarından durum paneli oluşturulur, eksik dosyalar boş sayılır"""
+        import io
+        from rich.console import Console
+        from main import show_status
+
+        manager = StateManager(base_path=tmp_path)
+        manager.write("decisions", {"decisions": [{"source": "fallback"}, {"source": "claude"}]})
+        manager.write("current", {"sensors": {"soil_moisture": {"value": 42.0, "unit": "%"}}})
+        manager.write("device_states", {"devices": {"pump_01": {"state": "on"}, "fan_01": {"state": "off"}}})
+
+        output = io.StringIO()
+        with patch('main.get_state_manager', return_value=manager), \
+             patch('main.get_console', return_value=Console(file=output, width=100)):
+            assert show_status() == 0
+
+        text = output.getvalue()
+        assert "Aktif" in text
+        assert "Soil Moisture" in text and "42.0%" in text
+        assert "├─ Pump 01" in text and "AÇIK" in text
+        assert "└─ Fan 01" in text and "KAPALI" in text
+        assert "└─ Soil Moisture" in text
+
 # ==================== Logging Tests ====================
 
 class TestSetupLogging:
@@ -341,6 +434,128 @@ class TestSetupLogging:
             root_logger = logging.getLogger()
             assert root_logger.level == logging.INFO
 
+    def test_buffered_file_handler_flush_policy(self, tmp_path):
+        """INFO kayıtları buffer'da bekler, ERROR anında diske yazılır"""
+        import logging
+        from main import BufferedRotatingFileHandler
+
+        log_path = tmp_path / "buffered.log"
+        handler = BufferedRotatingFileHandler(log_path, flush_records=100, flush_interval=3600, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        def record(level, msg):
+            return logging.LogRecord("test", level, __file__, 1, msg, None, None)
+
+        handler.handle(record(logging.INFO, "bilgi"))
+        assert log_path.read_text(encoding='utf-8') == ""
+
+        handler.handle(record(logging.ERROR, "hata"))
+        assert log_path.read_text(encoding='utf-8') == "bilgi\nhata\n"
+        handler.close()
+
+    def test_listener_flushes_idle_buffer_on_timer(self, tmp_path):
+        """Yeni kayıt gelmese de buffer flush_interval sonunda diske yazılır"""
+        import logging
+        import queue
+        import time
+        from main import BufferedRotatingFileHandler, FlushingQueueListener
+
+        log_path = tmp_path / "idle.log"
+        handler = BufferedRotatingFileHandler(log_path, flush_records=100, flush_interval=0.05, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log_queue = queue.SimpleQueue()
+        listener = FlushingQueueListener(log_queue, handler)
+        listener.start()
+        try:
+            log_queue.put(logging.LogRecord("test", logging.INFO, __file__, 1, "sessiz", None, None))
+            deadline = time.monotonic() + 2.0
+            while log_path.read_text(encoding='utf-8') != "sessiz\n" and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert log_path.read_text(encoding='utf-8') == "sessiz\n"
+        finally:
+            listener.stop()
+            handler.close()
+
+    def test_buffered_file_handler_rollover(self, tmp_path):
+        """Boyut sayaçla izlenir ve maxBytes aşılınca dosya döndürülür"""
+        import logging
+        from main import BufferedRotatingFileHandler
+
+        log_path = tmp_path / "rotate.log"
+        handler = BufferedRotatingFileHandler(log_path, maxBytes=20, backupCount=1, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        for i in range(3):
+            handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, f"satir-{i:08d}", None, None))
+        handler.close()
+
+        assert (tmp_path / "rotate.log.1").exists()
+        assert log_path.read_text(encoding='utf-8') == "satir-00000002\n"
+
+    def test_buffered_file_handler_resyncs_size(self, tmp_path):
+        """Sayaç periyodik fstat ile gerçek boyuta eşitlenir (dış truncate sonrası)"""
+        import logging
+        from main import BufferedRotatingFileHandler
+
+        log_path = tmp_path / "resync.log"
+        handler = BufferedRotatingFileHandler(
+            log_path, flush_records=1, size_check_records=2, maxBytes=1000, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        def emit(msg):
+            handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, msg, None, None))
+
+        emit("ilk")
+        assert handler._size == 4
+        handler.stream.truncate(0)
+        handler.stream.seek(0)
+        emit("ikinci")
+        assert handler._size == len("ikinci\n")
+        handler.close()
+
+    def test_setup_logging_uses_queue_listener(self, tmp_path):
+        """Dosya handler'ı kuyruk üzerinden arka plan thread'inde çalışır"""
+        import logging
+        from logging.handlers import QueueHandler
+        import main
+
+        root_logger = logging.getLogger()
+        saved_handlers, saved_level = root_logger.handlers[:], root_logger.level
+
+        with patch('main.LOG_DIR', tmp_path):
+            setup_logging(debug=False)
+            try:
+                assert any(isinstance(h, QueueHandler) for h in root_logger.handlers)
+                assert main._log_listener is not None
+
+                logging.getLogger("sera.test").error("kuyruk testi")
+            finally:
+                main.stop_logging()
+                root_logger.handlers[:] = saved_handlers
+                root_logger.setLevel(saved_level)
+
+        assert main._log_listener is None
+        assert "kuyruk testi" in (tmp_path / LOG_FILE).read_text(encoding='utf-8')
+
+    def test_get_console_shared(self):
+        """Console ilk kullanımda bir kez oluşturulur"""
+        from main import get_console
+        assert get_console() is get_console()
+
+    def test_import_does_not_load_brain(self):
+        """main import'u brain/Rich stack'ini yüklemez"""
+        import subprocess
+        from main import PROJECT_ROOT
+
+        code = (
+            "import sys; import main; "
+            "assert 'core.brain' not in sys.modules; "
+            "assert 'rich.console' not in sys.modules"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
 
 # ==================== Integration Tests ====================
 
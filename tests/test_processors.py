@@ -2,8 +2,10 @@
 Sera Otonom - Processor Unit Tests
 """
 
+import copy
 import pytest
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 from processors.sensor_processor import SensorProcessor
 from processors.trend_analyzer import TrendAnalyzer
@@ -107,6 +109,15 @@ class TestSensorProcessor:
         assert processor.validate("humidity", 0) is True
         assert processor.validate("humidity", 100) is True
 
+    def test_validate_threshold_fallback(self, device_config):
+        """Device config'de olmayan ölçüm threshold critical değerleri + margin ile doğrulanır"""
+        processor = SensorProcessor(device_config, {"light": {"critical_low": 0, "critical_high": 1000}})
+
+        assert processor._fallback_range_by_name["light"] == (-100, 1100)
+        assert processor.validate("light", 1050) is True
+        assert processor.validate("light", 1200) is False
+        assert processor.validate("co2", 99999) is True  # Config yoksa geçerli
+
     def test_validate_invalid_type(self, processor):
         """Test validation with invalid value types"""
         assert processor.validate("temperature", "invalid") is False
@@ -139,6 +150,38 @@ class TestSensorProcessor:
         assert processor.determine_status("temperature", 40) == "critical"
         assert processor.determine_status("humidity", 97) == "critical"
 
+    def test_status_partial_thresholds(self, device_config):
+        """Eksik eşikler yok sayılır, sınır değerleri dahil"""
+        processor = SensorProcessor(device_config, {
+            "light": {"critical_high": 1000},
+            "co2": {"optimal_range": [400, 800]},
+        })
+
+        assert processor.determine_status("light", 1000) == "critical"
+        assert processor.determine_status("light", -50) == "normal"
+        assert processor.determine_status("co2", 400) == "normal"
+        assert processor.determine_status("co2", 900) == "warning"
+        assert processor.determine_status("unknown", 5) == "normal"
+
+    def test_validate_many_matches_scalar(self, processor):
+        """validate_many girdi sırasını korur, validate ile aynı sonucu verir"""
+        pairs = [
+            ("temperature", 25), ("humidity", 110), ("temperature", -20),
+            ("light", 1200), ("co2", 99999), ("humidity", "invalid"), ("temperature", None),
+        ]
+
+        assert processor.validate_many(pairs) == [processor.validate(t, v) for t, v in pairs]
+        assert processor.validate_many([]) == []
+
+    def test_status_batch_matches_scalar(self, processor):
+        """determine_status_batch tek tek çağrılarla aynı sonucu verir"""
+        values = [25, 14, 33, 8, 40, 15, 32, "invalid", None]
+        expected = [processor.determine_status("temperature", v) for v in values]
+
+        assert processor.determine_status_batch("temperature", values) == expected
+        assert processor.determine_status_batch("co2", [1, 2]) == ["normal", "normal"]
+        assert processor.determine_status_batch("temperature", []) == []
+
     def test_status_unknown_for_invalid(self, processor):
         """Test unknown status for invalid values"""
         assert processor.determine_status("temperature", "invalid") == "unknown"
@@ -186,6 +229,59 @@ class TestSensorProcessor:
         assert temp_measurement["status"] == "normal"
         assert temp_measurement["valid"] is True
 
+    def test_extractor_built_per_device(self, processor):
+        """Ölçüm extractor'ı init'te device başına bir kez derlenir"""
+        assert set(processor._extractors) == {"sera-temp-hum-01", "sera-soil-01"}
+        measurement = processor._extractors["sera-soil-01"]({"moisture": 40})[0]
+        assert (measurement["name"], measurement["unit"], measurement["valid_range"]) == ("soil_moisture", "%", [0, 100])
+
+    def test_extractor_matches_validate_and_status(self, processor):
+        """Derlenmiş extractor validate()/determine_status() ile aynı sonucu verir"""
+        extract = processor._extractors["sera-temp-hum-01"]
+        for temperature in (-50, 5, 12, 17, 25, 30, 34, 60, 100):
+            for humidity in (10, 45, 65, 85, 150):
+                results = {m["name"]: m for m in extract({"temperature": temperature, "humidity": humidity})}
+                for name, value in (("temperature", temperature), ("humidity", humidity)):
+                    assert results[name]["valid"] == processor.validate(name, value)
+                    assert results[name]["status"] == processor.determine_status(name, value)
+
+    def test_measurements_are_independent_dicts(self, processor):
+        """Şablondan kopyalanan ölçümler birbirini ve şablonu etkilemez"""
+        extract = processor._extractors["sera-soil-01"]
+        first = extract({"moisture": 40})[0]
+        first["value"] = -1
+        second = extract({"moisture": 55})[0]
+        assert second is not first
+        assert second["value"] == 55.0
+        assert list(second) == ["name", "value", "unit", "valid", "status", "valid_range"]
+
+    def test_tables_shared_for_same_config(self, device_config, threshold_config):
+        """Aynı config ile yeniden oluşturulan processor tabloları yeniden derlemez"""
+        first = SensorProcessor(device_config, threshold_config)
+        own_config = copy.deepcopy(device_config)
+        with patch.object(SensorProcessor, "_build_extractors") as build:
+            second = SensorProcessor(own_config, threshold_config)
+        build.assert_not_called()
+        assert second._extractors is first._extractors
+        assert second._status_rules is first._status_rules
+        # Haritalar paylaşılmaz; her processor kendi config dict'lerini gösterir
+        for sensor_id, sensor_data in own_config["sensors"].items():
+            assert second.sensor_map[sensor_id] is sensor_data
+        assert all(data is not first.sensor_map[sid] for sid, data in second.sensor_map.items())
+
+        changed = dict(threshold_config, temperature={"critical_low": 0, "critical_high": 50})
+        third = SensorProcessor(device_config, changed)
+        assert third._status_rules is not first._status_rules
+        assert third.determine_status("temperature", 45) == "normal"
+
+    def test_now_iso_cached_per_second(self, processor):
+        """Aynı saniye içindeki çağrılar formatlamayı tekrarlamaz"""
+        with patch('processors.sensor_processor.time.time', side_effect=[1700000000.1, 1700000000.9, 1700000001.2]):
+            first = processor._now_iso()
+            assert processor._now_iso() is first
+            assert processor._now_iso() != first
+        assert first == datetime.fromtimestamp(1700000000).isoformat(timespec="seconds")
+
     def test_process_unknown_device(self, processor):
         """Test processing message from unknown device"""
         raw_message = {
@@ -201,6 +297,52 @@ class TestSensorProcessor:
         result = processor.process(raw_message)
         assert result is None
 
+    def test_process_warnings_format_lazily(self, processor, caplog):
+        """Uyarı mesajları logger'a argüman olarak verilir (f-string yok)"""
+        raw_message = {
+            "end_device_ids": {"device_id": "unknown-device"},
+            "uplink_message": {"decoded_payload": {}}
+        }
+
+        with caplog.at_level("WARNING", logger="processors.sensor_processor"):
+            processor.process(raw_message)
+
+        record = caplog.records[-1]
+        assert record.msg == "Unknown device_id: %s"
+        assert record.args == ("unknown-device",)
+
+    def test_process_batch(self, processor):
+        """Batch işleme: geçersiz mesajlar atlanır, processed_at ortak"""
+        def message(device_id, temperature):
+            return {
+                "end_device_ids": {"device_id": device_id},
+                "uplink_message": {"decoded_payload": {"temperature": temperature, "humidity": 60.0}}
+            }
+
+        batch = [
+            message("sera-temp-hum-01", 25.0),
+            message("unknown-device", 25.0),
+            message("sera-temp-hum-01", 45.0),
+        ]
+        with patch.object(processor, "_now_iso", wraps=processor._now_iso) as now_iso:
+            results = processor.process_batch(batch)
+
+        assert now_iso.call_count == 1
+        assert [r["measurements"][0]["value"] for r in results] == [25.0, 45.0]
+        assert results[0]["processed_at"] == results[1]["processed_at"]
+        assert results[1]["measurements"][0] == processor.process(batch[2])["measurements"][0]
+        assert processor.process_batch([]) == []
+
+    def test_process_without_rx_metadata(self, processor):
+        """rx_metadata yok/boş veya gateway_ids null ise metadata alanları None"""
+        for rx_metadata in (None, [], [{"rssi": -70, "gateway_ids": None}]):
+            uplink = {"decoded_payload": {"moisture": 40}}
+            if rx_metadata is not None:
+                uplink["rx_metadata"] = rx_metadata
+            result = processor.process({"end_device_ids": {"device_id": "sera-soil-01"}, "uplink_message": uplink})
+            assert result["metadata"]["gateway_id"] is None
+        assert result["metadata"]["rssi"] == -70
+
     def test_process_missing_payload(self, processor):
         """Test processing message with missing payload"""
         raw_message = {
@@ -238,6 +380,12 @@ class TestSensorProcessor:
         ]
         assert processor.get_status_summary(measurements) == "normal"
 
+    def test_get_status_summary_unknown_and_empty(self, processor):
+        """Bilinmeyen status normal sayılır, boş liste normal"""
+        assert processor.get_status_summary([]) == "normal"
+        assert processor.get_status_summary([{"status": "unknown"}, {}]) == "normal"
+        assert processor.get_status_summary([{"status": "unknown"}, {"status": "warning"}]) == "warning"
+
 
 # ============================================================================
 # TrendAnalyzer Tests
@@ -325,6 +473,89 @@ class TestTrendAnalyzer:
         assert result["predicted_value"] > 24  # Should be higher
         assert "confidence" in result
 
+    def test_predict_cached_until_new_sample(self, analyzer):
+        """Yeni örnek gelmeden tahmin yeniden hesaplanmaz"""
+        base_time = datetime.now()
+        for i in range(4):
+            analyzer.add_sample("temperature", 20.0 + i, base_time + timedelta(hours=i))
+
+        with patch.object(analyzer, '_calculate_linear_regression',
+                          wraps=analyzer._calculate_linear_regression) as regression_spy:
+            first = analyzer.predict("temperature", 3)
+            assert analyzer.predict("temperature", 3) is first
+            assert regression_spy.call_count == 1
+
+            analyzer.add_sample("temperature", 30.0, base_time + timedelta(hours=4))
+            second = analyzer.predict("temperature", 3)
+            assert regression_spy.call_count == 2
+            assert second["current_value"] == 30.0
+
+        analyzer.clear_history("temperature")
+        assert analyzer.predict("temperature", 3) is None
+
+        # Pencere dolu ve yeni örnek son örnekle aynı zamanda: sayı ve uç zamanlar
+        # değişmese de tahmin yenilenir
+        capped = TrendAnalyzer(window_hours=6, min_samples=3, max_samples=3)
+        t0 = datetime.now() - timedelta(hours=1)
+        t1 = t0 + timedelta(minutes=30)
+        capped.add_sample("temperature", 20.0, t0)
+        capped.add_sample("temperature", 21.0, t0)
+        capped.add_sample("temperature", 22.0, t1)
+        assert capped.predict("temperature", 1)["current_value"] == 22.0
+
+        capped.add_sample("temperature", 40.0, t1)
+        assert capped.predict("temperature", 1)["current_value"] == 40.0
+
+    def test_summary_computes_regression_once(self, analyzer):
+        """get_summary: trend + 3 tahmin tek regresyon kullanır; eviction geçersizler"""
+        base_time = datetime.now() - timedelta(hours=1)
+        for i in range(5):
+            analyzer.add_sample("humidity", 60.0 + i, base_time + timedelta(minutes=10 * i))
+
+        with patch.object(analyzer, '_calculate_linear_regression',
+                          wraps=analyzer._calculate_linear_regression) as regression_spy:
+            analyzer.get_summary("humidity")
+            assert regression_spy.call_count == 1
+
+            analyzer.history["humidity"].keep_last(4)
+            analyzer.get_trend("humidity")
+            assert regression_spy.call_count == 2
+
+    def test_trend_params_resolved_once(self, analyzer):
+        """Eşik/birim sensör başına bir kez çözülür; bilinmeyen sensör varsayılanları alır"""
+        base_time = datetime.now() - timedelta(hours=1)
+        for sensor_type in ("light", "co2"):
+            for i in range(3):
+                analyzer.add_sample(sensor_type, 100.0 + i * 10, base_time + timedelta(minutes=10 * i))
+            analyzer.get_trend(sensor_type)
+
+        assert analyzer._trend_params == {"light": (50.0, "lux"), "co2": (0.5, "")}
+        assert analyzer.get_trend("light")["direction"] == "rising"  # 60 lux/saat > 50 eşiği
+        assert analyzer.get_trend("co2")["rate_formatted"] == "+60.00/hour"
+
+    def test_rate_formatted_sign(self, analyzer):
+        """Düşen trend '-' ile, sabit/yükselen '+' ile formatlanır"""
+        base_time = datetime.now() - timedelta(hours=3)
+        for i in range(3):
+            analyzer.add_sample("temperature", 30.0 - i * 1.25, base_time + timedelta(hours=i))
+            analyzer.add_sample("humidity", 60.0, base_time + timedelta(hours=i))
+
+        assert analyzer.get_trend("temperature")["rate_formatted"] == "-1.25°C/hour"
+        assert analyzer.get_trend("humidity")["rate_formatted"] == "+0.00%/hour"
+
+    def test_predict_many_matches_predict(self, analyzer):
+        """predict_many tek tek predict ile aynı (paylaşılan) sonuçları döndürür"""
+        base_time = datetime.now() - timedelta(hours=2)
+        for i in range(6):
+            analyzer.add_sample("soil_moisture", 50.0 - i * 1.5, base_time + timedelta(minutes=20 * i))
+
+        many = analyzer.predict_many("soil_moisture", (1, 3, 6))
+        assert list(many) == [1, 3, 6]
+        for hours, prediction in many.items():
+            assert analyzer.predict("soil_moisture", hours) is prediction
+        assert many[6]["predicted_value"] < many[1]["predicted_value"]
+        assert analyzer.predict_many("unknown", (1, 3)) == {}
+
     def test_predict_insufficient_samples(self, analyzer):
         """Test prediction with insufficient samples"""
         analyzer.add_sample("temperature", 25.0)
@@ -349,6 +580,17 @@ class TestTrendAnalyzer:
         assert result["statistics"]["max"] == 24.0
         assert "predictions" in result
 
+    def test_summary_statistics_after_eviction(self, analyzer):
+        """Ortalama artımlı toplamdan gelir ve eviction sonrası da doğrudur"""
+        base_time = datetime.now() - timedelta(hours=1)
+        analyzer.max_samples = 4
+        for i, value in enumerate([10.0, 30.0, 21.5, 18.0, 26.0, 19.5]):
+            analyzer.add_sample("humidity", value, base_time + timedelta(minutes=i))
+
+        stats = analyzer.get_summary("humidity")["statistics"]
+        assert stats["mean"] == pytest.approx((21.5 + 18.0 + 26.0 + 19.5) / 4)
+        assert (stats["min"], stats["max"], stats["range"]) == (18.0, 26.0, 8.0)
+
     def test_clear_history(self, analyzer):
         """Test clearing history"""
         analyzer.add_sample("temperature", 25.0)
@@ -395,6 +637,143 @@ class TestTrendAnalyzer:
         assert abs(slope - 2.0) < 0.01  # Slope should be ~2
         assert abs(r_squared - 1.0) < 0.01  # Perfect fit
 
+    @staticmethod
+    def _reference_regression(samples):
+        """İki geçişli referans OLS (x: ilk örnekten itibaren saat)"""
+        base_time = samples[0].timestamp
+        xs = [(s.timestamp - base_time).total_seconds() / 3600 for s in samples]
+        ys = [s.value for s in samples]
+        n = len(xs)
+        x_mean, y_mean = sum(xs) / n, sum(ys) / n
+        sxx = sum((x - x_mean) ** 2 for x in xs)
+        if sxx == 0:
+            return 0.0, y_mean, 0.0
+        slope = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / sxx
+        intercept = y_mean - slope * x_mean
+        ss_tot = sum((y - y_mean) ** 2 for y in ys)
+        ss_res = sum((y - (slope * x + intercept)) ** 2 for x, y in zip(xs, ys))
+        return slope, intercept, (1 - ss_res / ss_tot) if ss_tot else 0.0
+
+    def test_running_sums_match_two_pass_regression(self, analyzer):
+        """Artımlı toplamlar iki geçişli hesapla aynı sonucu verir (eviction sonrası dahil)"""
+        import processors.trend_analyzer as trend_module
+
+        base_time = datetime.now() - timedelta(hours=5)
+        noisy = [(20.0 + 0.7 * i + (-1) ** i * 0.3, base_time + timedelta(minutes=7 * i)) for i in range(40)]
+        flat = [(55.0, base_time + timedelta(minutes=i)) for i in range(5)]
+        same_time = [(float(i), base_time) for i in range(3)]
+
+        for data in (noisy, flat, same_time):
+            samples = trend_module.SampleSeries(data[0][1])
+            for v, t in data:
+                samples.append(v, t)
+            result = analyzer._calculate_linear_regression(samples)
+            assert result == pytest.approx(self._reference_regression(samples), abs=1e-9)
+
+        # Kayan pencere: çıkarılan örneklerin katkısı toplamlardan düşülür
+        samples = trend_module.SampleSeries(base_time)
+        for i, (v, t) in enumerate(noisy):
+            samples.append(v * 100, t)
+            samples.keep_last(15)
+            if len(samples) >= 2:
+                assert samples.regression() == pytest.approx(
+                    self._reference_regression(samples), rel=1e-9, abs=1e-9
+                )
+        assert samples.base_time > base_time  # pencere yenilendi, base taşındı
+
+    def test_running_sums_stable_for_large_values(self):
+        """Büyük mutlak değerlerde (1e8) slope/r² iptal hatasına düşmez"""
+        from processors.trend_analyzer import SampleSeries
+
+        base_time = datetime(2025, 1, 1)
+        samples = SampleSeries(base_time)
+        for i in range(600):
+            noise = 0.01 if i % 2 else -0.01
+            samples.append(1e8 + 2.0 * (i / 60) + noise, base_time + timedelta(minutes=i))
+            samples.keep_last(400)
+
+        slope, intercept, r_squared = samples.regression()
+        ref_slope, ref_intercept, ref_r_squared = self._reference_regression(samples)
+        assert slope == pytest.approx(ref_slope, rel=1e-10)
+        assert intercept == pytest.approx(ref_intercept, rel=1e-12)
+        assert r_squared == pytest.approx(ref_r_squared, abs=1e-9)
+        assert samples.mean() == pytest.approx(sum(samples.values) / len(samples), rel=1e-12)
+
+    def test_history_stored_as_float_columns(self, analyzer):
+        """Örnekler paralel dizilerde tutulur, erişimde Sample üretilir"""
+        base_time = datetime.now() - timedelta(hours=8)
+        analyzer.add_sample("temperature", 99.0, base_time)  # pencere dışı
+        analyzer.add_sample("temperature", 22.0, base_time + timedelta(hours=7))
+        analyzer.add_sample("temperature", 21.0, base_time + timedelta(hours=6))  # sıra dışı
+        analyzer.add_sample("temperature", 23.5, base_time + timedelta(hours=7, minutes=30))
+
+        series = analyzer.history["temperature"]
+        assert series.values.typecode == "d"
+        assert series.offsets.typecode == "q"  # mikrosaniye, tamsayı
+        assert list(series.values) == [22.0, 21.0, 23.5]
+        assert series[0].timestamp == base_time + timedelta(hours=7)
+        assert [s.value for s in series] == [22.0, 21.0, 23.5]
+
+        stamp = base_time + timedelta(hours=7, minutes=45, microseconds=123457)
+        analyzer.add_sample("temperature", 23.0, stamp)
+        assert analyzer.history["temperature"][-1].timestamp == stamp  # yuvarlamasız
+
+        analyzer.max_samples = 2
+        analyzer.add_sample("temperature", 24.0)
+        assert list(analyzer.history["temperature"].values) == [23.0, 24.0]
+
+    def test_add_samples_matches_sequential(self, analyzer):
+        """Toplu ekleme tek tek eklemeyle aynı pencere ve regresyonu üretir"""
+        base_time = datetime.now() - timedelta(hours=8)
+        values = [20.0, 21.5, 23.0, 22.0, 26.0, 27.5, 25.0]
+        timestamps = [base_time + timedelta(hours=i) for i in range(7)]
+        timestamps[5], timestamps[6] = timestamps[6], timestamps[5]  # sıra dışı
+
+        analyzer.add_samples("temperature", values, timestamps)
+        sequential = TrendAnalyzer(window_hours=6, min_samples=3)
+        for value, timestamp in zip(values, timestamps):
+            sequential.add_sample("temperature", value, timestamp)
+
+        batch = analyzer.history["temperature"]
+        single = sequential.history["temperature"]
+        assert list(batch.values) == list(single.values) == [22.0, 26.0, 27.5, 25.0]
+        assert [s.timestamp for s in batch] == [s.timestamp for s in single]
+        assert batch.regression() == pytest.approx(single.regression(), abs=1e-9)
+
+        with pytest.raises(ValueError):
+            analyzer.add_samples("temperature", [1.0], [])
+
+    def test_add_sample_reads_clock_once(self, analyzer):
+        """Zaman verilmeyen örnekte datetime.now() bir kez çağrılır"""
+        import processors.trend_analyzer as trend_module
+
+        fixed = datetime(2025, 1, 1, 12, 0)
+        with patch.object(trend_module, "datetime") as mock_datetime:
+            mock_datetime.now.return_value = fixed
+            analyzer.add_sample("temperature", 25.0)
+            assert mock_datetime.now.call_count == 1
+
+        assert analyzer.history["temperature"][0].timestamp == fixed
+
+    def test_drop_older_than_binary_search(self):
+        """Sıralı pencerede eskiler binary search ile; sıra dışı örnekte tam filtre ile çıkar"""
+        from processors.trend_analyzer import SampleSeries
+
+        base_time = datetime(2025, 1, 1, 12, 0)
+        series = SampleSeries(base_time)
+        for i in range(10):
+            series.append(float(i), base_time + timedelta(minutes=i))
+
+        series.drop_older_than(base_time + timedelta(minutes=3))
+        assert list(series.values) == [4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+        assert series._sorted
+
+        series.append(99.0, base_time + timedelta(minutes=5, seconds=30))  # sıra dışı
+        assert not series._sorted
+        series.drop_older_than(base_time + timedelta(minutes=5, seconds=45))
+        assert list(series.values) == [6.0, 7.0, 8.0, 9.0]
+        assert series._sorted  # tam filtre sonrası sıra yeniden kontrol edilir
+
     def test_empty_sensor_summary(self, analyzer):
         """Test summary for sensor with no data"""
         result = analyzer.get_summary("nonexistent")
@@ -5,6 +5,8 @@ TTS MQTT Connector Tests
 import pytest
 import asyncio
 import json
+import os
+import threading
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from datetime import datetime
 
@@ -45,6 +47,35 @@ class TestConfigLoader:
             assert result['level1']['key1'] == 'value1'
             assert result['level1']['level2']['key2'] == 'value2'
 
+    def test_load_cached_until_file_changes(self, tmp_path):
+        """Config tekrar parse edilmez; dosya değişince yeniden yüklenir"""
+        import yaml
+
+        config_dir = tmp_path / "config"
+        config_dir.mkdir()
+        config_file = config_dir / "demo.yaml"
+        config_file.write_text("value: 1\n")
+        loader = ConfigLoader(base_path=tmp_path)
+
+        with patch('utils.config_loader.yaml.safe_load', wraps=yaml.safe_load) as safe_load:
+            first = loader.load("demo")
+            assert loader.load("demo") is first
+            assert safe_load.call_count == 1
+
+            config_file.write_text("value: 2\n")
+            stat = config_file.stat()
+            os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+            assert loader.load("demo") == {"value": 2}
+            assert safe_load.call_count == 2
+
+    def test_load_missing_file(self, tmp_path):
+        """Olmayan config FileNotFoundError verir"""
+        loader = ConfigLoader(base_path=tmp_path)
+
+        with pytest.raises(FileNotFoundError):
+            loader.load("missing")
+
 
 class TestStateManager:
     """State Manager Tests"""
@@ -83,6 +114,123 @@ class TestStateManager:
         result = manager.get("test", "nonexistent.path", default="default")
         assert result == "default"
 
+    def test_mutate_single_write(self, tmp_path):
+        """mutate okur, fonksiyonu uygular ve bir kez yazar"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"items": [1], "count": 1})
+
+        def add_item(state):
+            state["items"].append(2)
+            state["count"] += 1
+
+        with patch.object(manager, '_dump', wraps=manager._dump) as mock_dump:
+            result = manager.mutate("test", add_item)
+
+        assert mock_dump.call_count == 1
+        assert result["items"] == [1, 2]
+        assert result["count"] == 2
+        assert "timestamp" in result
+        assert manager.read("test")["items"] == [1, 2]
+
+    def test_append_and_update(self, tmp_path):
+        """Liste ekleme + alan güncelleme tek yazımda"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"items": [1, 2], "stats": {"total": 2, "keep": True}})
+
+        with patch.object(manager, '_dump', wraps=manager._dump) as mock_dump:
+            result = manager.append_and_update(
+                "test", "items", 3, max_items=2,
+                updates=lambda s: {"stats": {"total": s["stats"]["total"] + 1}}
+            )
+
+        assert mock_dump.call_count == 1
+        assert result["items"] == [2, 3]
+        assert result["stats"] == {"total": 3, "keep": True}
+
+    def test_transaction_writes_once_on_exit(self, tmp_path):
+        """transaction bloğu in-place değişikliği tek yazımla kaydeder"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"stats": {"total": 1}})
+
+        with patch.object(manager, '_dump', wraps=manager._dump) as mock_dump:
+            with manager.transaction("test") as state:
+                state["stats"]["total"] += 1
+            assert mock_dump.call_count == 1
+
+        assert manager.read("test")["stats"]["total"] == 2
+
+    def test_transaction_no_write_on_error(self, tmp_path):
+        """Exception ile biten transaction dosyayı değiştirmez"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"value": 1})
+
+        with pytest.raises(ValueError):
+            with manager.transaction("test") as state:
+                state["value"] = 2
+                raise ValueError("abort")
+
+        assert manager.read("test")["value"] == 1
+
+    def test_read_view_cached_until_write(self, tmp_path):
+        """read_view kopyasız cache döner, yazım cache'i düşürür"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"value": 1})
+
+        view = manager.read_view("test")
+        assert manager.read_view("test") is view
+
+        manager.write("test", {"value": 2})
+        assert manager.read_view("test")["value"] == 2
+
+    def test_read_view_does_not_restore_stale_cache(self, tmp_path):
+        """Okuma lock'u bıraktığı anda araya giren yazım eski dict'in cache'e girmesine yol açmaz"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"value": 1})
+
+        class WriteOnRelease:
+            """Lock bırakılırken bir kez yazım yapar (yarışı deterministik kurar)"""
+
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.pending = True
+
+            def __enter__(self):
+                self.lock.acquire()
+
+            def __exit__(self, *exc):
+                self.lock.release()
+                if self.pending:
+                    self.pending = False
+                    manager.write("test", {"value": 2})
+
+        manager._locks["test"] = WriteOnRelease()
+        manager.read_view("test")
+
+        assert manager.read_view("test")["value"] == 2
+
+    def test_write_replaces_file_atomically(self, tmp_path):
+        """Yazım geçici dosya + os.replace ile yapılır, geride .tmp kalmaz"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"value": 1})
+
+        with patch('utils.state_manager.os.replace', wraps=os.replace) as mock_replace:
+            manager.mutate("test", lambda s: s.update(value=2))
+
+        assert mock_replace.call_count == 1
+        assert manager.read("test")["value"] == 2
+        assert not list((tmp_path / "state").glob("*.tmp"))
+
+    def test_mutate_replaces_state(self, tmp_path):
+        """mutate fonksiyonu yeni dict dönerse o yazılır"""
+        manager = StateManager(base_path=tmp_path)
+        manager.write("test", {"a": 1})
+
+        result = manager.mutate("test", lambda s: {**s, "b": 2})
+
+        assert result["a"] == 1
+        assert result["b"] == 2
+        assert manager.read("test")["b"] == 2
+
 
 class TestTTSMQTTConnector:
     """TTS MQTT Connector Tests"""
@@ -197,6 +345,48 @@ class TestTTSMQTTConnector:
         assert not result.success
         assert 'not found' in result.error
 
+    @pytest.mark.asyncio
+    async def test_message_loop_parses_bytes_payload(self):
+        """Uplink payload'ı bytes olarak parse edilir, bozuk JSON hata sayar"""
+        connector = TTSMQTTConnector({'app_id': 'test-app'})
+        received = []
+        connector.on_message(received.append)
+
+        async def messages():
+            for payload in (b'{"uplink_message": {"decoded_payload": {"t": 21.5}}}', b'{bad'):
+                yield MagicMock(topic="v3/test-app/devices/sensor-01/up", payload=payload)
+
+        connector.client = MagicMock(messages=messages())
+        await connector._message_loop()
+
+        assert len(received) == 1
+        assert received[0]['device_id'] == 'sensor-01'
+        assert received[0]['payload']['uplink_message']['decoded_payload']['t'] == 21.5
+        assert connector.stats['uplinks_received'] == 1
+        assert connector.stats['errors'] == 1
+
+    @pytest.mark.asyncio
+    async def test_message_loop_async_callback(self):
+        """Async callback kayıtta sınıflandırılır ve doğrudan await edilir"""
+        connector = TTSMQTTConnector({'app_id': 'test-app'})
+        received = []
+
+        async def handler(message):
+            received.append(message['device_id'])
+
+        connector.on_message(handler)
+        assert connector._callback_is_coro is True
+
+        async def messages():
+            yield MagicMock(topic="v3/test-app/devices/sensor-02/up", payload=b'{}')
+
+        connector.client = MagicMock(messages=messages())
+        with patch('connectors.tts_mqtt.asyncio.iscoroutinefunction') as iscoro:
+            await connector._message_loop()
+            iscoro.assert_not_called()
+
+        assert received == ['sensor-02']
+
     def test_downlink_result_dataclass(self):
         """DownlinkResult dataclass testi"""
         result = DownlinkResult(
@@ -99,6 +99,13 @@ class TestWeatherConnectorInit:
         assert connector.lat == 0
         assert connector.lon == 0
 
+    def test_concurrency_limit(self):
+        """Concurrent request limit defaults to 4 and is configurable"""
+        assert WeatherConnector({"api_key": "test"})._sem._value == 4
+
+        connector = WeatherConnector({"api_key": "test", "max_concurrent_requests": 2})
+        assert connector._sem._value == 2
+
     def test_stats_initialized(self):
         """Stats should be initialized with zeros"""
         connector = WeatherConnector({"api_key": "test"})
@@ -156,6 +163,26 @@ class TestWeatherConnectorConnect:
         assert connector.session is None
         assert connector.is_connected is False
 
+    @pytest.mark.asyncio
+    async def test_async_context_manager(self):
+        """async with connects on entry and closes the shared session on exit"""
+        connector = WeatherConnector({
+            "api_key": "test_key",
+            "location": {"lat": 35.18, "lon": 33.38},
+            "max_concurrent_requests": 2
+        })
+
+        async with connector as conn:
+            assert conn is connector
+            assert connector.is_connected is True
+            session = connector.session
+            assert await connector._get_session() is session
+            assert session.connector.limit == 2
+
+        assert session.closed
+        assert connector.session is None
+        assert connector.is_connected is False
+
 
 # ==================== Cache Tests ====================
 
@@ -208,7 +235,7 @@ class TestWeatherConnectorCache:
         """Force refresh bypasses cache"""
         connector = WeatherConnector({
             "api_key": "test_key",
-            "location": {"lat": 35.18, "lon": 33.38}
+            "location": {"name": "Nicosia", "lat": 35.18, "lon": 33.38}
         })
 
         # Setup cache
@@ -218,16 +245,22 @@ class TestWeatherConnectorCache:
         # Mock the request
         with patch.object(connector, '_request_with_retry', new_callable=AsyncMock) as mock_request:
             mock_request.return_value = {
-                "main": {"temp": 30, "humidity": 60},
-                "weather": [{"description": "Clear"}],
-                "wind": {"speed": 5},
-                "clouds": {"all": 10},
-                "name": "New City"
+                "timezone": "Europe/Nicosia",
+                "current": {
+                    "temp": 30,
+                    "humidity": 60,
+                    "weather": [{"description": "Clear"}],
+                    "wind_speed": 5,
+                    "clouds": 10
+                },
+                "daily": []
             }
 
             result = await connector.get_current_weather(force_refresh=True)
 
             assert result.temperature == 30
+            # Konum adı config'den; timezone ID'si konum olarak kullanılmaz
+            assert result.location == "Nicosia"
             assert connector._stats["cache_hits"] == 0
             mock_request.assert_called_once()
 
@@ -398,6 +431,30 @@ class TestWeatherConnectorStaleCache:
 
         await connector.disconnect()
 
+    @pytest.mark.asyncio
+    async def test_failure_is_negatively_cached(self):
+        """After a failed request, calls within the TTL skip the network"""
+        connector = WeatherConnector({"api_key": "test_key"})
+        connector._cache = WeatherData(temperature=22)
+        connector._cache_time = datetime.now() - timedelta(minutes=30)  # Stale
+
+        with patch.object(connector, '_request_with_retry', new_callable=AsyncMock) as mock_request:
+            mock_request.return_value = None
+
+            first = await connector.get_current_weather()
+            second = await connector.get_current_weather()
+            forecast = await connector.get_forecast()
+
+            assert mock_request.call_count == 1
+            assert first.temperature == 22
+            assert second.temperature == 22
+            assert forecast is None
+
+            # TTL dolunca tekrar denenir
+            connector._failure_deadline = 0.0
+            await connector.get_current_weather()
+            assert mock_request.call_count == 2
+
 
 # ==================== Health Check Tests ====================
 
@@ -504,13 +561,15 @@ class TestWeatherConnectorForecast:
         })
 
         mock_data = {
-            "list": [
+            "current": {"temp": 19, "humidity": 62},
+            "daily": [
                 {
                     "dt": 1704067200,
-                    "main": {"temp": 20, "temp_min": 18, "temp_max": 22, "humidity": 60},
+                    "temp": {"day": 20, "min": 18, "max": 22},
+                    "humidity": 60,
                     "weather": [{"description": "Clear"}],
-                    "wind": {"speed": 3},
-                    "clouds": {"all": 5},
+                    "wind_speed": 3,
+                    "clouds": 5,
                     "pop": 0.1
                 }
             ]
@@ -528,6 +587,39 @@ class TestWeatherConnectorForecast:
 
         await connector.disconnect()
 
+    @pytest.mark.asyncio
+    async def test_current_and_forecast_share_one_request(self):
+        """Current weather and forecast come from a single One Call request"""
+        connector = WeatherConnector({
+            "api_key": "test_key",
+            "location": {"lat": 35.18, "lon": 33.38}
+        })
+
+        mock_data = {
+            "current": {"temp": 25, "humidity": 55, "weather": [{"description": "Sunny"}]},
+            "daily": [
+                {"dt": 1704067200 + i * 86400, "temp": {"day": 24 + i, "min": 18, "max": 28}, "pop": 0.2}
+                for i in range(5)
+            ]
+        }
+
+        with patch.object(connector, '_request_with_retry', new_callable=AsyncMock) as mock_request:
+            mock_request.return_value = mock_data
+
+            current = await connector.get_current_weather()
+            forecast = await connector.get_forecast(days=3)
+
+            assert current.temperature == 25
+            assert current.forecast_high == 28
+            assert current.rain_probability == 20.0
+            assert len(forecast) == 3
+            assert forecast[2]["temperature"] == 26
+            mock_request.assert_called_once()
+            assert mock_request.call_args.kwargs["base_url"] == connector.ONECALL_URL
+            assert connector._stats["cache_hits"] == 1
+
+        await connector.disconnect()
+
     @pytest.mark.asyncio
     async def test_get_forecast_failure(self):
         """Get forecast returns None on failure"""
@@ -595,6 +687,20 @@ class TestWeatherConnectorLegacy:
 
         await connector.disconnect()
 
+    @pytest.mark.asyncio
+    async def test_get_current_cache_fast_path(self):
+        """get_current serves a valid cache without calling get_current_weather"""
+        connector = WeatherConnector({"api_key": "test_key"})
+        connector._cache = WeatherData(temperature=22)
+        connector._cache_time = datetime.now()
+
+        with patch.object(connector, 'get_current_weather', new_callable=AsyncMock) as mock_get:
+            result = await connector.get_current()
+
+            mock_get.assert_not_called()
+            assert result["temperature"]["current"] == 22
+            assert connector._stats["cache_hits"] == 1
+
 
 # ==================== Configuration Tests ====================
 
@@ -9,7 +9,7 @@ import re
 import yaml
 import logging
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -30,7 +30,8 @@ class ConfigLoader:
         """
         self.base_path = base_path or self._find_project_root()
         self._load_env()
-        self._cache: Dict[str, Any] = {}
+        # config_name -> (dosya mtime_ns, çözülmüş config)
+        self._cache: Dict[str, Tuple[int, Any]] = {}
         logger.info(f"ConfigLoader initialized with base_path: {self.base_path}")
 
     def _find_project_root(self) -> Path:
@@ -80,6 +81,9 @@ class ConfigLoader:
         """
         Config dosyasını yükle
 
+        Sonuç cache'lenir; dosyanın mtime'ı değişirse bir sonraki çağrıda
+        yeniden parse edilir.
+
         Args:
             config_name: Config dosya adı (uzantısız, örn: "settings")
             use_cache: Cache kullan mı?
@@ -87,13 +91,18 @@ class ConfigLoader:
         Returns:
             Config dictionary
         """
-        if use_cache and config_name in self._cache:
-            return self._cache[config_name]
-
         config_path = self.base_path / "config" / f"{config_name}.yaml"
 
-        if not config_path.exists():
-            raise FileNotFoundError(f"Config file not found: {config_path}")
+        try:
+            mtime_ns = config_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Config file not found: {config_path}") from None
+
+        # Cache, dosya değişmediği sürece geçerli (stat, YAML parse'a göre çok ucuz)
+        if use_cache:
+            cached = self._cache.get(config_name)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
 
         with open(config_path, 'r', encoding='utf-8') as f:
             raw_config = yaml.safe_load(f)
@@ -101,7 +110,7 @@ class ConfigLoader:
         resolved_config = self._resolve_env_vars(raw_config)
 
         if use_cache:
-            self._cache[config_name] = resolved_config
+            self._cache[config_name] = (mtime_ns, resolved_config)
 
         logger.info(f"Loaded config: {config_name}")
         return resolved_config
@@ -0,0 +1,87 @@
+"""
+Sera Otonom - JSON Utilities
+
+orjson varsa onu, yoksa stdlib json'u kullanan ince sarmalayıcı
+"""
+
+import dataclasses
+import json
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson opsiyonel
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+# orjson.JSONDecodeError, json.JSONDecodeError'dan türer; tek tip yakalamak yeterli
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj: Any) -> Any:
+    """stdlib json için orjson'un yerel desteklediği tipleri çevir"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Objeyi JSON string'e çevir (UTF-8 karakterler escape edilmez)
+
+    datetime/date ve dataclass objeleri doğrudan serialize edilir
+    (orjson'da C tarafında, stdlib'de isoformat/asdict ile).
+
+    Args:
+        obj: Serialize edilecek obje
+        indent: True ise 2 boşluk girinti, False ise boşluksuz compact çıktı
+
+    Returns:
+        JSON string
+    """
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_default)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """
+    Objeyi UTF-8 JSON bytes'a çevir
+
+    Dosyaya/ağa yazılacak çıktı için: orjson'un bytes çıktısı decode/encode
+    turu yapılmadan döner.
+
+    Args:
+        obj: Serialize edilecek obje
+        indent: True ise 2 boşluk girinti
+
+    Returns:
+        UTF-8 kodlu JSON
+    """
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return dumps(obj, indent=indent).encode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    JSON string/bytes'ı parse et
+
+    Raises:
+        JSONDecodeError: Geçersiz JSON
+    """
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
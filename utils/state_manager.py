@@ -4,15 +4,18 @@ Sera Otonom - State Manager
 JSON state dosyalarını yönetir (read/write/update)
 """
 
-import json
 import logging
+import os
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, Optional
 from threading import Lock
+from contextlib import contextmanager
 import copy
 
+from utils import json_utils
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,9 +54,11 @@ class StateManager:
 
     def _get_lock(self, state_name: str) -> Lock:
         """State için lock al (lazy initialization)"""
-        if state_name not in self._locks:
-            self._locks[state_name] = Lock()
-        return self._locks[state_name]
+        lock = self._locks.get(state_name)
+        if lock is None:
+            # setdefault atomik: iki thread aynı anda iki farklı lock yaratamaz
+            lock = self._locks.setdefault(state_name, Lock())
+        return lock
 
     def _initialize_from_templates(self) -> None:
         """Template'lerden state dosyalarını oluştur (yoksa)"""
@@ -73,6 +78,18 @@ class StateManager:
         """State dosya yolunu al"""
         return self.state_dir / f"{state_name}.json"
 
+    def path_for(self, state_name: str) -> Path:
+        """
+        State dosya yolunu al (mtime tabanlı cache'ler için)
+
+        Args:
+            state_name: State dosya adı
+
+        Returns:
+            State dosyasının yolu
+        """
+        return self._get_state_path(state_name)
+
     def read(self, state_name: str, use_cache: bool = False) -> Dict[str, Any]:
         """
         State dosyasını oku
@@ -84,26 +101,65 @@ class StateManager:
         Returns:
             State dictionary
         """
-        if use_cache and state_name in self._cache:
-            return copy.deepcopy(self._cache[state_name])
-
-        state_path = self._get_state_path(state_name)
+        if use_cache:
+            return copy.deepcopy(self.read_view(state_name))
 
         with self._get_lock(state_name):
-            if not state_path.exists():
-                # Template'den oluşturmayı dene
-                template_path = self.template_dir / f"{state_name}.json"
-                if template_path.exists():
-                    shutil.copy(template_path, state_path)
-                else:
-                    raise FileNotFoundError(f"State file not found: {state_path}")
-
-            with open(state_path, 'r', encoding='utf-8') as f:
-                state = json.load(f)
-
-        self._cache[state_name] = copy.deepcopy(state)
+            state = self._load(state_name)
+            # Dönen dict çağırana ait, cache'e konmaz; eski girdi düşürülür,
+            # sonraki read_view diskten taze okur
+            self._cache.pop(state_name, None)
+        return state
+
+    def read_view(self, state_name: str) -> Dict[str, Any]:
+        """
+        State'in cache'lenmiş anlık görüntüsü (kopyasız, SALT OKUNUR)
+
+        Dönen dict değiştirilmemeli; değiştirmek için transaction/mutate kullan.
+        Cache her yazımda düşürüldüğü için yazımdan sonraki ilk çağrı diskten okur.
+
+        Args:
+            state_name: State dosya adı
+
+        Returns:
+            Paylaşılan state dictionary
+        """
+        state = self._cache.get(state_name)
+        if state is None:
+            with self._get_lock(state_name):
+                state = self._load(state_name)
+                # Lock içinde sakla: araya giren bir yazım cache'i düşürdükten sonra
+                # eski dict geri yazılamaz
+                self._cache[state_name] = state
         return state
 
+    def _load(self, state_name: str) -> Dict[str, Any]:
+        """State dosyasını diskten oku (lock çağıran tarafta tutulmalı)"""
+        state_path = self._get_state_path(state_name)
+
+        if not state_path.exists():
+            # Template'den oluşturmayı dene
+            template_path = self.template_dir / f"{state_name}.json"
+            if template_path.exists():
+                shutil.copy(template_path, state_path)
+            else:
+                raise FileNotFoundError(f"State file not found: {state_path}")
+
+        with open(state_path, 'rb') as f:
+            return json_utils.loads(f.read())
+
+    def _dump(self, state_name: str, data: Dict[str, Any]) -> None:
+        """State dosyasını diske yaz (lock çağıran tarafta tutulmalı)"""
+        # Önce serialize et; hata olursa mevcut dosya kırpılmaz
+        payload = json_utils.dumps_bytes(data, indent=True) + b"\n"
+        # Geçici dosyaya yaz, tek os.replace ile değiştir: okuyan taraf
+        # (dashboard, diğer process'ler) yarım yazılmış dosya görmez
+        state_path = self._get_state_path(state_name)
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, state_path)
+
     def write(self, state_name: str, data: Dict[str, Any]) -> None:
         """
         State dosyasına yaz (tamamen üzerine yaz)
@@ -112,13 +168,10 @@ class StateManager:
             state_name: State dosya adı
             data: Yazılacak data
         """
-        state_path = self._get_state_path(state_name)
-
         with self._get_lock(state_name):
-            with open(state_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self._dump(state_name, data)
+            self._cache.pop(state_name, None)
 
-        self._cache[state_name] = copy.deepcopy(data)
         logger.debug(f"State written: {state_name}")
 
     def update(self, state_name: str, updates: Dict[str, Any], deep: bool = True) -> Dict[str, Any]:
@@ -133,19 +186,67 @@ class StateManager:
         Returns:
             Güncellenmiş state
         """
-        state = self.read(state_name)
+        with self.transaction(state_name) as state:
+            if deep:
+                self._deep_merge(state, updates)
+            else:
+                state.update(updates)
 
-        if deep:
-            self._deep_merge(state, updates)
-        else:
-            state.update(updates)
+        return state
 
-        # Timestamp güncelle
-        state['timestamp'] = datetime.utcnow().isoformat() + 'Z'
+    def mutate(
+        self,
+        state_name: str,
+        fn: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        State'i tek lock altında oku-değiştir-yaz
+
+        read + update çiftinin aksine dosya bir kez okunur ve bir kez yazılır,
+        arada başka bir yazıcı araya giremez.
+
+        Args:
+            state_name: State dosya adı
+            fn: Mevcut state'i alıp yeni state'i dönen fonksiyon
+                (None dönerse state in-place değiştirilmiş kabul edilir)
+
+        Returns:
+            Güncellenmiş state
+        """
+        with self.transaction(state_name) as state:
+            result = fn(state)
+            if result is not None and result is not state:
+                state.clear()
+                state.update(result)
 
-        self.write(state_name, state)
         return state
 
+    @contextmanager
+    def transaction(self, state_name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Lock altında state'i in-place değiştir, çıkışta bir kez yaz
+
+        Blok exception ile biterse dosyaya yazılmaz.
+
+        Örnek:
+            with state_manager.transaction("decisions") as state:
+                state["stats"]["total_decisions"] += 1
+
+        Args:
+            state_name: State dosya adı
+
+        Yields:
+            Değiştirilebilir state dictionary
+        """
+        with self._get_lock(state_name):
+            state = self._load(state_name)
+            yield state
+
+            # Timestamp güncelle
+            state['timestamp'] = datetime.utcnow().isoformat() + 'Z'
+            self._dump(state_name, state)
+            self._cache.pop(state_name, None)
+
     def _deep_merge(self, base: Dict, updates: Dict) -> None:
         """Dictionary'leri deep merge et (in-place)"""
         for key, value in updates.items():
@@ -218,26 +319,53 @@ class StateManager:
             item: Eklenecek item
             max_items: Maksimum item sayısı (aşarsa eskiler silinir)
         """
-        state = self.read(state_name)
-        keys = list_path.split('.')
+        self.append_and_update(state_name, list_path, item, max_items)
 
-        # Navigate to list
-        current = state
-        for key in keys[:-1]:
-            current = current.get(key, {})
+    def append_and_update(
+        self,
+        state_name: str,
+        list_path: str,
+        item: Any,
+        max_items: Optional[int] = None,
+        updates: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Listeye item ekle ve aynı yazımda diğer alanları güncelle
 
+        Args:
+            state_name: State dosya adı
+            list_path: Liste key yolu
+            item: Eklenecek item
+            max_items: Maksimum item sayısı (aşarsa eskiler silinir)
+            updates: Deep merge edilecek dict ya da item eklendikten sonraki
+                state'i alıp böyle bir dict dönen fonksiyon
+
+        Returns:
+            Güncellenmiş state
+        """
+        keys = list_path.split('.')
         list_key = keys[-1]
-        if list_key not in current:
-            current[list_key] = []
 
-        current[list_key].append(item)
+        def _apply(state: Dict[str, Any]) -> None:
+            # Navigate to list
+            current = state
+            for key in keys[:-1]:
+                current = current.get(key, {})
 
-        # Limit list size
-        if max_items and len(current[list_key]) > max_items:
-            current[list_key] = current[list_key][-max_items:]
+            if list_key not in current:
+                current[list_key] = []
 
-        state['timestamp'] = datetime.utcnow().isoformat() + 'Z'
-        self.write(state_name, state)
+            current[list_key].append(item)
+
+            # Limit list size
+            if max_items and len(current[list_key]) > max_items:
+                current[list_key] = current[list_key][-max_items:]
+
+            extra = updates(state) if callable(updates) else updates
+            if extra:
+                self._deep_merge(state, extra)
+
+        return self.mutate(state_name, _apply)
 
     def reset(self, state_name: str) -> None:
         """State'i template'e sıfırla"""